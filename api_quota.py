@@ -0,0 +1,230 @@
+"""
+Quota-aware rate limiting for every Google API call made by the Attendance App.
+
+Google Sheets enforces per-user-per-minute quotas that are counted separately
+for read and write requests.  Bursts above them come back as HTTP 429 and
+used to land in the sync worker's fixed retry sleep.  Every call made by
+driveUpload and google_auth now goes through ``call_google_api``, which:
+
+  1. Takes a token from the bucket for the call's kind ("read", "write" or
+     "drive"), blocking until the bucket refills if it is empty.
+  2. Retries 429 and 5xx responses with exponential back-off and full jitter,
+     draining the bucket so concurrent callers back off too.
+
+Writes that are not idempotent (``values.append``) go through
+``call_google_api_once`` instead: a 5xx may arrive after Google already
+applied the append, so it is raised to the caller, which checks the sheet
+before sending the rows again.  A 429 is still retried, since a throttled
+request is rejected before it is applied.
+
+The buckets are sized a little under Google's default quotas so throughput
+stays just below the limit instead of swinging between bursts and stalls.
+
+Module-level constants:
+    DEFAULT_QUOTAS   -- kind -> (requests per minute, burst capacity).
+    MAX_RETRIES      -- Attempts made for a retryable error before giving up.
+    BACKOFF_BASE     -- First back-off delay in seconds (doubled per attempt).
+    BACKOFF_CAP      -- Upper bound for a single back-off delay in seconds.
+
+Public classes and functions:
+    TokenBucket        -- Thread-safe token bucket used for each call kind.
+    configure_quota    -- Change the rate/capacity of one bucket.
+    acquire            -- Block until a token of the given kind is available.
+    call_google_api    -- Rate-limit, call and (if needed) retry a Google API function.
+    call_google_api_once -- Like call_google_api, but 5xx errors are not retried.
+    http_status_of     -- Extract an HTTP status code from a Google client exception.
+    is_retryable_error -- Return True for 429/5xx responses.
+    get_quota_status   -- Snapshot of remaining budget per bucket.
+    set_retry_listener -- Register a callable told about every retried call.
+"""
+
+import threading
+import time
+import random
+
+
+DEFAULT_QUOTAS = {   # kind -> (requests per minute, burst capacity)
+    "read": (54, 6),     # Sheets default: 60 reads / minute / user
+    "write": (54, 6),    # Sheets default: 60 writes / minute / user
+    "drive": (600, 20),  # Drive uploads/permissions and other Google APIs
+}
+
+MAX_RETRIES = 5      # Attempts for a retryable (429/5xx) error before re-raising
+BACKOFF_BASE = 1.0   # Seconds; doubled for each further attempt
+BACKOFF_CAP = 32.0   # Seconds; upper bound for one back-off sleep
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute, capacity):
+        self._lock = threading.Lock()
+        self.rate_per_minute = float(rate_per_minute)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self.throttled_seconds = 0.0   # Total time callers spent waiting on this bucket
+        self.calls = 0                 # Tokens handed out since start
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` are available, then take them."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.calls += 1
+                    self.throttled_seconds += waited
+                    return waited
+                deficit = tokens - self._tokens
+                delay = deficit * 60.0 / self.rate_per_minute
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Empty the bucket (used after a 429 so other callers slow down too)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+    def available(self):
+        """Return the number of tokens that could be taken right now."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+_buckets = {kind: TokenBucket(rate, capacity) for kind, (rate, capacity) in DEFAULT_QUOTAS.items()}
+_stats_lock = threading.Lock()
+_retry_counts = {kind: 0 for kind in DEFAULT_QUOTAS}   # kind -> retries performed
+_last_backoff = {"kind": None, "status": None, "until": 0.0}
+_retry_listener = None   # Optional callable(kind, func, status) set via set_retry_listener
+
+
+def configure_quota(kind, rate_per_minute=None, capacity=None):
+    """Change the refill rate and/or burst capacity of one bucket."""
+    bucket = _buckets[kind]
+    with bucket._lock:
+        if rate_per_minute is not None:
+            bucket.rate_per_minute = float(rate_per_minute)
+        if capacity is not None:
+            bucket.capacity = float(capacity)
+            bucket._tokens = min(bucket._tokens, bucket.capacity)
+
+
+def set_retry_listener(callback):
+    """Register ``callback(kind, func, status)``, called before each back-off sleep."""
+    global _retry_listener
+    _retry_listener = callback
+
+
+def acquire(kind):
+    """Block until a token of ``kind`` is available.  Returns seconds waited."""
+    return _buckets[kind].acquire()
+
+
+def http_status_of(exc):
+    """Return the HTTP status code carried by a Google client exception, or None.
+
+    Understands gspread ``APIError`` (``.response.status_code``), the API
+    client's ``HttpError`` (``.resp.status``) and plain ``.code`` attributes.
+    """
+    candidates = (
+        getattr(getattr(exc, "response", None), "status_code", None),
+        getattr(getattr(exc, "resp", None), "status", None),
+        getattr(exc, "status_code", None),
+        getattr(exc, "code", None),
+    )
+    for status in candidates:
+        try:
+            if status is not None:
+                return int(status)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_retryable_error(exc):
+    """Return True for rate-limit (429) and server-side (5xx) errors."""
+    status = http_status_of(exc)
+    return status == 429 or (status is not None and 500 <= status < 600)
+
+
+def call_google_api(kind, func, *args, **kwargs):
+    """Call ``func(*args, **kwargs)`` under the ``kind`` bucket with back-off.
+
+    429 and 5xx errors are retried up to ``MAX_RETRIES`` times, sleeping a
+    random "full jitter" delay in ``[0, min(BACKOFF_CAP, BACKOFF_BASE * 2**n)]``
+    between attempts.  Any other error, or the last retryable one, is
+    re-raised to the caller.
+    """
+    return _call_with_backoff(kind, func, args, kwargs, True)
+
+
+def call_google_api_once(kind, func, *args, **kwargs):
+    """Call ``func`` like ``call_google_api``, retrying only 429 responses.
+
+    For writes that must not be repeated blind: a 5xx (or a dropped
+    connection) is re-raised at once, because the request may have been
+    applied before the error came back.
+    """
+    return _call_with_backoff(kind, func, args, kwargs, False)
+
+
+def _call_with_backoff(kind, func, args, kwargs, retry_server_errors):
+    bucket = _buckets[kind]
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            status = http_status_of(e)
+            if not is_retryable_error(e) or attempt >= MAX_RETRIES - 1 \
+                    or (status != 429 and not retry_server_errors):
+                raise
+            if status == 429:
+                bucket.drain()
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+            with _stats_lock:
+                _retry_counts[kind] = _retry_counts.get(kind, 0) + 1
+                _last_backoff.update({"kind": kind, "status": status, "until": time.time() + delay})
+            if _retry_listener is not None:
+                try:
+                    _retry_listener(kind, func, status)
+                except Exception:
+                    pass
+            print(f"Google API {kind} call returned {status}; retrying in {delay:.1f}s (attempt {attempt + 2}/{MAX_RETRIES})")
+            time.sleep(delay)
+            attempt += 1
+
+
+def get_quota_status():
+    """Return a snapshot of remaining budget and throttling per bucket.
+
+    Returns:
+        dict: kind -> {"available", "capacity", "rate_per_minute", "calls",
+              "throttled_seconds", "retries"}, plus a "last_backoff" entry.
+    """
+    status = {}
+    with _stats_lock:
+        retries = dict(_retry_counts)
+        last_backoff = dict(_last_backoff)
+    for kind, bucket in _buckets.items():
+        status[kind] = {
+            "available": round(bucket.available(), 2),
+            "capacity": bucket.capacity,
+            "rate_per_minute": bucket.rate_per_minute,
+            "calls": bucket.calls,
+            "throttled_seconds": round(bucket.throttled_seconds, 2),
+            "retries": retries.get(kind, 0),
+        }
+    status["last_backoff"] = last_backoff
+    return status
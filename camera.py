@@ -2,10 +2,16 @@
 Camera capture utilities for the Attendance App.
 
 Captures a single frame from the default webcam (DirectShow backend on Windows),
-applies gamma correction to improve image brightness, and saves it as a JPEG.
+applies gamma correction to improve image brightness, and encodes it as a JPEG,
+either in memory (for a direct upload) or saved to disk.
+
+Module-level constants:
+    DEFAULT_JPEG_QUALITY  -- JPEG quality (1-100) used when none is given.
+    DEFAULT_RESOLUTION    -- (width, height) requested from the webcam.
 
 Public functions:
     increase_gamma  -- Apply gamma correction to a BGR image array.
+    capture_jpeg    -- Capture one frame and return it as encoded JPEG bytes.
     takePic         -- Capture one frame from the webcam and save it to disk.
 """
 
@@ -14,6 +20,9 @@ import numpy as np
 import time
 import os
 
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_RESOLUTION = (640, 480)
+
 def increase_gamma(image, gamma=2):
     """Apply gamma correction to brighten a BGR image.
 
@@ -32,6 +41,41 @@ def increase_gamma(image, gamma=2):
     table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in range(256)], dtype=np.uint8)
     return cv2.LUT(image, table)
 
+def _capture_frame(resolution):
+    """Read one gamma-corrected frame at ``resolution``; None if the camera failed."""
+    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # Use DirectShow backend on Windows
+    try:
+        width, height = resolution
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return None
+    return increase_gamma(frame)
+
+def capture_jpeg(quality=DEFAULT_JPEG_QUALITY, resolution=DEFAULT_RESOLUTION):
+    """Capture a single webcam frame and return it as JPEG bytes, without touching disk.
+
+    Args:
+        quality:    JPEG quality from 1 (smallest) to 100 (best).
+        resolution: ``(width, height)`` requested from the camera.  The
+                    camera may pick the nearest size it supports.
+
+    Returns:
+        bytes: The encoded JPEG, or None if the frame could not be read or encoded.
+    """
+    frame = _capture_frame(resolution)
+    if frame is None:
+        print("Error: Couldn't capture an image.")
+        return None
+    ok, encoded = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(max(1, min(100, quality)))])
+    if not ok:
+        print("Error: Couldn't encode the captured image.")
+        return None
+    return encoded.tobytes()
+
 def takePic(picname, folder):
     """Capture a single frame from the default webcam and save it as a JPEG.
 
@@ -47,17 +91,8 @@ def takePic(picname, folder):
     Returns:
         None on success; the string ``"fail"`` if the frame could not be read.
     """
-    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # Use DirectShow backend on Windows
-
-    # Set lower resolution
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-    ret, frame = cap.read()
-    if ret:
-        # Apply gamma correction
-        frame_gamma_corrected = increase_gamma(frame)
-
+    frame_gamma_corrected = _capture_frame(DEFAULT_RESOLUTION)
+    if frame_gamma_corrected is not None:
         # Save the image with the corrected gamma
         cv2.imwrite(f"images/{folder}/{picname}.jpeg", frame_gamma_corrected)
         print(f"Image saved as '{picname}.jpeg'.")
@@ -65,5 +100,4 @@ def takePic(picname, folder):
         print("Error: Couldn't capture an image.")
         return("fail")
 
-    cap.release()
     cv2.destroyAllWindows()
\ No newline at end of file
@@ -7,7 +7,7 @@ import sys
 dependencies = [
     "pillow", "gspread", "google-api-python-client",
     "google-auth-oauthlib", "google-auth-httplib2",
-    "tk", "opencv-python"
+    "tk", "opencv-python", "openpyxl"
 ]
 
 def install_dependencies():
@@ -15,45 +15,114 @@ Module-level variables:
     _next_refresh_threshold   -- Random threshold (8–16) at which a local refresh is queued.
     _api_refresh_callback     -- Optional callable invoked periodically after API calls.
     IDS_SHEET_NAME            -- Name of the worksheet that stores ID/name pairs ("IDs").
-    id_to_name_cache          -- In-memory dict mapping student ID strings to names.
-    name_to_id_cache          -- Reverse in-memory dict mapping names to ID strings.
+    id_index                  -- CompactIdIndex of student IDs and names (swapped, never mutated).
     new_id_queue              -- Thread-safe queue of (id, name) pairs pending sheet upload.
     attendance_queue          -- Thread-safe queue of attendance record tuples pending upload.
-    background_sync_thread    -- The active daemon thread running background_sync_worker.
-    background_sync_running   -- Boolean flag that controls the background worker loop.
+    photo_queue               -- Written attendance rows whose photo is uploaded and linked afterwards.
+    PHOTO_UPLOAD_WORKERS      -- Photo uploads the photo lane runs concurrently.
+    PENDING_IMAGE_LINK        -- Image Link placeholder written until the photo lane backfills the URL.
+    ID_FLUSH_LIMIT            -- Maximum new ID/name rows appended by one batched flush.
+    ROSTER_IMPORT_CHUNK       -- Name/ID rows per append when importing a roster file.
+    ATTENDANCE_FLUSH_LIMIT    -- Maximum attendance records written by one batched flush.
+    background_sync_thread    -- The daemon thread running the attendance sync lane.
+    background_sync_running   -- Boolean flag that controls the background sync lanes.
+    SYNC_RETRY_SCHEDULES      -- Per-lane (first, maximum) retry delays in seconds.
+    DEAD_LETTER_AFTER         -- Consecutive permanent failures before a record is dead-lettered.
+    SYNC_COALESCE_WINDOW      -- Seconds a woken lane waits so a burst is flushed in one batch.
+    SYNC_COALESCE_WINDOW_MAX  -- Largest coalesce window accepted (settings, Options slider, setter).
+    SYNC_WRITE_MODE           -- "append" (values.append, multi-kiosk safe) or "cursor" row writes.
+    RECORD_ID_COLUMNS         -- Hidden columns (G, N) holding each row's record ID for de-duplication.
+    GRID_LOW_WATER            -- Spare rows below which a worksheet is grown while the sync is idle.
+    GRID_GROW_CHUNK           -- Rows added to a worksheet per growth step.
+    GRID_GROW_BACKOFF         -- (first, maximum) seconds idle growth waits after a failed grow.
+    OFFLINE_AFTER_ERRORS      -- Consecutive transport errors after which sync pauses as offline.
+    OFFLINE_PROBE_INTERVAL    -- Seconds between reconnect probes while offline.
+    METRICS_SAMPLE_SIZE       -- Latency samples kept per endpoint/lane for p50/p95/p99.
+    SYNC_JOURNAL_FILE         -- SQLite write-ahead journal of queued records (next to settings.json).
+    IDS_CACHE_FILE            -- Local JSON snapshot of the ID caches, loaded at launch.
+
+Every Google API call goes through ``_google_call``, which applies the shared
+read/write/drive rate limiter and 429/5xx back-off from ``api_quota``.
 
 Public functions:
     register_api_refresh_callback   -- Register a callback fired every ~8–16 API calls.
     set_default_doc                 -- Set the active spreadsheet name used by all helpers.
     get_default_doc                 -- Return the current active spreadsheet name.
-    setup_google_sheet              -- Open and return the configured gspread Spreadsheet.
-    setup_google_drive              -- Return an authorised Drive v3 service object.
-    list_sheets                     -- Return all worksheet titles in the active spreadsheet.
+    setup_google_sheet              -- Return the pooled gspread Spreadsheet, opening it once.
+    setup_google_drive              -- Return a pooled (per-thread) Drive v3 service object.
+    get_pooled_worksheet            -- Return a pooled Worksheet handle by title.
+    invalidate_sheet_handles        -- Drop pooled handles for a spreadsheet or one worksheet.
+    invalidate_row_cursors          -- Drop cached next-row cursors so they are re-seeded.
+    invalidate_header_cache         -- Drop verified header rows so they are re-checked.
+    maintain_grid_capacity          -- Grow worksheets that are running low on spare rows.
+    reset_handle_pool               -- Drop every pooled handle (e.g. after sign-out).
+    list_sheets                     -- Re-list worksheet titles and refresh the handle pool.
     create_worksheet_tab            -- Create a new worksheet tab in the active spreadsheet.
     make_file_public                -- Grant public read access to a Drive file by ID.
-    upload_image_to_drive           -- Upload a local image to Drive and return its view URL.
+    get_photo_folder                -- Return (creating once) the shared photos folder or a student subfolder.
+    forget_photo_folders            -- Drop cached photo folder IDs.
+    upload_image_to_drive           -- Upload an image file or in-memory JPEG to Drive and return its view URL.
+    spill_pending_photos            -- Write in-memory photos to disk so they survive a restart.
     ensure_ids_sheet_exists         -- Ensure the "IDs" worksheet exists, creating it if needed.
-    load_ids_cache                  -- Populate the in-memory ID caches from the "IDs" sheet.
+    load_ids_snapshot               -- Load the ID caches from the local snapshot (no API call).
+    load_ids_cache                  -- Bring the ID caches up to date with the "IDs" sheet (incrementally).
+    import_roster                   -- Bulk-register Name/ID pairs from a CSV or XLSX roster.
     get_name_by_id                  -- Instant cache lookup: student ID → name.
     get_id_by_name                  -- Instant cache lookup: name → student ID.
     save_id_name_pair               -- Write a new ID/name pair to the cache and queue it for sync.
-    parse_timestamp                 -- Parse a timestamp string into a datetime object.
-    fetch_whos_here_from_sheets     -- Scan attendance sheets to build a currently-signed-in dict.
+    queue_attendance_record         -- Journal an attendance record and queue it for sync.
+    replay_sync_journal             -- Re-queue journal entries left over from a previous session.
+    list_dead_letters               -- Records that failed permanently and were set aside.
+    retry_dead_letters              -- Put dead-lettered records back on the sync queues.
+    export_dead_letters             -- Write dead-lettered records to a CSV or JSON file.
+    close_sync_journal              -- Checkpoint and close the sync journal.
+    parse_timestamp                 -- Parse a timestamp string into a datetime object (see timestamps).
+    fetch_whos_here_from_sheets     -- Build a currently-signed-in dict in one batched read of new rows.
     get_last_action_from_sheet      -- Determine the most recent sign-in/out action for a student.
     create_attendance_spreadsheet   -- Create a new spreadsheet with the standard tab layout.
     list_user_spreadsheets          -- List all spreadsheet titles in the signed-in user's Drive.
-    start_background_sync           -- Start the background worker thread.
-    stop_background_sync            -- Signal the background worker to stop.
-    background_sync_worker          -- Worker function that drains both background queues.
+    start_background_sync           -- Start one background thread per sync lane.
+    stop_background_sync            -- Signal the background sync lanes to stop.
+    drain_background_sync           -- Flush the lanes for up to a deadline, then stop them (shutdown).
+    background_sync_worker          -- Run one sync lane (IDs, attendance rows or photos),
+                                       retrying failed items on the lane's own schedule.
+    get_sync_backlog                -- Items queued or awaiting retry, per sync lane.
+    is_sync_offline                 -- True while Google is considered unreachable (no network access).
+    is_sync_online                  -- False while Google is unreachable (probes for recovery when due).
+    register_connectivity_callback  -- Register a callback fired when the app goes offline or back online.
+    get_sync_metrics                -- Snapshot of API call counts, latency percentiles, bytes and queue depth.
+    export_sync_metrics             -- Write the sync metrics snapshot to a JSON file.
+    reset_sync_metrics              -- Clear the sync metrics.
+    set_sync_write_mode             -- Choose "append" (multi-kiosk safe) or "cursor" row writes.
+    set_sync_coalesce_window        -- Set how long a woken lane gathers a burst before flushing.
 """
 
-from googleapiclient.http import MediaFileUpload
-from google_auth import get_gspread_client, get_drive_service
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+from google_auth import get_gspread_client, get_drive_service, _get_persistent_path
+from api_quota import call_google_api, call_google_api_once, http_status_of, get_quota_status, set_retry_listener
+from id_index import CompactIdIndex
+from timestamps import parse_timestamp, parse_epochs, format_epoch, now_epoch, get_parse_stats
+import gspread
 import os
 import threading
 import queue
 import time
 import random
+import socket
+import sqlite3
+import json
+import uuid
+import heapq
+import io
+import itertools
+import csv
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import openpyxl  # Optional: only needed to import .xlsx rosters
+except ImportError:
+    openpyxl = None
 
 
 defaultDoc = ""  # Active spreadsheet ID; set via set_default_doc()
@@ -102,6 +171,382 @@ def _mark_google_api_call():
             pass
 
 
+# --------------------------
+# Sync Metrics
+# --------------------------
+# Counters for sizing quota and spotting slow syncs, shown live in
+# Options → Diagnostics.  Every ``_google_call`` is timed and counted per
+# endpoint (the gspread method name, or the Drive method ID such as
+# "drive.files.create"), together with an estimate of the bytes sent and
+# received.  Latency percentiles are taken over the last METRICS_SAMPLE_SIZE
+# calls of each endpoint so memory stays bounded however long a meeting runs.
+# Each lane also records how long a record took from enqueue to written
+# (for the photo lane: from its row being written to its link being filled),
+# and the total backlog is sampled at most every METRICS_DEPTH_INTERVAL
+# seconds.  Unlike ``_api_call_count`` these counters are never reset except
+# through ``reset_sync_metrics``.
+METRICS_SAMPLE_SIZE = 1000      # Latency samples kept per endpoint / lane for percentiles
+METRICS_DEPTH_INTERVAL = 5.0    # Minimum seconds between queue-depth samples
+METRICS_DEPTH_HISTORY = 720     # Queue-depth samples kept (one hour at the minimum interval)
+_metrics_lock = threading.Lock()
+
+
+def _new_metrics():
+    return {
+        "started": time.time(),
+        "endpoints": {},    # endpoint -> counters and recent latencies (seconds)
+        "lanes": {},        # lane -> counters and recent enqueue-to-written latencies (seconds)
+        "queue_depth": deque(maxlen=METRICS_DEPTH_HISTORY),   # (unix time, {lane: depth})
+        "last_depth_sample": 0.0,
+    }
+
+
+_metrics = _new_metrics()
+_record_enqueued_at = {}   # (lane root, item key) -> monotonic time the item was first queued
+
+
+def _endpoint_name(func):
+    """Return a readable endpoint name for a bound client method."""
+    method_id = getattr(getattr(func, "__self__", None), "methodId", None)
+    return method_id or getattr(func, "__name__", "call")
+
+
+def _payload_bytes(value):
+    """Rough size in bytes of a request/response body (0 if it is not data)."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (dict, list, tuple)):
+        try:
+            return len(json.dumps(value, default=lambda _: None))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def _request_bytes(func, args, kwargs):
+    size = sum(_payload_bytes(arg) for arg in args)
+    size += sum(_payload_bytes(value) for value in kwargs.values())
+    media = getattr(getattr(func, "__self__", None), "resumable", None)
+    if media is not None:
+        try:
+            size += int(media.size() or 0)
+        except Exception:
+            pass
+    return size
+
+
+def _endpoint_metrics(name):
+    stats = _metrics["endpoints"].get(name)
+    if stats is None:
+        stats = {
+            "calls": 0, "errors": 0, "retries": 0, "total_seconds": 0.0,
+            "bytes_sent": 0, "bytes_received": 0,
+            "latencies": deque(maxlen=METRICS_SAMPLE_SIZE),
+        }
+        _metrics["endpoints"][name] = stats
+    return stats
+
+
+def _lane_metrics(lane):
+    stats = _metrics["lanes"].get(lane)
+    if stats is None:
+        stats = {
+            "enqueued": 0, "written": 0, "retries": 0, "dead": 0,
+            "latencies": deque(maxlen=METRICS_SAMPLE_SIZE),
+        }
+        _metrics["lanes"][lane] = stats
+    return stats
+
+
+def _metrics_record_call(name, seconds, sent, received, failed):
+    with _metrics_lock:
+        stats = _endpoint_metrics(name)
+        stats["calls"] += 1
+        stats["errors"] += 1 if failed else 0
+        stats["total_seconds"] += seconds
+        stats["bytes_sent"] += sent
+        stats["bytes_received"] += received
+        stats["latencies"].append(seconds)
+
+
+def _metrics_note_api_retry(kind, func, status):
+    """api_quota retry listener: count a back-off retry against its endpoint."""
+    with _metrics_lock:
+        _endpoint_metrics(_endpoint_name(func))["retries"] += 1
+
+
+def _metrics_item_key(lane, item):
+    if lane == "ids":
+        return ("ids", item[0])
+    key = _attendance_journal_key(item)
+    return (lane, key) if key else None
+
+
+def _metrics_note_enqueued(lane, item):
+    key = _metrics_item_key(lane, item)
+    with _metrics_lock:
+        _lane_metrics(lane)["enqueued"] += 1
+        if key is not None and key not in _record_enqueued_at:
+            _record_enqueued_at[key] = time.monotonic()
+
+
+def _metrics_note_outcome(lane, done=(), retried=0, dead=()):
+    """Record written, rescheduled and dead-lettered items for ``lane``."""
+    now = time.monotonic()
+    with _metrics_lock:
+        stats = _lane_metrics(lane)
+        stats["retries"] += retried
+        stats["dead"] += len(dead)
+        stats["written"] += len(done)
+        for item in dead:
+            _record_enqueued_at.pop(_metrics_item_key(lane, item), None)
+        for item in done:
+            started = _record_enqueued_at.pop(_metrics_item_key(lane, item), None)
+            if started is not None:
+                stats["latencies"].append(now - started)
+
+
+def _metrics_sample_queue_depth(force=False):
+    """Append a backlog sample unless one was taken in the last METRICS_DEPTH_INTERVAL."""
+    now = time.time()
+    with _metrics_lock:
+        if not force and now - _metrics["last_depth_sample"] < METRICS_DEPTH_INTERVAL:
+            return
+        _metrics["last_depth_sample"] = now
+    depth = get_sync_backlog()
+    with _metrics_lock:
+        _metrics["queue_depth"].append((now, depth))
+
+
+def _percentiles(samples):
+    """Return p50/p95/p99 (nearest rank) of ``samples`` in milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    result = {}
+    for pct in (50, 95, 99):
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+        result[f"p{pct}_ms"] = round(ordered[rank] * 1000.0, 1)
+    return result
+
+
+def get_sync_metrics():
+    """Return a JSON-serialisable snapshot of the sync telemetry.
+
+    Returns:
+        dict: ``{"uptime_seconds", "endpoints", "lanes", "queue_depth", "quota", "timestamps"}``
+        where each endpoint has call/error/retry counts, byte totals and
+        p50/p95/p99 latency; each lane has enqueued/written/retry/dead counts,
+        its current backlog and p50/p95/p99 enqueue-to-written latency; and
+        ``queue_depth`` is a list of ``[unix time, {lane: depth}]`` samples;
+        ``timestamps`` counts parsed and unparseable sheet timestamps.
+    """
+    _metrics_sample_queue_depth(force=True)
+    backlog = get_sync_backlog()
+    with _metrics_lock:
+        endpoints = {}
+        for name, stats in _metrics["endpoints"].items():
+            entry = {key: value for key, value in stats.items() if key != "latencies"}
+            entry["total_seconds"] = round(entry["total_seconds"], 3)
+            entry.update(_percentiles(stats["latencies"]))
+            endpoints[name] = entry
+        lanes = {}
+        for name in set(_metrics["lanes"]) | set(backlog):
+            stats = _metrics["lanes"].get(name) or {"enqueued": 0, "written": 0, "retries": 0, "dead": 0, "latencies": ()}
+            entry = {key: value for key, value in stats.items() if key != "latencies"}
+            entry["backlog"] = backlog.get(name, 0)
+            entry.update(_percentiles(stats["latencies"]))
+            lanes[name] = entry
+        depth = [[round(stamp, 1), dict(sample)] for stamp, sample in _metrics["queue_depth"]]
+        uptime = time.time() - _metrics["started"]
+    return {
+        "uptime_seconds": round(uptime, 1),
+        "endpoints": endpoints,
+        "lanes": lanes,
+        "queue_depth": depth,
+        "quota": get_quota_status(),
+        "timestamps": get_parse_stats(),
+    }
+
+
+def export_sync_metrics(file_path):
+    """Write ``get_sync_metrics()`` to ``file_path`` as JSON.  Returns the snapshot."""
+    snapshot = get_sync_metrics()
+    snapshot["exported_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2)
+    return snapshot
+
+
+def reset_sync_metrics():
+    """Clear every metric (queued records keep being tracked from now on)."""
+    global _metrics
+    with _metrics_lock:
+        _metrics = _new_metrics()
+
+
+set_retry_listener(_metrics_note_api_retry)
+
+
+# --------------------------
+# Connectivity
+# --------------------------
+# When the Wi-Fi drops, every Google call fails after a network timeout, and
+# each lane used to retry its items one by one.  After OFFLINE_AFTER_ERRORS
+# consecutive transport errors (no HTTP response at all) the app is marked
+# offline.  ``_google_call`` then fails fast with SyncOffline instead of
+# reaching for the network, and the lanes sit idle.  Recovery is detected
+# with a plain TCP connect to the Sheets endpoint, at most once every
+# OFFLINE_PROBE_INTERVAL seconds.  When the probe succeeds, every lane's
+# waiting retries are made due at once, so the backlog is replayed in full
+# batched flushes (one write per worksheet block) instead of trickling out
+# on the back-off schedule.
+OFFLINE_AFTER_ERRORS = 3          # Consecutive transport errors before going offline
+OFFLINE_PROBE_INTERVAL = 10.0     # Seconds between reconnect probes while offline
+OFFLINE_PROBE_HOST = ("sheets.googleapis.com", 443)
+OFFLINE_PROBE_TIMEOUT = 3.0       # Seconds allowed for one probe connection
+_TRANSPORT_ERROR_NAMES = {"ServerNotFoundError", "TransportError", "ConnectionError", "Timeout"}
+_connectivity_lock = threading.Lock()
+_sync_offline = False             # True while Google is considered unreachable
+_transport_error_streak = 0       # Consecutive transport errors seen by _google_call
+_last_probe = 0.0                 # monotonic time of the last reconnect probe
+_connectivity_callback = None     # Callable(online) registered via register_connectivity_callback
+
+
+class SyncOffline(ConnectionError):
+    """Raised instead of calling Google while the app is offline."""
+
+
+def register_connectivity_callback(callback):
+    """Register ``callback(online)``, called from a sync thread whenever connectivity changes."""
+    global _connectivity_callback
+    _connectivity_callback = callback
+
+
+def _is_transport_error(exc):
+    """Return True for errors that mean Google could not be reached at all."""
+    if http_status_of(exc) is not None or isinstance(exc, SyncOffline):
+        return False
+    if isinstance(exc, (FileNotFoundError, IsADirectoryError, PermissionError)):
+        return False
+    if isinstance(exc, OSError):
+        return True
+    return any(cls.__name__ in _TRANSPORT_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+def _set_offline(offline):
+    global _sync_offline, _transport_error_streak
+    with _connectivity_lock:
+        changed = _sync_offline != offline
+        _sync_offline = offline
+        _transport_error_streak = 0
+    if not changed:
+        return
+    if offline:
+        print(f"Connectivity: Google unreachable; pausing sync (probing every {OFFLINE_PROBE_INTERVAL:.0f}s)")
+        spill_pending_photos()
+    else:
+        print("Connectivity: Google reachable again; replaying the sync backlog")
+        for lane in _sync_lanes.values():
+            lane.expedite_retries()
+    if callable(_connectivity_callback):
+        try:
+            _connectivity_callback(not offline)
+        except Exception:
+            pass
+
+
+def _note_call_outcome(exc=None):
+    """Update the transport-error streak after a Google call."""
+    global _transport_error_streak
+    if exc is None:
+        if _transport_error_streak:
+            with _connectivity_lock:
+                _transport_error_streak = 0
+        return
+    if not _is_transport_error(exc):
+        return
+    with _connectivity_lock:
+        _transport_error_streak += 1
+        streak = _transport_error_streak
+    if streak >= OFFLINE_AFTER_ERRORS:
+        _set_offline(True)
+
+
+def _probe_connectivity():
+    """Return True if a TCP connection to the Sheets endpoint succeeds."""
+    try:
+        with socket.create_connection(OFFLINE_PROBE_HOST, timeout=OFFLINE_PROBE_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+
+def is_sync_offline():
+    """Return True while Google is considered unreachable (never probes; safe on the UI thread)."""
+    return _sync_offline
+
+
+def is_sync_online():
+    """Return True unless the app is offline; while offline, probe for recovery when one is due."""
+    global _last_probe
+    if not _sync_offline:
+        return True
+    with _connectivity_lock:
+        now = time.monotonic()
+        if now - _last_probe < OFFLINE_PROBE_INTERVAL:
+            return False
+        _last_probe = now
+    if _probe_connectivity():
+        _set_offline(False)
+        return True
+    return False
+
+
+def _google_call(kind, func, *args, **kwargs):
+    """Make one rate-limited Google API call, count it for the refresh trigger and time it.
+
+    Raises SyncOffline without calling Google while the app is offline.
+
+    Args:
+        kind: Quota bucket for the call: "read", "write" or "drive".
+        func: Bound client method to call with ``*args``/``**kwargs``.
+    """
+    return _timed_google_call(call_google_api, kind, func, args, kwargs)
+
+
+def _google_call_once(kind, func, *args, **kwargs):
+    """Like ``_google_call``, but a 5xx is raised instead of retried.
+
+    Used for ``values.append``, which is not idempotent: the caller treats
+    the error as a possibly-applied write and checks the sheet before
+    sending the rows again.
+    """
+    return _timed_google_call(call_google_api_once, kind, func, args, kwargs)
+
+
+def _timed_google_call(caller, kind, func, args, kwargs):
+    if not is_sync_online():
+        raise SyncOffline("Google is unreachable; the request will be retried when the connection returns.")
+    name = _endpoint_name(func)
+    sent = _request_bytes(func, args, kwargs)
+    started = time.monotonic()
+    try:
+        result = caller(kind, func, *args, **kwargs)
+    except Exception as e:
+        _metrics_record_call(name, time.monotonic() - started, sent, 0, True)
+        _note_call_outcome(e)
+        raise
+    _metrics_record_call(name, time.monotonic() - started, sent, _payload_bytes(result), False)
+    _note_call_outcome()
+    _mark_google_api_call()
+    return result
+
+
 def set_default_doc(name):
     """Set the default spreadsheet document name used by all functions."""
     global defaultDoc
@@ -113,9 +558,113 @@ def get_default_doc():
     return defaultDoc
 
 
+# --------------------------
+# Google Handle Pool
+# --------------------------
+# One authorised gspread client, the opened Spreadsheet objects and their
+# Worksheet objects are kept for the life of the process so attendance
+# writes do not re-read token.json, re-authorise, re-open the spreadsheet
+# and re-list its tabs on every record.  Handles are only dropped when
+# Google reports the spreadsheet/worksheet as missing (404 or an
+# unparseable range) or when a metadata refresh shows a tab was renamed.
+_handle_lock = threading.RLock()
+_gspread_client = None        # Shared authorised gspread Client
+_spreadsheet_handles = {}     # spreadsheet ID -> gspread.Spreadsheet
+_worksheet_handles = {}       # spreadsheet ID -> {title: gspread.Worksheet} in tab order
+_drive_local = threading.local()  # Per-thread Drive service (httplib2 is not thread-safe)
+_drive_generation = 0         # Bumped by reset_handle_pool; older per-thread services are stale
+
+
+def _resolve_document(document):
+    """Return ``document`` or ``defaultDoc``, raising ValueError if neither is set."""
+    if document is None:
+        document = defaultDoc
+    if not document:
+        raise ValueError("No Google Sheet configured. Go to Options → Google Sheet Setup.")
+    return document
+
+
+def _get_pooled_client():
+    """Return the shared authorised gspread client, creating it on first use."""
+    global _gspread_client
+    with _handle_lock:
+        if _gspread_client is None:
+            _gspread_client = get_gspread_client()
+        return _gspread_client
+
+
+def reset_handle_pool():
+    """Drop every pooled client, spreadsheet and worksheet handle.
+
+    Call after signing out or switching Google accounts so the next call
+    re-authorises with the current token.  Cached photo folders belong to
+    the old account and are forgotten too.
+    """
+    global _gspread_client, _drive_generation
+    with _handle_lock:
+        _gspread_client = None
+        _spreadsheet_handles.clear()
+        _worksheet_handles.clear()
+        # Other threads' Drive services can't be cleared from here; each
+        # thread sees the new generation and rebuilds its own on next use.
+        _drive_generation += 1
+    forget_photo_folders()
+
+
+def invalidate_sheet_handles(document=None, title=None):
+    """Forget pooled handles for a spreadsheet, or for one of its worksheets.
+
+    Args:
+        document: Spreadsheet ID.  Defaults to ``defaultDoc``.
+        title:    When given, only that worksheet's handle is dropped;
+                  otherwise the spreadsheet and all of its worksheets are.
+    """
+    if document is None:
+        document = defaultDoc
+    with _handle_lock:
+        if title is None:
+            _spreadsheet_handles.pop(document, None)
+            _worksheet_handles.pop(document, None)
+        else:
+            handles = _worksheet_handles.get(document)
+            if handles is not None:
+                handles.pop(title, None)
+                # The tab list itself is now stale; reload it on next use.
+                _worksheet_handles.pop(document, None)
+
+
+def _is_missing_handle_error(exc):
+    """Return True when ``exc`` means a pooled spreadsheet/worksheet no longer exists."""
+    if isinstance(exc, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        status = _api_error_status(exc)
+        if status == 404:
+            return True
+        if status == 400 and "unable to parse range" in str(exc).lower():
+            return True
+    return False
+
+
+def _api_error_status(exc):
+    """Return the HTTP status code carried by a gspread APIError, or None."""
+    return http_status_of(exc)
+
+
+def _invalidate_on_missing(exc, document, title=None):
+    """Drop pooled handles when ``exc`` reports a missing spreadsheet or worksheet."""
+    if _is_missing_handle_error(exc):
+        invalidate_sheet_handles(document, title)
+        return True
+    return False
+
+
 def setup_google_sheet(document=None):
     """Open and return the configured gspread Spreadsheet object.
 
+    The Spreadsheet is served from the handle pool after the first call, so
+    repeated calls cost no API round-trips.
+
     Args:
         document: Spreadsheet name to open.  Defaults to ``defaultDoc`` when
                   omitted.  Raises ValueError if neither is set.
@@ -123,33 +672,100 @@ def setup_google_sheet(document=None):
     Returns:
         A ``gspread.Spreadsheet`` instance for the requested document.
     """
-    if document is None:
-        document = defaultDoc
-    if not document:
-        raise ValueError("No Google Sheet configured. Go to Options → Google Sheet Setup.")
-    client = get_gspread_client()
-    sheet = client.open_by_key(document)
-    _mark_google_api_call()
+    document = _resolve_document(document)
+    with _handle_lock:
+        sheet = _spreadsheet_handles.get(document)
+    if sheet is not None:
+        return sheet
+
+    client = _get_pooled_client()
+    try:
+        sheet = _google_call("read", client.open_by_key, document)
+    except Exception as e:
+        _invalidate_on_missing(e, document)
+        raise
+    with _handle_lock:
+        _spreadsheet_handles[document] = sheet
     return sheet
 
+
+def _store_worksheet_handles(document, worksheets):
+    """Replace the pooled worksheet handles for ``document`` with ``worksheets``."""
+    handles = {ws.title: ws for ws in worksheets}
+    with _handle_lock:
+        _worksheet_handles[document] = handles
+    return handles
+
+
+def _get_worksheet_handles(document=None, refresh=False):
+    """Return the pooled ``{title: Worksheet}`` map for a spreadsheet.
+
+    Args:
+        document: Spreadsheet ID.  Defaults to ``defaultDoc``.
+        refresh:  Re-list the tabs from Google even when a pooled map exists.
+    """
+    document = _resolve_document(document)
+    if not refresh:
+        with _handle_lock:
+            handles = _worksheet_handles.get(document)
+        if handles is not None:
+            return handles
+
+    spreadsheet = setup_google_sheet(document)
+    try:
+        worksheets = _google_call("read", spreadsheet.worksheets)
+    except Exception as e:
+        _invalidate_on_missing(e, document)
+        raise
+    return _store_worksheet_handles(document, worksheets)
+
+
+def get_pooled_worksheet(title, document=None):
+    """Return the pooled Worksheet called ``title``.
+
+    Raises gspread.exceptions.WorksheetNotFound when the tab does not exist
+    even after re-listing the spreadsheet's tabs.
+    """
+    handles = _get_worksheet_handles(document)
+    ws = handles.get(title)
+    if ws is None:
+        # The tab may have been created or renamed since the pool was filled.
+        handles = _get_worksheet_handles(document, refresh=True)
+        ws = handles.get(title)
+    if ws is None:
+        raise gspread.exceptions.WorksheetNotFound(title)
+    return ws
+
+
 def setup_google_drive():
-    """Return an authorised Google Drive v3 service object via OAuth."""
-    return get_drive_service()
+    """Return an authorised Google Drive v3 service object via OAuth.
+
+    Each thread keeps its own pooled service because the underlying
+    httplib2 transport is not thread-safe.  A service built before the last
+    ``reset_handle_pool()`` belongs to the old account and is rebuilt.
+    """
+    generation = _drive_generation
+    service = getattr(_drive_local, "service", None)
+    if service is None or getattr(_drive_local, "generation", None) != generation:
+        service = get_drive_service()
+        _drive_local.service = service
+        _drive_local.generation = generation
+    return service
 
 def list_sheets(document=None):
     """Return a list of all worksheet titles in the active spreadsheet.
 
+    Always re-lists the tabs from Google and refreshes the handle pool, so
+    renamed or deleted tabs are picked up here.
+
     Args:
         document: Spreadsheet name to query.  Defaults to ``defaultDoc``.
 
     Returns:
         list[str]: Worksheet titles in the order they appear in the spreadsheet.
     """
-    spreadsheet = setup_google_sheet(document)
-    worksheets = spreadsheet.worksheets()   # list of Worksheet objects
-    _mark_google_api_call()
-    sheet_names = [ws.title for ws in worksheets]
-    return sheet_names
+    handles = _get_worksheet_handles(document, refresh=True)
+    return list(handles.keys())
 
 
 def create_worksheet_tab(name, document=None, rows=1000, cols=26):
@@ -163,13 +779,17 @@ def create_worksheet_tab(name, document=None, rows=1000, cols=26):
     if title == IDS_SHEET_NAME:
         raise ValueError("The worksheet name 'IDs' is reserved.")
 
+    document = _resolve_document(document)
     spreadsheet = setup_google_sheet(document)
-    existing = [ws.title for ws in spreadsheet.worksheets()]
+    existing = list(_get_worksheet_handles(document, refresh=True).keys())
     if title in existing:
         raise ValueError(f"A worksheet named '{title}' already exists.")
 
-    created = spreadsheet.add_worksheet(title=title, rows=rows, cols=cols)
-    _mark_google_api_call()
+    created = _google_call("write", spreadsheet.add_worksheet, title=title, rows=rows, cols=cols)
+    with _handle_lock:
+        handles = _worksheet_handles.get(document)
+        if handles is not None:
+            handles[created.title] = created
     return created
 
 
@@ -193,351 +813,2515 @@ def _normalize_logging_fields(logging_fields):
     return merged
 
 
-def _build_attendance_headers_and_row(current_id, name, attendance_record, file_path, file_url, reason, logging_fields):
-    """Build dynamic headers and row values based on field toggles."""
-    fields = _normalize_logging_fields(logging_fields)
+def _build_attendance_headers_and_row(current_id, name, attendance_record, file_path, file_url, reason, logging_fields):
+    """Build dynamic headers and row values based on field toggles."""
+    fields = _normalize_logging_fields(logging_fields)
+
+    headers = ["ID"]
+    row = [current_id]
+
+    value_map = {
+        "name": name,
+        "timestamp": attendance_record,
+        "image_link": file_url,
+        "image_path": file_path,
+        "reason": reason,
+    }
+
+    for key, label in LOGGING_FIELD_ORDER:
+        if fields.get(key, False):
+            headers.append(label)
+            row.append(value_map.get(key))
+
+    return headers, row
+
+
+# --------------------------
+# Row Cursor Cache
+# --------------------------
+# Next writable row per (spreadsheet, worksheet, block).  A cursor is seeded
+# once from a single read of the block's first column and then advanced
+# locally after each successful write, so write cost does not grow with the
+# sheet.  It is only re-seeded when a write fails (possible conflict) or a
+# refresh observes rows this process did not write.
+_sync_state_lock = threading.RLock()
+_row_cursors = {}  # (spreadsheet ID, worksheet title, "in"/"out") -> next writable row
+
+
+def _get_row_cursor(document, title, action):
+    """Return the cached next writable row, or None when it must be seeded."""
+    with _sync_state_lock:
+        return _row_cursors.get((document, title, action))
+
+
+def _seed_row_cursor(document, title, action, first_col_values):
+    """Seed a cursor from the values of the block's first column (header included)."""
+    # Row 1 always holds the headers, even when the block is empty.
+    next_row = max(len(first_col_values), 1) + 1
+    with _sync_state_lock:
+        _row_cursors[(document, title, action)] = next_row
+    return next_row
+
+
+def _advance_row_cursor(document, title, action, written_from, count):
+    """Move a cursor past ``count`` rows written starting at ``written_from``."""
+    with _sync_state_lock:
+        key = (document, title, action)
+        _row_cursors[key] = max(_row_cursors.get(key, 0), written_from + count)
+
+
+def invalidate_row_cursors(document=None, title=None, action=None):
+    """Forget cached row cursors so the next write re-seeds them.
+
+    Args:
+        document: Spreadsheet ID.  Defaults to ``defaultDoc``.
+        title:    Limit to one worksheet; all worksheets when omitted.
+        action:   Limit to one block ("in" or "out"); both when omitted.
+    """
+    if document is None:
+        document = defaultDoc
+    with _sync_state_lock:
+        for key in list(_row_cursors.keys()):
+            if key[0] != document:
+                continue
+            if title is not None and key[1] != title:
+                continue
+            if action is not None and key[2] != action:
+                continue
+            _row_cursors.pop(key, None)
+
+
+def _observe_block_rows(document, title, action, last_row):
+    """Reconcile a cursor with the last used row seen by a sheet refresh.
+
+    More rows than expected means another writer appended rows, so the
+    cursor jumps past them.  Fewer rows means rows were deleted (or the read
+    raced one of our writes), so the cursor is dropped and re-seeded by a
+    fresh read on the next write rather than risking an overwrite.
+    """
+    with _sync_state_lock:
+        key = (document, title, action)
+        cursor = _row_cursors.get(key)
+        if cursor is None:
+            return
+        observed_next = max(last_row, 1) + 1
+        if observed_next > cursor:
+            print(f"Row cursor: '{title}' sign-{action} has rows this app did not write; moving to row {observed_next}")
+            _row_cursors[key] = observed_next
+        elif observed_next < cursor:
+            _row_cursors.pop(key, None)
+
+
+def _parse_updated_range(updated_range):
+    """Return ``(first_row, last_row)`` from an A1 range such as "'Sheet'!A5:E7", or None."""
+    if not updated_range:
+        return None
+    a1 = updated_range.rsplit("!", 1)[-1]
+    rows = []
+    for part in a1.split(":"):
+        digits = part.lstrip("$ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz").replace("$", "")
+        if not digits.isdigit():
+            return None
+        rows.append(int(digits))
+    return rows[0], rows[-1]
+
+
+def _observe_appended_rows(document, title, action, updated_range):
+    """Move a cursor past the rows a ``values.append`` call reports it wrote.
+
+    The server's answer is authoritative, so the cursor is set rather than
+    merely advanced; a start row other than the expected one means another
+    station wrote to the block in between.
+    """
+    span = _parse_updated_range(updated_range)
+    key = (document, title, action)
+    with _sync_state_lock:
+        if span is None:
+            _row_cursors.pop(key, None)
+            return None
+        expected = _row_cursors.get(key)
+        if expected is not None and span[0] != expected:
+            print(f"Row cursor: '{title}' sign-{action} gained {span[0] - expected} row(s) from another writer")
+        _row_cursors[key] = span[1] + 1
+    return span
+
+
+# --------------------------
+# Write Mode
+# --------------------------
+# "append" (default): rows are added with ``values.append`` against the
+# block's table range (A1:F / H1:M).  The server finds the end of the table
+# and writes after it in one atomic call, so several kiosks writing to the
+# same sheet can never pick the same row and no read precedes the write.
+# The row cursor is still updated from the range the server reports.
+# "cursor": rows go to the locally cached next row, and all blocks share one
+# ``values.batchUpdate`` -- fewest calls, but only safe with a single writer.
+#
+# Appends use insertDataOption OVERWRITE rather than INSERT_ROWS: the sign-in
+# and sign-out blocks share sheet rows, and INSERT_ROWS inserts whole rows,
+# which would push the other block's rows down and leave gaps in it.
+# OVERWRITE still lets the server choose the row (and grows the grid when
+# the table reaches its end).
+SYNC_WRITE_MODES = ("append", "cursor")
+SYNC_WRITE_MODE = "append"
+APPEND_INSERT_DATA_OPTION = "OVERWRITE"
+
+
+def set_sync_write_mode(mode):
+    """Select how attendance rows are written: "append" or "cursor"."""
+    global SYNC_WRITE_MODE
+    if mode not in SYNC_WRITE_MODES:
+        raise ValueError(f"Unknown sync write mode: {mode!r}")
+    SYNC_WRITE_MODE = mode
+
+
+# --------------------------
+# Grid Capacity
+# --------------------------
+# New tabs are created with 1000 rows and a write past the end of the grid
+# fails.  Each pooled Worksheet knows its grid size (``row_count``) and the
+# row cursors know how far the blocks have got, so the remaining capacity is
+# known locally.  When the attendance lane goes idle it grows any tab with
+# fewer than GRID_LOW_WATER spare rows by GRID_GROW_CHUNK rows, and a cursor-
+# mode write that would run past the grid grows it first.  (``values.append``
+# in append mode extends the grid itself, but the idle top-up still keeps
+# room ahead of a rush.)  Tabs are also widened before a block is first
+# written: the sign-out record ID lives in column N, one past the 13 columns
+# older versions of the app created, and a write beyond the grid's last
+# column fails with "exceeds grid limits".  A tab whose growth fails (quota,
+# no edit permission) is left alone by the idle top-up for a back-off that
+# doubles with each further failure, so it does not spend a write on every
+# idle wake.
+GRID_LOW_WATER = 250    # Spare rows below which a tab is grown during idle time
+GRID_GROW_CHUNK = 1000  # Rows added per growth step
+GRID_GROW_BACKOFF = (30.0, 900.0)  # (first, maximum) seconds idle growth waits after a failure
+
+_grid_grow_failures = {}  # (spreadsheet ID, worksheet title) -> (consecutive failures, retry-after monotonic time)
+
+
+def _pooled_handle(document, title):
+    """Return the pooled Worksheet for ``title`` without making any API call."""
+    with _handle_lock:
+        return _worksheet_handles.get(document, {}).get(title)
+
+
+def _grow_worksheet(document, title, rows):
+    """Add ``rows`` rows to a pooled worksheet.  Returns True on success."""
+    sheet = _pooled_handle(document, title) or get_pooled_worksheet(title, document)
+    try:
+        _google_call("write", sheet.add_rows, rows)
+    except Exception as e:
+        _invalidate_on_missing(e, document, title)
+        with _sync_state_lock:
+            failures = _grid_grow_failures.get((document, title), (0, 0.0))[0] + 1
+            delay = min(GRID_GROW_BACKOFF[1], GRID_GROW_BACKOFF[0] * (2 ** (failures - 1)))
+            _grid_grow_failures[(document, title)] = (failures, time.monotonic() + delay)
+        print(f"Grid capacity: could not add {rows} rows to '{title}': {e} (idle growth paused {delay:.0f}s)")
+        return False
+    with _sync_state_lock:
+        _grid_grow_failures.pop((document, title), None)
+    print(f"Grid capacity: '{title}' grown by {rows} rows to {sheet.row_count}")
+    return True
+
+
+def _ensure_grid_rows(document, title, last_row):
+    """Grow a worksheet before a write that would end at ``last_row``."""
+    sheet = _pooled_handle(document, title)
+    if sheet is None or last_row <= sheet.row_count:
+        return
+    _grow_worksheet(document, title, last_row - sheet.row_count + GRID_GROW_CHUNK)
+
+
+def _ensure_grid_cols(document, title, last_col):
+    """Widen a worksheet to at least ``last_col`` columns before writing a block.
+
+    Uses the pooled handle's ``col_count``, so it makes no API call once the
+    tab is wide enough.  Raises the API error if the tab cannot be widened.
+    """
+    sheet = _pooled_handle(document, title) or get_pooled_worksheet(title, document)
+    if sheet.col_count >= last_col:
+        return
+    try:
+        _google_call("write", sheet.add_cols, last_col - sheet.col_count)
+    except Exception as e:
+        _invalidate_on_missing(e, document, title)
+        raise
+    print(f"Grid capacity: '{title}' widened to {sheet.col_count} columns")
+
+
+def _group_last_col(action, group):
+    """Return the 1-based number of the last column a flush group writes."""
+    width = max([len(group["headers"])] + [len(row) for row in group["rows"]])
+    return (1 if action == "in" else 8) + width - 1
+
+
+def maintain_grid_capacity(document=None):
+    """Grow every tracked worksheet that is running low on spare rows.
+
+    Only uses locally known state (row cursors and pooled grid sizes), so it
+    makes no API calls unless a tab actually needs to grow.  Tabs whose last
+    growth failed are skipped until their GRID_GROW_BACKOFF delay has passed.
+
+    Returns:
+        int: Number of worksheets grown.
+    """
+    document = _resolve_document(document)
+    with _sync_state_lock:
+        last_used = {}
+        for (doc, title, _action), cursor in _row_cursors.items():
+            if doc == document:
+                last_used[title] = max(last_used.get(title, 1), cursor - 1)
+        backing_off = {title for (doc, title), (_, retry_at) in _grid_grow_failures.items()
+                       if doc == document and retry_at > time.monotonic()}
+    grown = 0
+    for title, last_row in last_used.items():
+        sheet = _pooled_handle(document, title)
+        if sheet is None or sheet.row_count - last_row >= GRID_LOW_WATER or title in backing_off:
+            continue
+        if _grow_worksheet(document, title, GRID_GROW_CHUNK):
+            grown += 1
+    return grown
+
+
+# --------------------------
+# Header Verification Cache
+# --------------------------
+# Header row last verified (read or written) per (spreadsheet, worksheet,
+# block).  A block's headers are only read from Google when the field set
+# being written differs from the cached one, so steady-state writes never
+# fetch row 1.  Cleared when the logging field toggles change in Options or
+# when a refresh sees headers that differ from the cache.
+_header_cache = {}  # (spreadsheet ID, worksheet title, "in"/"out") -> tuple of header labels
+
+
+def _headers_verified(document, title, action, headers):
+    """Return True when ``headers`` are known to already be in row 1 of the block."""
+    with _sync_state_lock:
+        return _header_cache.get((document, title, action)) == tuple(headers)
+
+
+def _remember_headers(document, title, action, headers):
+    """Record ``headers`` as the verified header row of a block."""
+    with _sync_state_lock:
+        _header_cache[(document, title, action)] = tuple(headers)
+
+
+def invalidate_header_cache(document=None, title=None):
+    """Forget verified headers so the next write re-checks row 1.
+
+    Args:
+        document: Spreadsheet ID.  Defaults to ``defaultDoc``.
+        title:    Limit to one worksheet; all worksheets when omitted.
+    """
+    if document is None:
+        document = defaultDoc
+    with _sync_state_lock:
+        for key in list(_header_cache.keys()):
+            if key[0] == document and (title is None or key[1] == title):
+                _header_cache.pop(key, None)
+
+
+def _observe_block_headers(document, title, action, header_cells):
+    """Drop a block's cached headers when a refresh shows a different header row."""
+    with _sync_state_lock:
+        cached = _header_cache.get((document, title, action))
+        if cached is None:
+            return
+        if tuple(header_cells[:len(cached)]) != cached:
+            _header_cache.pop((document, title, action), None)
+
+
+# --------------------------
+# Record ID Index
+# --------------------------
+# Every queued attendance record carries a stable record ID, written to a
+# hidden column right of its block (G for sign-in, N for sign-out).  Records
+# written in this session are kept in a bounded LRU index and skipped if they
+# come round again.  When a write fails in a way that may still have been
+# applied (timeout, network error, 5xx) -- or a record is replayed from the
+# journal after a crash -- its ID is marked ambiguous, and before it is
+# written again the tail of the record-ID column is read once to see whether
+# it already landed.  Retries therefore never add duplicate rows.
+RECORD_ID_HEADER = "Record ID"
+RECORD_ID_COLUMNS = {"in": 7, "out": 14}  # G and N: one past each six-column block
+RECORD_INDEX_SIZE = 20000                 # Record IDs remembered as written
+
+_record_index = OrderedDict()     # record ID -> (spreadsheet ID, worksheet title, "in"/"out", row or None)
+_ambiguous_writes = {}            # record ID -> first row the uncertain write could have used (None = unknown)
+_hidden_record_columns = set()    # (spreadsheet ID, worksheet title) whose record-ID columns are hidden
+
+
+def _with_record_id(action, headers, row, record_id):
+    """Extend a block's headers and row so the record ID lands in its hidden column."""
+    if not record_id:
+        return headers, row
+    width = RECORD_ID_COLUMNS[action] - (1 if action == "in" else 8)
+    headers = headers + [""] * (width - len(headers)) + [RECORD_ID_HEADER]
+    row = row + [""] * (width - len(row)) + [record_id]
+    return headers, row
+
+
+def _remember_written_records(document, title, action, record_ids, rows=None):
+    """Add record IDs that are now on the sheet to the LRU index.
+
+    ``rows`` (optional) gives the sheet row of each record, in the same order.
+    """
+    with _sync_state_lock:
+        for idx, record_id in enumerate(record_ids):
+            if not record_id:
+                continue
+            row = rows[idx] if rows is not None and idx < len(rows) else None
+            _record_index[record_id] = (document, title, action, row)
+            _record_index.move_to_end(record_id)
+            _ambiguous_writes.pop(record_id, None)
+        while len(_record_index) > RECORD_INDEX_SIZE:
+            _record_index.popitem(last=False)
+
+
+def _record_already_written(record_id):
+    with _sync_state_lock:
+        return record_id in _record_index
+
+
+def _record_location(record_id):
+    """Return ``(spreadsheet ID, title, action, row)`` for a record written this session, or None."""
+    with _sync_state_lock:
+        return _record_index.get(record_id)
+
+
+def _write_may_have_applied(exc):
+    """Return True when a failed write could still have reached the sheet."""
+    status = http_status_of(exc)
+    return status is None or status >= 500
+
+
+def _note_ambiguous_write(record_ids, from_row=None):
+    """Remember records whose write outcome is unknown so they are checked before a retry."""
+    with _sync_state_lock:
+        for record_id in record_ids:
+            if record_id and record_id not in _record_index:
+                previous = _ambiguous_writes.get(record_id, from_row)
+                if previous is None or from_row is None:
+                    _ambiguous_writes[record_id] = None
+                else:
+                    _ambiguous_writes[record_id] = min(previous, from_row)
+
+
+def _skip_written_records(spreadsheet, document, groups):
+    """Drop records that are already on the sheet from prepared attendance groups.
+
+    Records in the LRU index are dropped outright.  Ambiguous records are
+    looked up with one ``values.batchGet`` of the record-ID column tails of
+    the affected blocks.  Raises if that read fails, so nothing ambiguous is
+    written blind.
+
+    Returns:
+        list: Items that turned out to be written already.
+    """
+    skipped = []
+    checks = []  # (group key, first row to read)
+    with _sync_state_lock:
+        for key, group in groups.items():
+            keep = [idx for idx, item in enumerate(group["items"])
+                    if _attendance_journal_key(item) not in _record_index]
+            if len(keep) != len(group["items"]):
+                skipped.extend(item for idx, item in enumerate(group["items"]) if idx not in keep)
+                group["rows"] = [group["rows"][idx] for idx in keep]
+                group["items"] = [group["items"][idx] for idx in keep]
+            pending = [_attendance_journal_key(item) for item in group["items"]]
+            starts = [_ambiguous_writes[rid] for rid in pending if rid in _ambiguous_writes]
+            if starts:
+                checks.append((key, 2 if None in starts else max(2, min(starts))))
+
+    if checks:
+        ranges = []
+        for (target_sheet, action), from_row in checks:
+            col = _col_num_to_letter(RECORD_ID_COLUMNS[action])
+            ranges.append(_a1_range(target_sheet, f"{col}{from_row}:{col}"))
+        response = _google_call("read", spreadsheet.values_batch_get, ranges)
+        value_ranges = response.get("valueRanges", [])
+        for idx, (key, _) in enumerate(checks):
+            values = value_ranges[idx].get("values", []) if idx < len(value_ranges) else []
+            from_row = dict(checks)[key]
+            on_sheet = {row[0]: from_row + offset for offset, row in enumerate(values) if row}
+            group = groups[key]
+            found = [item for item in group["items"] if _attendance_journal_key(item) in on_sheet]
+            if found:
+                print(f"Background sync: {len(found)} retried sign-{key[1]} row(s) were already in '{key[0]}'; not rewriting")
+                found_ids = [_attendance_journal_key(i) for i in found]
+                _remember_written_records(document, key[0], key[1], found_ids, [on_sheet[rid] for rid in found_ids])
+                if _get_row_cursor(document, key[0], key[1]) is not None:
+                    # The write did land; the next rows go below it, not over it.
+                    _advance_row_cursor(document, key[0], key[1], max(on_sheet[rid] for rid in found_ids), 1)
+                found_ids = {id(i) for i in found}
+                keep = [idx for idx, item in enumerate(group["items"]) if id(item) not in found_ids]
+                group["rows"] = [group["rows"][idx] for idx in keep]
+                group["items"] = [group["items"][idx] for idx in keep]
+                skipped.extend(found)
+            with _sync_state_lock:
+                for item in group["items"]:
+                    _ambiguous_writes.pop(_attendance_journal_key(item), None)
+
+    for key in [key for key, group in groups.items() if not group["items"]]:
+        del groups[key]
+    return skipped
+
+
+def _hide_record_id_columns(spreadsheet, document, titles):
+    """Hide the record-ID columns (G and N) of worksheets not yet hidden this session."""
+    requests = []
+    hiding = []
+    for title in titles:
+        if (document, title) in _hidden_record_columns:
+            continue
+        try:
+            _ensure_grid_cols(document, title, max(RECORD_ID_COLUMNS.values()))
+            sheet_id = get_pooled_worksheet(title, document).id
+        except Exception:
+            continue
+        for col in RECORD_ID_COLUMNS.values():
+            requests.append({
+                "updateDimensionProperties": {
+                    "range": {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": col - 1, "endIndex": col},
+                    "properties": {"hiddenByUser": True},
+                    "fields": "hiddenByUser",
+                }
+            })
+        hiding.append(title)
+    if not requests:
+        return
+    try:
+        _google_call("write", spreadsheet.batch_update, {"requests": requests})
+    except Exception as e:
+        # Not remembered as hidden, so the next header write tries again.
+        print(f"Background sync: Could not hide record ID columns: {e}")
+        return
+    _hidden_record_columns.update((document, title) for title in hiding)
+
+
+def make_file_public(drive_service, file_id):
+    """Grant public read access to a Google Drive file.
+
+    Creates an "anyone with the link can view" permission on the file so
+    the resulting view URL can be stored in the attendance sheet without
+    requiring recipients to have a Google account.
+
+    Args:
+        drive_service: An authorised Drive v3 service object.
+        file_id:       The Drive file ID to make public.
+    """
+    permission = {
+        'role': 'reader',
+        'type': 'anyone'
+    }
+    request = drive_service.permissions().create(
+        fileId=file_id,
+        body=permission
+    )
+    _google_call("drive", request.execute)
+
+
+# --------------------------
+# Photo Folders
+# --------------------------
+# Photos are uploaded into one app-owned folder per spreadsheet, with one
+# subfolder per student.  The top folder is shared "anyone with the link can
+# view" once, when it is created.  Files inherit that access, so an upload
+# is a single files.create call with no permissions.create after it.
+# Folder IDs are cached in memory and in the journal database (table
+# drive_folders), so finding a folder costs no API call after the first
+# time, even across restarts.  The cache is cleared on sign-out, and a
+# spreadsheet's entries are dropped when Drive reports a folder missing.
+PHOTO_FOLDER_MIME = "application/vnd.google-apps.folder"
+_photo_folders_lock = threading.RLock()  # Held while folders are created so none is made twice
+_photo_folders = {}                       # (spreadsheet ID, student ID or "") -> Drive folder ID
+
+
+def _load_photo_folder(document, key):
+    try:
+        with _journal_lock:
+            row = _get_journal().execute(
+                "SELECT folder_id FROM drive_folders WHERE document = ? AND folder_key = ?", (document, key)
+            ).fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"Photo folders: could not read folder cache: {e}")
+        return None
+
+
+def _store_photo_folder(document, key, folder_id):
+    try:
+        with _journal_lock:
+            _get_journal().execute(
+                "INSERT OR REPLACE INTO drive_folders (document, folder_key, folder_id) VALUES (?, ?, ?)",
+                (document, key, folder_id)
+            )
+        _schedule_journal_sync()
+    except Exception as e:
+        print(f"Photo folders: could not cache folder {folder_id}: {e}")
+
+
+def _create_drive_folder(drive_service, name, parent_id=None):
+    body = {"name": name, "mimeType": PHOTO_FOLDER_MIME}
+    if parent_id:
+        body["parents"] = [parent_id]
+    request = drive_service.files().create(body=body, fields="id")
+    return _google_call("drive", request.execute)["id"]
+
+
+def _cached_photo_folder(document, key):
+    """Return a folder ID from memory or the local database (no API call)."""
+    folder_id = _photo_folders.get((document, key))
+    if folder_id is None:
+        folder_id = _load_photo_folder(document, key)
+        if folder_id is not None:
+            _photo_folders[(document, key)] = folder_id
+    return folder_id
+
+
+def get_photo_folder(drive_service, document=None, student_id=None, student_name=None):
+    """Return the Drive folder photos should be uploaded into, creating it on first use.
+
+    Args:
+        drive_service: An authorised Drive v3 service object.
+        document:      Spreadsheet ID the photos belong to.  Defaults to ``defaultDoc``.
+        student_id:    When given, the student's subfolder is returned instead
+                       of the spreadsheet's top photos folder.
+        student_name:  Used to name a new student subfolder.
+
+    Returns:
+        str: The Drive folder ID.
+    """
+    document = _resolve_document(document)
+    with _photo_folders_lock:
+        root_id = _cached_photo_folder(document, "")
+        if root_id is None:
+            try:
+                title = setup_google_sheet(document).title
+            except Exception:
+                title = document
+            root_id = _create_drive_folder(drive_service, f"{title} - Attendance Photos")
+            make_file_public(drive_service, root_id)
+            _photo_folders[(document, "")] = root_id
+            _store_photo_folder(document, "", root_id)
+            print(f"Photo folders: created shared photos folder for '{title}'")
+        if student_id is None:
+            return root_id
+
+        key = str(student_id)
+        folder_id = _cached_photo_folder(document, key)
+        if folder_id is None:
+            name = f"{student_name} ({key})" if student_name else key
+            folder_id = _create_drive_folder(drive_service, name, root_id)
+            _photo_folders[(document, key)] = folder_id
+            _store_photo_folder(document, key, folder_id)
+        return folder_id
+
+
+def forget_photo_folders(document=None):
+    """Drop cached photo folder IDs for one spreadsheet, or for all of them."""
+    with _photo_folders_lock:
+        for cache_key in [k for k in _photo_folders if document is None or k[0] == document]:
+            del _photo_folders[cache_key]
+        try:
+            with _journal_lock:
+                if document is None:
+                    _get_journal().execute("DELETE FROM drive_folders")
+                else:
+                    _get_journal().execute("DELETE FROM drive_folders WHERE document = ?", (document,))
+        except Exception as e:
+            print(f"Photo folders: could not clear folder cache: {e}")
+
+
+def upload_image_to_drive(drive_service, file_path, parent_id=None, image_bytes=None):
+    """Upload an image to Google Drive and return its public view URL.
+
+    With ``parent_id`` (a folder from ``get_photo_folder``) the file lands
+    in that already-shared folder and the upload is a single call.  Without
+    it the file goes to the Drive root and is made public with
+    ``make_file_public``.  Returns the ``webViewLink`` so it can be stored
+    in the attendance spreadsheet.
+
+    Args:
+        drive_service: An authorised Drive v3 service object.
+        file_path:     Path of the JPEG on disk; with ``image_bytes`` only its
+                       base name is used, as the Drive file name.
+        parent_id:     Optional Drive folder ID to upload into.
+        image_bytes:   Optional encoded JPEG to upload from memory instead of
+                       reading ``file_path``.
+
+    Returns:
+        str: The ``webViewLink`` URL of the uploaded file.
+    """
+    file_name = os.path.basename(file_path)
+    file_metadata = {
+        'name': file_name,
+    }
+    if parent_id:
+        file_metadata['parents'] = [parent_id]
+    if image_bytes is not None:
+        media = MediaIoBaseUpload(io.BytesIO(image_bytes), mimetype='image/jpeg')
+    else:
+        media = MediaFileUpload(file_path, mimetype='image/jpeg')  # Adjust mimetype if needed
+
+    # Upload file
+    request = drive_service.files().create(
+        body=file_metadata,
+        media_body=media,
+        fields='id, webViewLink, webContentLink'
+    )
+    file = _google_call("drive", request.execute)
+
+    # Files in a photos folder inherit its link sharing
+    if not parent_id:
+        make_file_public(drive_service, file.get('id'))
+
+    # Get the file's webViewLink to share
+    file_url = file.get('webViewLink')
+    print(f"File uploaded successfully. File URL: {file_url}")
+    return file_url
+
+
+# --------------------------
+# IDs Sheet Functions
+# --------------------------
+IDS_SHEET_NAME = "IDs"  # Reserved worksheet name that stores Name/ID pairs; never used as an attendance tab
+
+# --------------------------
+# Local ID Cache
+# --------------------------
+# IDs and names live in a CompactIdIndex (see id_index): an array slot per
+# 6-digit ID pointing into an interned name table, so lookups are O(1) without
+# string conversion and a 50k-student roster takes a few megabytes.
+# id_index is a published copy: it is never modified after being assigned.
+# Every change (a sheet refresh, a newly registered ID) builds a new index and
+# swaps it in with one reference assignment, so a scan looking an ID up while
+# the IDs sheet is being refreshed always sees either the old or the new
+# mapping -- never a half-cleared one.  The sources it is built from are
+# guarded by _ids_cache_lock:
+#   _sheet_ids        -- CompactIdIndex of rows known to be on the IDs sheet;
+#                        also the index the ID lane checks for duplicates.
+#   _pending_new_ids  -- IDs registered locally that are not on the sheet yet.
+id_index = CompactIdIndex()
+_ids_cache_lock = threading.Lock()
+_sheet_ids = CompactIdIndex()
+_pending_new_ids = {}
+
+# Maximum number of new ID/name rows appended by one batched flush
+ID_FLUSH_LIMIT = 200
+
+# Queue for new IDs that need to be uploaded to the sheet in the background
+new_id_queue = queue.Queue()
+
+# Queue for attendance records that need to be pushed to Google in the background
+# Items are tuples: (current_id, name, attendance_record, event, reason, action,
+#                    hasPic, folder, picName, volunteering_list, logging_fields, record_id)
+attendance_queue = queue.Queue()
+
+# Queue for attendance records whose row is written but whose photo still has
+# to be uploaded; the photo lane uploads them and backfills their Image Link
+photo_queue = queue.Queue()
+_uploaded_images_lock = threading.Lock()
+_uploaded_image_urls = {}    # record ID -> Drive view URL, kept until its link cell is filled in
+_photo_lane_records = set()  # record IDs on the photo lane (queued or awaiting retry)
+_pending_photo_bytes = {}    # record ID -> (file path, JPEG bytes) for photos never written to disk
+_photo_upload_pool = None    # ThreadPoolExecutor created on first upload
+PHOTO_UPLOAD_WORKERS = 4     # Photo uploads run concurrently by the photo lane
+PENDING_IMAGE_LINK = "Pending upload"  # Image Link placeholder until the photo lane backfills it
+
+# Maximum number of attendance records written by one batched flush
+ATTENDANCE_FLUSH_LIMIT = 500
+
+# Background sync lane threads (see "Sync Lanes"); background_sync_thread is the attendance lane
+background_sync_thread = None
+background_sync_running = False
+
+
+# --------------------------
+# Durable Sync Journal
+# --------------------------
+# Every queued attendance record, photo upload and new ID/name pair is appended to an
+# SQLite journal next to settings.json before it is placed on its in-memory
+# queue, marked done once Google has it, and replayed into the queues on the
+# next startup.  The database runs in WAL mode with synchronous=NORMAL so an
+# append is a cheap in-memory commit; a background thread then checkpoints
+# (fsyncs) the WAL at most every JOURNAL_SYNC_INTERVAL seconds, batching the
+# disk syncs of a scanner burst into one.
+SYNC_JOURNAL_FILE = os.path.join(_get_persistent_path(), "sync_journal.db")
+JOURNAL_SYNC_INTERVAL = 0.25         # Seconds between batched WAL fsyncs while records arrive
+JOURNAL_DONE_RETENTION = 7 * 86400   # Seconds to keep completed entries before pruning them
+# Records that failed permanently are moved to the dead_letters table (and
+# their journal entry marked 'dead' so it is not replayed) until they are
+# retried or exported from Options -> Sync Queue.
+
+_journal_lock = threading.RLock()
+_journal_conn = None                  # Shared sqlite3 connection (opened lazily)
+_journal_dirty = threading.Event()    # Set when commits are waiting for an fsync
+_journal_sync_thread = None
+_journal_queued_keys = set()          # Journal keys currently sitting in an in-memory queue
+
+
+def _get_journal():
+    """Return the shared journal connection, creating the database on first use."""
+    global _journal_conn
+    with _journal_lock:
+        if _journal_conn is None:
+            conn = sqlite3.connect(SYNC_JOURNAL_FILE, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal ("
+                " entry_key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " document TEXT NOT NULL DEFAULT '',"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                " done_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS journal_status ON journal (status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                " entry_key TEXT PRIMARY KEY,"
+                " lane TEXT NOT NULL,"
+                " document TEXT NOT NULL DEFAULT '',"
+                " payload TEXT NOT NULL,"
+                " error TEXT NOT NULL,"
+                " status_code INTEGER,"
+                " attempts INTEGER NOT NULL,"
+                " failed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS drive_folders ("
+                " document TEXT NOT NULL,"
+                " folder_key TEXT NOT NULL,"
+                " folder_id TEXT NOT NULL,"
+                " PRIMARY KEY (document, folder_key))"
+            )
+            conn.execute(
+                "DELETE FROM journal WHERE status = 'done' AND done_at < ?",
+                (time.time() - JOURNAL_DONE_RETENTION,)
+            )
+            _journal_conn = conn
+        return _journal_conn
+
+
+def _journal_sync_worker():
+    """Checkpoint the WAL shortly after commits so bursts share one fsync."""
+    while True:
+        _journal_dirty.wait()
+        time.sleep(JOURNAL_SYNC_INTERVAL)
+        _journal_dirty.clear()
+        try:
+            with _journal_lock:
+                _get_journal().execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except Exception as e:
+            print(f"Sync journal: checkpoint failed: {e}")
+
+
+def _schedule_journal_sync():
+    """Wake (starting if needed) the batched-fsync thread."""
+    global _journal_sync_thread
+    with _journal_lock:
+        if _journal_sync_thread is None:
+            _journal_sync_thread = threading.Thread(
+                target=_journal_sync_worker, daemon=True, name="SyncJournalFsync"
+            )
+            _journal_sync_thread.start()
+    _journal_dirty.set()
+
+
+def _journal_append(kind, entry_key, payload, document=None):
+    """Persist one pending queue entry.  Returns False if the journal is unavailable."""
+    if document is None:
+        document = defaultDoc
+    try:
+        with _journal_lock:
+            _get_journal().execute(
+                "INSERT OR IGNORE INTO journal (entry_key, kind, document, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (entry_key, kind, document or "", json.dumps(payload), time.time())
+            )
+            _journal_queued_keys.add(entry_key)
+        _schedule_journal_sync()
+        return True
+    except Exception as e:
+        print(f"Sync journal: could not persist {kind} entry {entry_key}: {e}")
+        return False
+
+
+def _journal_mark_done(entry_keys):
+    """Mark journal entries as uploaded in one transaction."""
+    entry_keys = [k for k in entry_keys if k]
+    if not entry_keys:
+        return
+    try:
+        with _journal_lock:
+            conn = _get_journal()
+            now = time.time()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "UPDATE journal SET status = 'done', done_at = ? WHERE entry_key = ?",
+                [(now, key) for key in entry_keys]
+            )
+            conn.execute("COMMIT")
+            _journal_queued_keys.difference_update(entry_keys)
+        _schedule_journal_sync()
+    except Exception as e:
+        print(f"Sync journal: could not mark {len(entry_keys)} entries done: {e}")
+
+
+def _id_journal_key(student_id):
+    """Return the journal key for a new ID/name pair."""
+    return f"id:{student_id}"
+
+
+def _attendance_journal_key(item):
+    """Return the journal key (record ID) carried by an attendance queue item."""
+    return item[11] if len(item) >= 12 else None
+
+
+def _photo_journal_key(record_id):
+    """Return the journal key for the photo upload of an attendance record."""
+    return f"photo:{record_id}"
+
+
+def queue_attendance_record(record, image_bytes=None):
+    """Journal an attendance record and queue it for background upload.
+
+    Args:
+        record:      Attendance tuple ``(current_id, name, attendance_record, event,
+                     reason, action, hasPic, folder, picName, volunteering_list,
+                     logging_fields)``.  A stable record ID is appended so the
+                     journal entry can be marked done after upload.
+        image_bytes: Optional encoded JPEG held in memory instead of a file at
+                     ``folder/picName``.  It is uploaded straight from memory
+                     and only written to that path if it cannot be uploaded
+                     in this session (see ``spill_pending_photos``).
+
+    Returns:
+        str: The record ID assigned to the queued record.
+    """
+    record_id = uuid.uuid4().hex
+    item = tuple(record[:11]) + (record_id,)
+    _journal_append("attendance", record_id, list(item))
+    unpacked = _unpack_attendance_item(item)
+    if _needs_photo_upload(unpacked):
+        if image_bytes is not None:
+            with _uploaded_images_lock:
+                _pending_photo_bytes[record_id] = (_photo_file_path(unpacked), image_bytes)
+        # Journaled now so the upload survives a crash; queued once the row is written.
+        _journal_append("photo", _photo_journal_key(record_id), list(item))
+    _enqueue_attendance_item(item)
+    return record_id
+
+
+def _enqueue_attendance_item(item):
+    """Queue an attendance item for its row to be written."""
+    _sync_lanes["attendance"].put(item)
+
+
+def _queue_photo_upload(item):
+    """Put a written record on the photo lane unless it is already there."""
+    record_id = _attendance_journal_key(item)
+    with _uploaded_images_lock:
+        if record_id in _photo_lane_records:
+            return
+        _photo_lane_records.add(record_id)
+    _sync_lanes["photos"].put(item)
+
+
+def replay_sync_journal(document=None):
+    """Re-queue journal entries that were never uploaded (e.g. after a crash).
+
+    Entries already sitting in an in-memory queue are skipped, so this is safe
+    to call more than once.  Replayed ID/name pairs are also restored into the
+    local ID cache so those students are recognised immediately.
+
+    Returns:
+        int: Number of entries placed back on the queues.
+    """
+    if document is None:
+        document = defaultDoc
+    try:
+        with _journal_lock:
+            rows = _get_journal().execute(
+                "SELECT entry_key, kind, payload FROM journal"
+                " WHERE status = 'pending' AND document IN (?, '') ORDER BY created_at",
+                (document or "",)
+            ).fetchall()
+    except Exception as e:
+        print(f"Sync journal: could not read pending entries: {e}")
+        return 0
+
+    replayed = 0
+    for entry_key, kind, payload in rows:
+        with _journal_lock:
+            if entry_key in _journal_queued_keys:
+                continue
+            if kind == "photo" and not _photo_row_written(entry_key):
+                continue   # Queued when its row is written (or its dead letter is retried)
+            _journal_queued_keys.add(entry_key)
+        try:
+            item = tuple(json.loads(payload))
+        except Exception as e:
+            print(f"Sync journal: skipping unreadable entry {entry_key}: {e}")
+            continue
+        if kind == "photo":
+            _queue_photo_upload(item)
+        elif kind == "id":
+            student_id, name = item
+            _add_pending_id(str(student_id), name)
+            _sync_lanes["ids"].put(item)
+        else:
+            # The previous session may have written it without marking it done.
+            _note_ambiguous_write([_attendance_journal_key(item)])
+            _enqueue_attendance_item(item)
+        replayed += 1
+
+    if replayed:
+        print(f"Sync journal: replayed {replayed} pending record(s) from last session")
+    return replayed
+
+
+def _photo_row_written(photo_key):
+    """Return True unless the row of a journaled photo upload is still pending or dead."""
+    record_id = photo_key.split(":", 1)[1]
+    row = _get_journal().execute("SELECT status FROM journal WHERE entry_key = ?", (record_id,)).fetchone()
+    return row is None or row[0] == "done"
+
+
+def _sync_item_key(lane, item):
+    """Return the journal key of a lane item (IDs, attendance rows and photo uploads have their own)."""
+    if lane == "ids":
+        return _id_journal_key(item[0])
+    record_id = _attendance_journal_key(item)
+    if lane == "photos" and record_id:
+        return _photo_journal_key(record_id)
+    return record_id or uuid.uuid4().hex
+
+
+def _journal_dead_letter(lane, failures, document=None):
+    """Move permanently failed items into the dead-letter table.
+
+    Args:
+        lane:     Sync lane the items came from ("ids", "attendance", "photos").
+        failures: ``(item, error, attempts)`` tuples.
+    """
+    if document is None:
+        document = defaultDoc
+    now = time.time()
+    rows = []
+    for item, error, attempts in failures:
+        key = _sync_item_key(lane, item)
+        rows.append((key, lane, document or "", json.dumps(list(item)), str(error) or type(error).__name__,
+                     http_status_of(error), attempts, now))
+        print(f"Background sync: Gave up on {lane} item {key} after {attempts} attempt(s): {error}")
+    try:
+        with _journal_lock:
+            conn = _get_journal()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO dead_letters"
+                " (entry_key, lane, document, payload, error, status_code, attempts, failed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.executemany("UPDATE journal SET status = 'dead' WHERE entry_key = ?", [(r[0],) for r in rows])
+            conn.execute("COMMIT")
+            _journal_queued_keys.difference_update(r[0] for r in rows)
+        _schedule_journal_sync()
+    except Exception as e:
+        print(f"Sync journal: could not store {len(rows)} dead letter(s): {e}")
+
+
+def list_dead_letters(document=None):
+    """Return dead-lettered records, newest first.
+
+    Args:
+        document: Only return records for this spreadsheet (default: all).
+
+    Returns:
+        list: Dicts with ``entry_key``, ``lane``, ``document``, ``payload``,
+              ``error``, ``status_code``, ``attempts`` and ``failed_at``.
+    """
+    query = ("SELECT entry_key, lane, document, payload, error, status_code, attempts, failed_at"
+             " FROM dead_letters")
+    params = ()
+    if document is not None:
+        query += " WHERE document IN (?, '')"
+        params = (document,)
+    try:
+        with _journal_lock:
+            rows = _get_journal().execute(query + " ORDER BY failed_at DESC", params).fetchall()
+    except Exception as e:
+        print(f"Sync journal: could not read dead letters: {e}")
+        return []
+    columns = ("entry_key", "lane", "document", "payload", "error", "status_code", "attempts", "failed_at")
+    letters = []
+    for row in rows:
+        letter = dict(zip(columns, row))
+        letter["payload"] = json.loads(letter["payload"])
+        letters.append(letter)
+    return letters
+
+
+def retry_dead_letters(entry_keys=None, document=None):
+    """Put dead-lettered records for the active spreadsheet back on the sync queues.
+
+    Args:
+        entry_keys: Keys to retry (default: every dead letter for ``document``).
+        document:   Spreadsheet the records belong to (default: the active one).
+
+    Returns:
+        int: Number of records re-queued.
+    """
+    if document is None:
+        document = defaultDoc
+    letters = list_dead_letters(document)
+    if entry_keys is not None:
+        wanted = set(entry_keys)
+        letters = [letter for letter in letters if letter["entry_key"] in wanted]
+    if not letters:
+        return 0
+    keys = [letter["entry_key"] for letter in letters]
+    try:
+        with _journal_lock:
+            conn = _get_journal()
+            conn.execute("BEGIN")
+            conn.executemany("DELETE FROM dead_letters WHERE entry_key = ?", [(k,) for k in keys])
+            conn.executemany("UPDATE journal SET status = 'pending' WHERE entry_key = ?", [(k,) for k in keys])
+            conn.execute("COMMIT")
+            _journal_queued_keys.update(keys)
+        _schedule_journal_sync()
+    except Exception as e:
+        print(f"Sync journal: could not re-queue dead letters: {e}")
+        return 0
+
+    for letter in sorted(letters, key=lambda l: l["failed_at"]):
+        item = tuple(letter["payload"])
+        if letter["lane"] == "ids":
+            _sync_lanes["ids"].put(item)
+        elif letter["lane"] == "photos":
+            _queue_photo_upload(item)
+        else:
+            _enqueue_attendance_item(item)
+    print(f"Sync journal: re-queued {len(letters)} dead-lettered record(s)")
+    return len(letters)
+
+
+def export_dead_letters(file_path, document=None):
+    """Write dead-lettered records to ``file_path`` as CSV (``.csv``) or JSON.
+
+    Returns:
+        int: Number of records exported.
+    """
+    letters = list_dead_letters(document)
+    if file_path.lower().endswith(".csv"):
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["entry_key", "lane", "document", "failed_at", "attempts", "status_code", "error", "payload"])
+            for letter in letters:
+                writer.writerow([
+                    letter["entry_key"], letter["lane"], letter["document"],
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(letter["failed_at"])),
+                    letter["attempts"], letter["status_code"] or "", letter["error"],
+                    json.dumps(letter["payload"]),
+                ])
+    else:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(letters, f, indent=2)
+    return len(letters)
+
+
+def close_sync_journal():
+    """Checkpoint and close the journal (call on shutdown)."""
+    global _journal_conn
+    with _journal_lock:
+        if _journal_conn is None:
+            return
+        try:
+            _journal_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            _journal_conn.close()
+        except Exception as e:
+            print(f"Sync journal: error closing journal: {e}")
+        _journal_conn = None
+
+def ensure_ids_sheet_exists(document=None):
+    """
+    Ensure the 'IDs' subsheet exists in the spreadsheet.
+    Creates it if it doesn't exist with headers 'Name' and 'ID'.
+    Returns the worksheet object.
+    """
+    document = _resolve_document(document)
+    handles = _get_worksheet_handles(document)
+    if IDS_SHEET_NAME not in handles:
+        # Pooled tab list may be stale; confirm before creating a duplicate.
+        handles = _get_worksheet_handles(document, refresh=True)
+
+    if IDS_SHEET_NAME in handles:
+        return handles[IDS_SHEET_NAME]
+    else:
+        # Create the IDs sheet
+        spreadsheet = setup_google_sheet(document)
+        ids_sheet = _google_call("write", spreadsheet.add_worksheet, title=IDS_SHEET_NAME, rows=1000, cols=2)
+        with _handle_lock:
+            _worksheet_handles.setdefault(document, {})[IDS_SHEET_NAME] = ids_sheet
+        # Add headers
+        _google_call("write", ids_sheet.update_acell, 'A1', 'Name')
+        _google_call("write", ids_sheet.update_acell, 'B1', 'ID')
+        print(f"Created '{IDS_SHEET_NAME}' sheet with headers.")
+        return ids_sheet
+
+
+# --------------------------
+# ID Cache Snapshot
+# --------------------------
+# The ID caches are saved to a small JSON file next to settings.json and loaded
+# at launch (load_ids_snapshot), so a scan resolves to a name straight away --
+# even offline -- instead of prompting for a name until the IDs sheet has been
+# downloaded.  The snapshot remembers how many sheet rows it has seen and the
+# last of them (the "anchor"); load_ids_cache then reads only ``A{last_row}:B``
+# and merges the rows past the anchor.  If the anchor no longer matches (rows
+# deleted or re-sorted) or IDS_FULL_RELOAD_INTERVAL has passed, the whole sheet
+# is re-read so edits above the anchor are picked up too.  IDs registered
+# locally but not yet uploaded are saved separately so they are never taken
+# for rows already on the sheet.  A name typed at the kiosk does not save the
+# snapshot on the UI thread (a large roster takes over 100 ms to write); it
+# schedules a save on a timer thread, and further names typed before it
+# fires are saved by that same write.
+IDS_CACHE_FILE = os.path.join(_get_persistent_path(), "ids_cache.json")
+IDS_FULL_RELOAD_INTERVAL = 3600.0   # Seconds between full re-reads of the IDs sheet
+IDS_SNAPSHOT_DELAY = 2.0            # Seconds a scheduled snapshot save waits for more changes
+
+_ids_snapshot_lock = threading.Lock()
+_ids_snapshot_timer = None     # Pending scheduled save (threading.Timer), if any
+_ids_snapshot_timer_lock = threading.Lock()
+# Serialises sheet reads with the ID lane's appends, so a refresh that read the
+# sheet before an append cannot swap in an index that lacks the appended rows.
+_ids_reconcile_lock = threading.RLock()
+_ids_sync_state = {            # What _sheet_ids was last reconciled against
+    "document": None,          # Spreadsheet the caches belong to
+    "last_row": 0,             # Sheet rows (including the header) already merged
+    "anchor": None,            # [name, id] of row last_row, used to detect edits
+    "full_loaded_at": 0.0,     # time.time() of the last full read
+}
+
+
+def _ids_row(row):
+    """Return a sheet row as a [name, id] pair of strings."""
+    row = list(row[:2]) + [""] * (2 - len(row[:2]))
+    return [str(row[0]), str(row[1])]
+
+
+def _sheet_rows_to_ids(rows, into=None):
+    """Add Name/ID rows to ``into`` (a new CompactIdIndex by default) and return it."""
+    ids = CompactIdIndex() if into is None else into
+    for row in rows:
+        name, student_id = _ids_row(row)
+        if name and student_id:  # Both name and ID must exist
+            ids.add(student_id, name)
+    return ids
+
+
+def _publish_id_caches():
+    """Copy the sheet index, add pending IDs and swap the result in as id_index.
+
+    Must be called with _ids_cache_lock held.
+    """
+    global id_index
+    index = _sheet_ids.copy()
+    for student_id, name in _pending_new_ids.items():
+        if student_id not in index:
+            index.add(student_id, name)   # A newly registered name wins, as before
+    id_index = index
+
+
+def _add_pending_id(student_id_str, name):
+    """Record a locally registered ID and publish it.  Returns False if it was already known."""
+    with _ids_cache_lock:
+        if student_id_str in id_index:
+            return False
+        _pending_new_ids[student_id_str] = name
+        _publish_id_caches()
+    return True
+
+
+def _save_ids_snapshot():
+    """Write the ID caches and reconcile position to IDS_CACHE_FILE atomically."""
+    with _ids_cache_lock:
+        if not _ids_sync_state["document"]:
+            return
+        snapshot = dict(_ids_sync_state)
+        snapshot["ids"] = dict(_sheet_ids.items())
+        snapshot["pending"] = dict(_pending_new_ids)
+    with _ids_snapshot_lock:
+        tmp_path = IDS_CACHE_FILE + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp_path, IDS_CACHE_FILE)
+        except Exception as e:
+            print(f"Error saving IDs cache snapshot: {e}")
+
+
+def _schedule_ids_snapshot():
+    """Save the snapshot on a timer thread IDS_SNAPSHOT_DELAY seconds from now.
+
+    Does nothing if a save is already scheduled; that save reads the caches
+    when it runs, so it includes this change.
+    """
+    global _ids_snapshot_timer
+    with _ids_snapshot_timer_lock:
+        if _ids_snapshot_timer is not None:
+            return
+        _ids_snapshot_timer = threading.Timer(IDS_SNAPSHOT_DELAY, _run_scheduled_ids_snapshot)
+        _ids_snapshot_timer.daemon = True
+        _ids_snapshot_timer.name = "IdsSnapshot"
+        _ids_snapshot_timer.start()
+
+
+def _run_scheduled_ids_snapshot():
+    global _ids_snapshot_timer
+    with _ids_snapshot_timer_lock:
+        _ids_snapshot_timer = None   # Changes made during the save schedule another
+    _save_ids_snapshot()
+
+
+def _flush_ids_snapshot():
+    """Run a scheduled snapshot save now (at shutdown, so it is not lost)."""
+    global _ids_snapshot_timer
+    with _ids_snapshot_timer_lock:
+        timer, _ids_snapshot_timer = _ids_snapshot_timer, None
+    if timer is not None:
+        timer.cancel()
+        _save_ids_snapshot()
+
+
+def load_ids_snapshot(document=None):
+    """
+    Load the ID caches from the local snapshot file.  No Google API calls are made.
+
+    Call at launch, before the IDs sheet is read, so scans resolve to names
+    immediately.  A snapshot saved for a different spreadsheet is ignored.
+
+    Returns:
+        bool: True if the snapshot was loaded, False otherwise
+    """
+    global _sheet_ids
+    try:
+        document = _resolve_document(document)
+        with open(IDS_CACHE_FILE, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("document") != document:
+            return False
+        sheet_ids = CompactIdIndex((str(k), str(v)) for k, v in snapshot.get("ids", {}).items())
+        pending = {str(k): str(v) for k, v in snapshot.get("pending", {}).items()}
+        with _ids_reconcile_lock, _ids_cache_lock:
+            _sheet_ids = sheet_ids
+            for student_id, name in pending.items():
+                _pending_new_ids.setdefault(student_id, name)
+            _publish_id_caches()
+            _ids_sync_state.update({
+                "document": document,
+                "last_row": int(snapshot.get("last_row", 0)),
+                "anchor": snapshot.get("anchor"),
+                "full_loaded_at": float(snapshot.get("full_loaded_at", 0.0)),
+            })
+        print(f"Loaded {len(id_index)} IDs from local snapshot")
+        return True
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        print(f"Error loading IDs cache snapshot: {e}")
+        return False
+
+
+def _reconcile_ids_sheet(document, ids_sheet, full=False):
+    """Bring _sheet_ids up to date with the IDs sheet and republish the caches.
+
+    Reads only the rows past the last one seen when possible (see "ID Cache
+    Snapshot").  The new index is built without holding _ids_cache_lock, so
+    lookups and registrations carry on during the read.  Raises on API errors.
+    """
+    global _sheet_ids
+    with _ids_reconcile_lock:
+        state = _ids_sync_state
+        last_row = state["last_row"]
+        if (not full and state["document"] == document and last_row >= 1
+                and time.time() - state["full_loaded_at"] < IDS_FULL_RELOAD_INTERVAL):
+            # Read from the anchor row down; trailing empty rows are omitted.
+            tail = _google_call("read", ids_sheet.get, f"A{last_row}:B")
+            tail = [_ids_row(row) for row in tail]
+            if tail and tail[0] == state["anchor"]:
+                new_rows = tail[1:]
+                if new_rows:
+                    with _ids_cache_lock:
+                        before = len(_sheet_ids)
+                        _sheet_rows_to_ids(new_rows, into=_sheet_ids)
+                        added = len(_sheet_ids) - before
+                        _publish_id_caches()
+                        state["last_row"] = last_row + len(new_rows)
+                        state["anchor"] = new_rows[-1]
+                    _save_ids_snapshot()
+                    print(f"IDs cache reconciled: {added} new ID(s) from {len(new_rows)} new row(s)")
+                return
+            print("IDs sheet changed above the last known row; reloading it in full")
+
+        # Fetch all data at once (more efficient than multiple cell lookups)
+        all_values = _google_call("read", ids_sheet.get_all_values)
+        # Skip header row (index 0); build the new index before taking the lock
+        sheet_ids = _sheet_rows_to_ids(all_values[1:])
+        with _ids_cache_lock:
+            if state["document"] not in (None, document):
+                _pending_new_ids.clear()   # Pending IDs belong to the previous spreadsheet's journal
+            _sheet_ids = sheet_ids
+            _publish_id_caches()
+            state.update({
+                "document": document,
+                "last_row": len(all_values),
+                "anchor": _ids_row(all_values[-1]) if all_values else None,
+                "full_loaded_at": time.time(),
+            })
+        _save_ids_snapshot()
+        print(f"Loaded {len(sheet_ids)} IDs into local cache")
+
+
+def load_ids_cache(document=None, full=False):
+    """
+    Bring the local ID caches up to date with the "IDs" sheet.
+
+    When the caches already hold a snapshot of this spreadsheet, only the rows
+    past the last one seen are fetched; otherwise (or with ``full=True``, or
+    once IDS_FULL_RELOAD_INTERVAL has passed) the whole sheet is re-read.
+    The new mapping is swapped in at once and keeps IDs that are still
+    waiting to be uploaded, so lookups never miss during a refresh.
+    
+    Args:
+        document: The Google Spreadsheet document name
+        full:     Re-read the whole sheet even if an incremental read would do
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        document = _resolve_document(document)
+        ids_sheet = ensure_ids_sheet_exists(document)
+        _reconcile_ids_sheet(document, ids_sheet, full=full)
+        return True
+        
+    except Exception as e:
+        _invalidate_on_missing(e, document, IDS_SHEET_NAME)
+        print(f"Error loading IDs cache: {e}")
+        return False
+
+
+def _process_id_batch(items, document):
+    """ID lane processor: append every new ID/name pair in one batched write.
+
+    The tail of the IDs sheet is reconciled first (one small read) so the
+    duplicate check against the local index also sees IDs registered from
+    other kiosks; pairs already on the sheet, or repeated in the batch, are
+    skipped.  The remaining pairs go out as full Name/ID rows in a single
+    ``values.append``.  Any error fails the whole batch so the lane retries it;
+    the append is not retried in place, so rows that did land despite a 5xx
+    are found by the next reconcile instead of being appended twice.
+    """
+    try:
+        with _ids_reconcile_lock:
+            ids_sheet = ensure_ids_sheet_exists(document)
+            _reconcile_ids_sheet(_resolve_document(document), ids_sheet)
+            rows = []
+            with _ids_cache_lock:
+                for student_id, name in items:
+                    student_id_str = str(student_id)
+                    if student_id_str in _sheet_ids:
+                        print(f"Background sync: ID {student_id_str} already exists in sheet, skipping")
+                        continue
+                    rows.append([name, student_id_str])
+                    _sheet_ids.add(student_id_str, name)   # Also de-duplicates repeats within the batch
+            if not rows:
+                return []
+            try:
+                _google_call_once(
+                    "write", setup_google_sheet(document).values_append,
+                    _a1_range(IDS_SHEET_NAME, "A1:B"),
+                    params={"valueInputOption": "RAW", "insertDataOption": APPEND_INSERT_DATA_OPTION},
+                    body={"values": rows},
+                )
+            except Exception:
+                with _ids_cache_lock:
+                    for _, student_id_str in rows:
+                        _sheet_ids.discard(student_id_str)
+                raise
+        print(f"Background sync: Added {len(rows)} new ID(s) to '{IDS_SHEET_NAME}'")
+        return []
+    except Exception as e:
+        _invalidate_on_missing(e, document, IDS_SHEET_NAME)
+        print(f"Background sync: Error registering {len(items)} new ID(s): {e}")
+        raise
+
+
+def _mark_ids_done(items):
+    _journal_mark_done([_id_journal_key(item[0]) for item in items])
+    with _ids_cache_lock:
+        for student_id, _ in items:
+            _pending_new_ids.pop(str(student_id), None)
+        _publish_id_caches()
+    _save_ids_snapshot()
+
+
+# --------------------------
+# Roster Import
+# --------------------------
+# A season's roster can be imported from a CSV or XLSX file instead of being
+# registered one student at a time at the kiosk.  The file is streamed row by
+# row (XLSX through openpyxl's read-only mode), each row is validated like a
+# scanned ID, and IDs already in the cache or repeated in the file are skipped.
+# New rows are appended to the IDs tab ROSTER_IMPORT_CHUNK at a time, so a
+# 2,000-student roster costs one tail read plus four appends.
+ROSTER_IMPORT_CHUNK = 500   # Name/ID rows per values.append during a roster import
+ROSTER_NAME_HEADERS = ("name", "student name", "full name")
+ROSTER_ID_HEADERS = ("id", "student id", "id number", "student number")
+
+
+def _iter_roster_rows(file_path):
+    """Yield the rows of a CSV or XLSX roster one at a time as lists of cells."""
+    if file_path.lower().endswith((".xlsx", ".xlsm")):
+        if openpyxl is None:
+            raise RuntimeError("Importing .xlsx files needs openpyxl (pip install openpyxl), or save the roster as CSV.")
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        with open(file_path, "r", newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f):
+                yield row
+
+
+def _roster_columns(row):
+    """Return (name_col, id_col) if ``row`` is a header row, otherwise None."""
+    labels = [str(cell).strip().lower() if cell is not None else "" for cell in row]
+    name_col = next((i for i, label in enumerate(labels) if label in ROSTER_NAME_HEADERS), None)
+    id_col = next((i for i, label in enumerate(labels) if label in ROSTER_ID_HEADERS), None)
+    if name_col is None or id_col is None:
+        return None
+    return name_col, id_col
+
+
+def _roster_id(cell):
+    """Return a roster cell as a 6-digit ID string, or None if it is not one."""
+    if isinstance(cell, float) and cell.is_integer():
+        cell = int(cell)   # Spreadsheet apps store numbers as floats
+    text = str(cell).strip()
+    try:
+        student_id = int(text)
+    except (TypeError, ValueError):
+        # CSV exports of number cells often write "678901.0".
+        try:
+            number = float(text)
+        except (TypeError, ValueError):
+            return None
+        if not number.is_integer():
+            return None
+        student_id = int(number)
+    return str(student_id) if 100000 <= student_id <= 999999 else None
+
+
+def import_roster(file_path, document=None, progress=None):
+    """
+    Import Name/ID pairs from a CSV or XLSX roster into the "IDs" sheet.
+
+    The first row is used as a header if it has a name and an ID column
+    (see ROSTER_NAME_HEADERS / ROSTER_ID_HEADERS); otherwise column A is the
+    name and column B the ID, as on the IDs tab.  Rows with a blank name or
+    an ID that is not six digits are skipped, as are IDs already registered
+    (in the cache, pending upload, or earlier in the file).
 
-    headers = ["ID"]
-    row = [current_id]
+    Args:
+        file_path: Path of the .csv or .xlsx roster
+        document:  The Google Spreadsheet document name
+        progress:  Optional callable(summary) called after every appended chunk
 
-    value_map = {
+    Returns:
+        dict: {"rows", "added", "existing", "invalid", "problems"}, where
+              "problems" lists the first few invalid rows.  Raises on file or
+              API errors; rows appended before the error stay on the sheet,
+              and importing the file again skips them.
+    """
+    document = _resolve_document(document)
+    summary = {"rows": 0, "added": 0, "existing": 0, "invalid": 0, "problems": []}
+    with _ids_reconcile_lock:
+        ids_sheet = ensure_ids_sheet_exists(document)
+        _reconcile_ids_sheet(document, ids_sheet)
+        spreadsheet = setup_google_sheet(document)
+        seen = set()
+        chunk = []
+
+        def flush():
+            try:
+                _google_call_once(
+                    "write", spreadsheet.values_append,
+                    _a1_range(IDS_SHEET_NAME, "A1:B"),
+                    params={"valueInputOption": "RAW", "insertDataOption": APPEND_INSERT_DATA_OPTION},
+                    body={"values": chunk},
+                )
+            except Exception as e:
+                _invalidate_on_missing(e, document, IDS_SHEET_NAME)
+                raise
+            with _ids_cache_lock:
+                for name, student_id in chunk:
+                    _sheet_ids.add(student_id, name)
+                _publish_id_caches()
+            summary["added"] += len(chunk)
+            print(f"Roster import: added {len(chunk)} ID(s) to '{IDS_SHEET_NAME}'")
+            del chunk[:]
+            if progress is not None:
+                progress(dict(summary))
+
+        columns = None
+        try:
+            for line_no, row in enumerate(_iter_roster_rows(file_path), start=1):
+                if not any(cell not in (None, "") for cell in row):
+                    continue
+                if columns is None:
+                    columns = _roster_columns(row)
+                    if columns is not None:
+                        continue   # Header row
+                    columns = (0, 1)
+                summary["rows"] += 1
+                name_col, id_col = columns
+                name = str(row[name_col]).strip() if len(row) > name_col and row[name_col] is not None else ""
+                student_id = _roster_id(row[id_col]) if len(row) > id_col else None
+                if not name or student_id is None:
+                    summary["invalid"] += 1
+                    if len(summary["problems"]) < 10:
+                        summary["problems"].append(f"Row {line_no}: " + ("missing name" if not name else "ID is not six digits"))
+                    continue
+                if student_id in seen or student_id in id_index:
+                    summary["existing"] += 1
+                    continue
+                seen.add(student_id)
+                chunk.append([name, student_id])
+                if len(chunk) >= ROSTER_IMPORT_CHUNK:
+                    flush()
+            if chunk:
+                flush()
+        finally:
+            if summary["added"]:
+                _save_ids_snapshot()
+    print(f"Roster import: {summary['added']} added, {summary['existing']} already registered, {summary['invalid']} invalid")
+    return summary
+
+
+def _unpack_attendance_item(item):
+    """Return a dict view of a queued attendance tuple.
+
+    Handles both the current 11-field payload and the older 10-field payload
+    that did not carry ``logging_fields``.
+    """
+    # Backward compatibility for older queue payloads.
+    if len(item) >= 11:
+        current_id, name, attendance_record, event, reason, action, hasPic, img_folder, img_picName, volunteering_list, logging_fields = item[:11]
+    else:
+        current_id, name, attendance_record, event, reason, action, hasPic, img_folder, img_picName, volunteering_list = item
+        logging_fields = DEFAULT_LOGGING_FIELDS.copy()
+    return {
+        "current_id": current_id,
         "name": name,
-        "timestamp": attendance_record,
-        "image_link": file_url,
-        "image_path": file_path,
+        "attendance_record": attendance_record,
+        "event": event,
         "reason": reason,
+        "action": action,
+        "hasPic": hasPic,
+        "img_folder": img_folder,
+        "img_picName": img_picName,
+        "volunteering_list": volunteering_list,
+        "logging_fields": logging_fields,
+        "record_id": item[11] if len(item) >= 12 else None,
     }
 
-    for key, label in LOGGING_FIELD_ORDER:
-        if fields.get(key, False):
-            headers.append(label)
-            row.append(value_map.get(key))
 
-    return headers, row
+def _photo_file_path(record):
+    """Return the local photo path to upload for a record, or None if it has none."""
+    fields = _normalize_logging_fields(record["logging_fields"])
+    if not (fields.get("image_link", True) or fields.get("image_path", True)):
+        return None
+    if record["hasPic"] and record["img_folder"] and record["img_picName"]:
+        return f"{record['img_folder']}/{record['img_picName']}"
+    return None
 
 
-def _find_row_for_action(sheet, action):
-    """Return the next writable row for sign-in or sign-out block."""
-    first_col = "A" if action == "in" else "H"
-    values = sheet.get(f"{first_col}:{first_col}")
-    return len(values) + 1
+def _needs_photo_upload(record):
+    """Return True if the record's photo must be uploaded for its Image Link column."""
+    fields = _normalize_logging_fields(record["logging_fields"])
+    return bool(fields.get("image_link", True) and _photo_file_path(record))
 
 
-def _ensure_headers(sheet, action, headers):
-    """Ensure dynamic headers exist in row 1 for the target action block."""
-    start_col_num = 1 if action == "in" else 8
-    end_col_num = start_col_num + len(headers) - 1
-    start_col = _col_num_to_letter(start_col_num)
-    end_col = _col_num_to_letter(end_col_num)
-    header_range = f"{start_col}1:{end_col}1"
+def _get_uploaded_image_url(record_id):
+    """Return the Drive URL the photo lane uploaded for ``record_id``, if any."""
+    if record_id is None:
+        return None
+    with _uploaded_images_lock:
+        return _uploaded_image_urls.get(record_id)
+
+
+def _resolve_target_sheet(event, reason, sheet_names):
+    """Pick the worksheet an attendance record should be written to.
+
+    Prefers the sheet selected in the UI (``event``), then the reason (used by
+    volunteering entries), then "Main Attendance", then the first tab.
+    """
+    if event and event in sheet_names and event != IDS_SHEET_NAME:
+        return event
+    if reason and reason in sheet_names and reason != IDS_SHEET_NAME:
+        return reason
+    if "Main Attendance" in sheet_names:
+        return "Main Attendance"
+    for title in sheet_names:
+        if title != IDS_SHEET_NAME:
+            return title
+    return None
 
-    existing = sheet.get(header_range)
-    if not existing or existing[0] != headers:
-        sheet.update(range_name=header_range, values=[headers])
 
+def _a1_range(sheet_title, a1):
+    """Return an A1 range qualified with a (quoted) worksheet title."""
+    return "'{}'!{}".format(str(sheet_title).replace("'", "''"), a1)
 
-def _write_dynamic_attendance_row(sheet, action, row_values, headers):
-    """Write one attendance row using dynamic columns with no disabled-field gaps."""
-    _ensure_headers(sheet, action, headers)
 
+def _block_columns(action, width):
+    """Return (start_letter, end_letter) for the sign-in or sign-out block."""
     start_col_num = 1 if action == "in" else 8
-    end_col_num = start_col_num + len(row_values) - 1
-    row_num = _find_row_for_action(sheet, action)
-    start_col = _col_num_to_letter(start_col_num)
-    end_col = _col_num_to_letter(end_col_num)
-    target_range = f"{start_col}{row_num}:{end_col}{row_num}"
-    sheet.update(range_name=target_range, values=[row_values])
-    _mark_google_api_call()
+    end_col_num = start_col_num + max(1, width) - 1
+    return _col_num_to_letter(start_col_num), _col_num_to_letter(end_col_num)
 
 
-def make_file_public(drive_service, file_id):
-    """Grant public read access to a Google Drive file.
+def _drain_queue(q, limit):
+    """Pop up to ``limit`` items from ``q`` without blocking."""
+    items = []
+    while len(items) < limit:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            break
+    return items
 
-    Creates an "anyone with the link can view" permission on the file so
-    the resulting view URL can be stored in the attendance sheet without
-    requiring recipients to have a Google account.
 
-    Args:
-        drive_service: An authorised Drive v3 service object.
-        file_id:       The Drive file ID to make public.
+def _prepare_attendance_row(record, sheet_names):
+    """Build the record's target, headers and row.
+
+    The photo is not uploaded here: the Image Link cell holds
+    PENDING_IMAGE_LINK until the photo lane backfills it.
+
+    Returns:
+        tuple: (target_sheet, action, headers, row_values)
     """
-    permission = {
-        'role': 'reader',
-        'type': 'anyone'
-    }
-    drive_service.permissions().create(
-        fileId=file_id,
-        body=permission
-    ).execute()
-    _mark_google_api_call()
+    name = record["name"]
+    normalized_fields = _normalize_logging_fields(record["logging_fields"])
 
-def upload_image_to_drive(drive_service, file_path):
-    """Upload a local image to Google Drive and return its public view URL.
+    file_path = _photo_file_path(record)
+    if file_path:
+        file_url = _get_uploaded_image_url(record["record_id"]) or PENDING_IMAGE_LINK
+    else:
+        file_path = "No Image"
+        file_url = "No Image"
+
+    target_sheet = _resolve_target_sheet(record["event"], record["reason"], sheet_names)
+    if target_sheet is None:
+        raise ValueError("No writable worksheet found in spreadsheet.")
+
+    headers, row_values = _build_attendance_headers_and_row(
+        current_id=record["current_id"],
+        name=name,
+        attendance_record=record["attendance_record"],
+        file_path=file_path,
+        file_url=file_url,
+        reason=record["reason"],
+        logging_fields=normalized_fields,
+    )
+    headers, row_values = _with_record_id(record["action"], headers, row_values, record["record_id"])
+    return target_sheet, record["action"], headers, row_values
 
-    Uploads the file, immediately grants public read access via
-    ``make_file_public``, then returns the ``webViewLink`` so it can be
-    stored in the attendance spreadsheet.
 
-    Args:
-        drive_service: An authorised Drive v3 service object.
-        file_path:     Absolute or relative path to the JPEG image on disk.
+def _flush_attendance_batch(items, document):
+    """
+    Write a batch of queued attendance items to Google in one flush.
+
+    Records are grouped by target worksheet and block (sign-in A–F or
+    sign-out H–M).  Regardless of how many records are pending, the Sheets
+    side of a flush costs a fixed number of calls per group.  In "append"
+    mode each group is one atomic ``values.append`` (headers are checked
+    with one ``values.batchGet`` only when not yet verified).  In "cursor"
+    mode one ``values.batchGet`` reads unverified headers and unseeded first
+    columns and one ``values.batchUpdate`` carries every group's rows; if a
+    permanent error rejects it, each group is retried alone so the failure
+    is pinned on the sheet/block that caused it.  Photos are uploaded
+    afterwards by the photo lane, so a flush never waits on Drive.
 
     Returns:
-        str: The ``webViewLink`` URL of the uploaded file.
+        list: ``(item, error)`` pairs for records that could not be written.
     """
-    file_name = os.path.basename(file_path)
-    file_metadata = {
-        'name': file_name,
-    }
-    media = MediaFileUpload(file_path, mimetype='image/jpeg')  # Adjust mimetype if needed
+    if not items:
+        return []
 
-    # Upload file
-    file = drive_service.files().create(
-        body=file_metadata,
-        media_body=media,
-        fields='id, webViewLink, webContentLink'
-    ).execute()
-    _mark_google_api_call()
+    try:
+        document = _resolve_document(document)
+        spreadsheet = setup_google_sheet(document)
+        sheet_names = list(_get_worksheet_handles(document).keys())
+    except Exception as e:
+        print(f"Background sync: Cannot open spreadsheet for attendance flush: {e}")
+        return [(item, e) for item in items]
 
-    # Make the file public
-    make_file_public(drive_service, file.get('id'))
+    failed = []
+    groups = {}  # (target_sheet, action) -> {"headers": [...], "rows": [...], "items": [...]}
+    for item in items:
+        record = _unpack_attendance_item(item)
+        try:
+            target_sheet, action, headers, row_values = _prepare_attendance_row(record, sheet_names)
+        except Exception as e:
+            print(f"Background sync: Error preparing attendance for '{record['name']}': {e}")
+            failed.append((item, e))
+            continue
+        group = groups.setdefault((target_sheet, action), {"headers": headers, "rows": [], "items": []})
+        # Headers follow the most recent record, matching sequential writes.
+        group["headers"] = headers
+        group["rows"].append(row_values)
+        group["items"].append(item)
+
+    if not groups:
+        return failed
 
-    # Get the file's webViewLink to share
-    file_url = file.get('webViewLink')
-    print(f"File uploaded successfully. File URL: {file_url}")
-    return file_url
+    try:
+        _skip_written_records(spreadsheet, document, groups)
+    except Exception as e:
+        _invalidate_on_missing(e, document)
+        print(f"Background sync: Could not check for already-written records: {e}")
+        for group in groups.values():
+            failed.extend((item, e) for item in group["items"])
+        return failed
+    if not groups:
+        return failed
+
+    # Where each block's rows would start, in case a write ends up ambiguous.
+    cursors_before = {key: _get_row_cursor(document, key[0], key[1]) for key in groups}
+
+    if SYNC_WRITE_MODE == "append":
+        for key, e in _append_attendance_groups(spreadsheet, document, groups).items():
+            if _write_may_have_applied(e):
+                _note_ambiguous_write([_attendance_journal_key(i) for i in groups[key]["items"]], cursors_before[key])
+            _forget_group_state(e, document, {key: groups[key]})
+            print(f"Background sync: Error appending {len(groups[key]['items'])} sign-{key[1]} row(s) to '{key[0]}': {e}")
+            failed.extend((item, e) for item in groups[key]["items"])
+        return failed
 
+    try:
+        _write_attendance_groups(spreadsheet, document, groups)
+    except Exception as e:
+        if _write_may_have_applied(e):
+            for key, group in groups.items():
+                _note_ambiguous_write([_attendance_journal_key(i) for i in group["items"]], cursors_before[key])
+        _forget_group_state(e, document, groups)
+        print(f"Background sync: Error flushing {sum(len(g['items']) for g in groups.values())} attendance record(s): {e}")
+        if len(groups) > 1 and _classify_sync_error(e) == "permanent":
+            # One sheet/block rejected the whole write; retry each group alone
+            # so only the offending group is charged with the failure.
+            for key, group in groups.items():
+                try:
+                    _write_attendance_groups(spreadsheet, document, {key: group})
+                except Exception as group_error:
+                    if _write_may_have_applied(group_error):
+                        _note_ambiguous_write([_attendance_journal_key(i) for i in group["items"]], cursors_before[key])
+                    _forget_group_state(group_error, document, {key: group})
+                    print(f"Background sync: '{key[0]}' sign-{key[1]} block rejected the write: {group_error}")
+                    failed.extend((item, group_error) for item in group["items"])
+        else:
+            for group in groups.values():
+                failed.extend((item, e) for item in group["items"])
+    return failed
 
-# --------------------------
-# IDs Sheet Functions
-# --------------------------
-IDS_SHEET_NAME = "IDs"  # Reserved worksheet name that stores Name/ID pairs; never used as an attendance tab
 
-# --------------------------
-# Local ID Cache
-# --------------------------
-# Local dictionary cache: ID (str) -> Name (str)
-id_to_name_cache = {}
-# Reverse lookup cache: Name (str) -> ID (str)
-name_to_id_cache = {}
+def _is_row_conflict_error(exc):
+    """Return True when a failed write means the cached row cursors can't be trusted.
 
-# Queue for new IDs that need to be uploaded to the sheet in the background
-new_id_queue = queue.Queue()
+    That is a range/grid error (the block is not where the cursor says, or
+    the tab was replaced) or a write that may have landed before the error
+    came back -- the same failures that record the block's items in
+    ``_ambiguous_writes``.  Throttling, auth and offline failures leave the
+    sheet untouched, so the cursors stay.
+    """
+    if _is_missing_handle_error(exc):
+        return True
+    message = str(exc).lower()
+    if http_status_of(exc) == 400 and ("grid limits" in message or "range" in message):
+        return True
+    return not isinstance(exc, SyncOffline) and _write_may_have_applied(exc)
 
-# Queue for attendance records that need to be pushed to Google in the background
-# Items are tuples: (current_id, name, attendance_record, event, reason, action, hasPic, folder, picName)
-attendance_queue = queue.Queue()
 
-# Background thread for syncing new IDs
-background_sync_thread = None
-background_sync_running = False
+def _forget_group_state(exc, document, groups):
+    """Drop handles/cursors that a failed attendance write may have invalidated."""
+    _invalidate_on_missing(exc, document)
+    if not _is_row_conflict_error(exc):
+        return
+    # The blocks are not where the cursors say (or may now hold our rows); re-seed.
+    for target_sheet, action in groups:
+        invalidate_row_cursors(document, target_sheet, action)
+
+
+def _pad_rows(rows):
+    """Pad rows to a common width so a block is written as a rectangle."""
+    width = max(len(row) for row in rows)
+    return [row + [""] * (width - len(row)) for row in rows], width
 
-def ensure_ids_sheet_exists(document=None):
-    """
-    Ensure the 'IDs' subsheet exists in the spreadsheet.
-    Creates it if it doesn't exist with headers 'Name' and 'ID'.
-    Returns the worksheet object.
-    """
-    spreadsheet = setup_google_sheet(document)
-    worksheets = spreadsheet.worksheets()
-    _mark_google_api_call()
-    sheet_names = [ws.title for ws in worksheets]
-    
-    if IDS_SHEET_NAME in sheet_names:
-        return spreadsheet.worksheet(IDS_SHEET_NAME)
-    else:
-        # Create the IDs sheet
-        ids_sheet = spreadsheet.add_worksheet(title=IDS_SHEET_NAME, rows=1000, cols=2)
-        _mark_google_api_call()
-        # Add headers
-        ids_sheet.update_acell('A1', 'Name')
-        ids_sheet.update_acell('B1', 'ID')
-        _mark_google_api_call()
-        _mark_google_api_call()
-        print(f"Created '{IDS_SHEET_NAME}' sheet with headers.")
-        return ids_sheet
 
+def _append_attendance_groups(spreadsheet, document, groups):
+    """Append prepared attendance groups, one atomic ``values.append`` per group.
 
-def load_ids_cache(document=None):
+    Returns:
+        dict: ``{(target_sheet, action): error}`` for the groups that failed;
+              the other groups were written and must not be retried.
     """
-    Load all IDs and names from the Google Sheet into the local cache.
-    This should be called once on startup.
-    
+    errors = {}
+    for key, group in groups.items():
+        try:
+            _ensure_grid_cols(document, key[0], _group_last_col(key[1], group))
+        except Exception as e:
+            errors[key] = e
+    groups = {key: group for key, group in groups.items() if key not in errors}
+    unverified = [
+        key for key, group in groups.items()
+        if not _headers_verified(document, key[0], key[1], group["headers"])
+    ]
+    if unverified:
+        try:
+            header_ranges = []
+            for target_sheet, action in unverified:
+                start_col, end_col = _block_columns(action, len(groups[(target_sheet, action)]["headers"]))
+                header_ranges.append(_a1_range(target_sheet, f"{start_col}1:{end_col}1"))
+            response = _google_call("read", spreadsheet.values_batch_get, header_ranges)
+            value_ranges = response.get("valueRanges", [])
+            data = []
+            for idx, key in enumerate(unverified):
+                headers = groups[key]["headers"]
+                existing = value_ranges[idx].get("values", []) if idx < len(value_ranges) else []
+                if not existing or existing[0] != headers:
+                    data.append({"range": header_ranges[idx], "values": [headers]})
+            if data:
+                _google_call("write", spreadsheet.values_batch_update, {"valueInputOption": "RAW", "data": data})
+                _hide_record_id_columns(spreadsheet, document, {key[0] for key in unverified})
+            for target_sheet, action in unverified:
+                _remember_headers(document, target_sheet, action, groups[(target_sheet, action)]["headers"])
+        except Exception as e:
+            errors.update({key: e for key in groups})
+            return errors
+
+    for (target_sheet, action), group in groups.items():
+        rows, width = _pad_rows(group["rows"])
+        start_col, _ = _block_columns(action, 1)
+        _, end_col = _block_columns(action, width)
+        try:
+            response = _google_call_once(
+                "write", spreadsheet.values_append,
+                _a1_range(target_sheet, f"{start_col}1:{end_col}"),
+                params={"valueInputOption": "RAW", "insertDataOption": APPEND_INSERT_DATA_OPTION},
+                body={"values": rows},
+            )
+        except Exception as e:
+            errors[(target_sheet, action)] = e
+            continue
+        updated_range = (response or {}).get("updates", {}).get("updatedRange")
+        span = _observe_appended_rows(document, target_sheet, action, updated_range)
+        _remember_written_records(document, target_sheet, action, [_attendance_journal_key(i) for i in group["items"]],
+                                  list(range(span[0], span[0] + len(rows))) if span else None)
+        print(f"Background sync: Appended {len(rows)} sign-{action} row(s) to '{target_sheet}'")
+    return errors
+
+
+def _write_attendance_groups(spreadsheet, document, groups):
+    """Write prepared attendance groups with one batchGet (if needed) and one batchUpdate.
+
     Args:
-        document: The Google Spreadsheet document name
-    
-    Returns:
-        bool: True if successful, False otherwise
+        groups: ``{(target_sheet, action): {"headers", "rows", "items"}}``.
+
+    Raises the API error if the write fails; cursors and header caches are
+    only updated on success.
     """
-    global id_to_name_cache, name_to_id_cache
-    try:
-        ids_sheet = ensure_ids_sheet_exists(document)
-        
-        # Fetch all data at once (more efficient than multiple cell lookups)
-        all_values = ids_sheet.get_all_values()
-        _mark_google_api_call()
-        
-        # Clear existing caches
-        id_to_name_cache.clear()
-        name_to_id_cache.clear()
-        
-        # Skip header row (index 0) and populate both caches
-        for row in all_values[1:]:
-            if len(row) >= 2 and row[0] and row[1]:  # Both name and ID must exist
-                name = row[0]
-                student_id = str(row[1])
-                id_to_name_cache[student_id] = name
-                name_to_id_cache[name] = student_id
-        
-        print(f"Loaded {len(id_to_name_cache)} IDs into local cache")
-        return True
-        
-    except Exception as e:
-        print(f"Error loading IDs cache: {e}")
-        return False
+    group_keys = list(groups.keys())
+    for target_sheet, action in group_keys:
+        _ensure_grid_cols(document, target_sheet, _group_last_col(action, groups[(target_sheet, action)]))
+    read_ranges = []
+    read_index = {}  # (group key, "headers"/"first_col") -> index into read_ranges
+    for key in group_keys:
+        target_sheet, action = key
+        group = groups[key]
+        start_col, end_col = _block_columns(action, len(group["headers"]))
+        if not _headers_verified(document, target_sheet, action, group["headers"]):
+            read_index[(key, "headers")] = len(read_ranges)
+            read_ranges.append(_a1_range(target_sheet, f"{start_col}1:{end_col}1"))
+        if _get_row_cursor(document, target_sheet, action) is None:
+            read_index[(key, "first_col")] = len(read_ranges)
+            read_ranges.append(_a1_range(target_sheet, f"{start_col}:{start_col}"))
+
+    value_ranges = []
+    if read_ranges:
+        response = _google_call("read", spreadsheet.values_batch_get, read_ranges)
+        value_ranges = response.get("valueRanges", [])
+
+    def _read_values(key, kind):
+        idx = read_index.get((key, kind))
+        if idx is None or idx >= len(value_ranges):
+            return []
+        return value_ranges[idx].get("values", [])
+
+    data = []
+    planned = []  # (target_sheet, action, start_row, row count)
+    header_titles = set()  # worksheets whose header row is (re)written
+    for key in group_keys:
+        target_sheet, action = key
+        group = groups[key]
+        headers = group["headers"]
+
+        start_col, end_col = _block_columns(action, len(headers))
+        if (key, "headers") in read_index:
+            existing_headers = _read_values(key, "headers")
+            if not existing_headers or existing_headers[0] != headers:
+                data.append({"range": _a1_range(target_sheet, f"{start_col}1:{end_col}1"), "values": [headers]})
+                header_titles.add(target_sheet)
+
+        rows, width = _pad_rows(group["rows"])
+        start_row = _get_row_cursor(document, target_sheet, action)
+        if start_row is None:
+            start_row = _seed_row_cursor(document, target_sheet, action, _read_values(key, "first_col"))
+        end_row = start_row + len(rows) - 1
+        _, rows_end_col = _block_columns(action, width)
+        data.append({
+            "range": _a1_range(target_sheet, f"{start_col}{start_row}:{rows_end_col}{end_row}"),
+            "values": rows,
+        })
+        planned.append((target_sheet, action, start_row, len(rows)))
+
+    for target_sheet, action, start_row, count in planned:
+        _ensure_grid_rows(document, target_sheet, start_row + count - 1)
+    _google_call("write", spreadsheet.values_batch_update, {"valueInputOption": "RAW", "data": data})
+    for target_sheet, action, start_row, count in planned:
+        _advance_row_cursor(document, target_sheet, action, start_row, count)
+        _remember_headers(document, target_sheet, action, groups[(target_sheet, action)]["headers"])
+        _remember_written_records(document, target_sheet, action,
+                                  [_attendance_journal_key(i) for i in groups[(target_sheet, action)]["items"]],
+                                  list(range(start_row, start_row + count)))
+    if header_titles:
+        _hide_record_id_columns(spreadsheet, document, header_titles)
+    for (target_sheet, action), group in groups.items():
+        print(f"Background sync: Wrote {len(group['rows'])} sign-{action} row(s) to '{target_sheet}'")
 
 
-def _process_id_item(item, document):
+# --------------------------
+# Sync Lanes
+# --------------------------
+# ID registration, attendance rows and photo uploads each run on their own
+# daemon thread ("lane").  A lane takes fresh items from its source queue and
+# keeps failed ones in a private retry heap ordered by next-attempt time, so a
+# bad item only delays itself: the lane keeps flushing new arrivals while the
+# failed item waits out its own back-off.  Items being retried are flushed
+# apart from fresh ones so they cannot drag healthy records into a failure.
+# An idle lane blocks on its wake-up event (set by ``_SyncLane.put``) or until
+# its next retry is due, so it costs no CPU and picks up new work at once;
+# after waking it waits SYNC_COALESCE_WINDOW so a burst is flushed together.
+#
+# Failures are classified first.  Transient ones (429, 5xx, network errors)
+# are retried on the lane's schedule; permanent ones (400/403/404, bad data,
+# missing photo files) are retried once more -- the first failure has
+# already dropped any stale pooled handle -- and then moved to the journal's
+# dead-letter table instead of burning quota forever.  When a permanent error
+# fails a multi-sheet attendance flush, each sheet/block group is re-written
+# on its own so only the offending group is charged with the failure.
+SYNC_RETRY_SCHEDULES = {  # lane -> (first retry delay, maximum retry delay) in seconds
+    "ids": (5.0, 300.0),
+    "attendance": (5.0, 300.0),
+    "photos": (10.0, 600.0),
+}
+SYNC_IDLE_WAKEUP = 60.0      # Safety-net wake-up (seconds) for items put on a queue without waking its lane
+SYNC_COALESCE_WINDOW = 0.15  # Seconds a woken lane waits so a burst of scans is flushed together
+SYNC_COALESCE_WINDOW_MAX = 2.0  # Seconds; upper bound for SYNC_COALESCE_WINDOW
+SHUTDOWN_JOIN_TIMEOUT = 10.0  # Seconds drain_background_sync waits for an in-progress write to finish
+_sync_draining = False       # True while drain_background_sync is flushing for shutdown
+DEAD_LETTER_AFTER = 2  # Consecutive permanent failures before an item is dead-lettered
+
+
+def _classify_sync_error(exc):
+    """Return "transient" if ``exc`` is worth retrying, otherwise "permanent".
+
+    Rate limits (429), server errors (5xx), timeouts, expired auth (401),
+    Drive's 403 rate-limit variants and network errors are transient; other
+    4xx responses, missing worksheets/files and malformed records are
+    permanent.  Unknown errors are treated as transient so nothing is
+    dead-lettered on a guess.
     """
-    Process a single new-ID item from the queue.
-    Checks if it exists in the sheet and uploads if not.
-    Returns True on success, False to retry.
+    status = http_status_of(exc)
+    if status is not None and not isinstance(exc, OSError):
+        if status == 429 or status >= 500 or status in (401, 408):
+            return "transient"
+        if status == 403 and "ratelimit" in str(exc).lower().replace(" ", ""):
+            return "transient"
+        if 400 <= status < 500:
+            return "permanent"
+    if isinstance(exc, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)):
+        return "permanent"
+    if isinstance(exc, (FileNotFoundError, IsADirectoryError, ValueError, LookupError, TypeError)):
+        return "permanent"
+    return "transient"
+
+
+class _SyncLane:
+    """One background worker: a source queue, a retry heap and a batch processor.
+
+    ``process(items, document)`` returns ``(item, error)`` pairs for the items
+    that failed; ``on_done(items)`` (optional) is called with the ones that
+    succeeded and ``on_idle(document)`` (optional) whenever the lane runs out
+    of work.
     """
-    student_id, name = item
-    student_id_str = str(student_id)
-    print(f"Background sync: Processing ID {student_id_str} with name '{name}'")
+
+    def __init__(self, name, source, process, on_done=None, on_dead=None, on_idle=None, batch_limit=1):
+        self.name = name
+        self.source = source
+        self.process = process
+        self.on_done = on_done
+        self.on_dead = on_dead
+        self.on_idle = on_idle
+        self.batch_limit = batch_limit
+        self.retry_base, self.retry_max = SYNC_RETRY_SCHEDULES[name]
+        self.thread = None
+        self._lock = threading.Lock()
+        self._waiting = []              # heap of (next_attempt, seq, attempts, strikes, item)
+        self._seq = itertools.count()
+        self._wakeup = threading.Event()
+        self._in_flight = 0             # Items taken off the queue/heap and being processed
+
+    def put(self, item):
+        """Queue ``item`` on this lane and wake its worker."""
+        _metrics_note_enqueued(self.name, item)
+        self.source.put(item)
+        self._wakeup.set()
+        _metrics_sample_queue_depth()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _seconds_until_next_retry(self):
+        with self._lock:
+            if not self._waiting:
+                return None
+            return max(0.0, self._waiting[0][0] - time.monotonic())
+
+    def pending_count(self):
+        """Items queued, waiting for a retry or being processed in this lane."""
+        with self._lock:
+            return len(self._waiting) + self.source.qsize() + self._in_flight
+
+    def _retry_delay(self, attempts):
+        delay = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+        # While draining for shutdown, retry at most once a second instead.
+        return min(delay, 1.0) if _sync_draining else delay
+
+    def expedite_retries(self):
+        """Make every waiting retry due now (used when draining for shutdown)."""
+        now = time.monotonic()
+        with self._lock:
+            self._waiting = [(now,) + entry[1:] for entry in self._waiting]
+            heapq.heapify(self._waiting)
+        self._wakeup.set()
+
+    def _take_due_retries(self, now):
+        due = []
+        with self._lock:
+            while self._waiting and self._waiting[0][0] <= now and len(due) < self.batch_limit:
+                _, _, attempts, strikes, item = heapq.heappop(self._waiting)
+                due.append((attempts, strikes, item))
+        return due
+
+    def _run_batch(self, batch, document):
+        """Process ``[(attempts, strikes, item), ...]`` and reschedule or dead-letter failures.
+
+        ``strikes`` counts consecutive permanent failures of an item.
+        """
+        items = [item for _, _, item in batch]
+        with self._lock:
+            self._in_flight += len(items)
+        try:
+            failures = self.process(items, document)
+        except Exception as e:
+            print(f"Background sync: {self.name} lane error: {e}")
+            failures = [(item, e) for item in items]
+        finally:
+            with self._lock:
+                self._in_flight -= len(items)
+        errors = {id(item): exc for item, exc in failures}
+        done = [item for item in items if id(item) not in errors]
+        if self.on_done is not None and done:
+            self.on_done(done)
+        if not errors:
+            _metrics_note_outcome(self.name, done=done)
+            _metrics_sample_queue_depth()
+            return
+
+        now = time.monotonic()
+        retry_delays = []
+        dead = []
+        for attempts, strikes, item in batch:
+            exc = errors.get(id(item))
+            if exc is None:
+                continue
+            strikes = strikes + 1 if _classify_sync_error(exc) == "permanent" else 0
+            if strikes >= DEAD_LETTER_AFTER:
+                dead.append((item, exc, attempts + 1))
+                continue
+            delay = self._retry_delay(attempts + 1)
+            retry_delays.append(delay)
+            with self._lock:
+                heapq.heappush(self._waiting, (now + delay, next(self._seq), attempts + 1, strikes, item))
+
+        _metrics_note_outcome(self.name, done=done, retried=len(retry_delays), dead=[item for item, _, _ in dead])
+        _metrics_sample_queue_depth()
+        if retry_delays:
+            print(f"Background sync: {len(retry_delays)} {self.name} item(s) failed; next retry in {min(retry_delays):.0f}s")
+        if dead:
+            _journal_dead_letter(self.name, dead, document)
+            if self.on_dead is not None:
+                self.on_dead([item for item, _, _ in dead])
+
+    def run_once(self, document):
+        """Flush due retries, then fresh items.  Returns True if anything ran."""
+        retries = self._take_due_retries(time.monotonic())
+        if retries:
+            self._run_batch(retries, document)
+        fresh = _drain_queue(self.source, self.batch_limit)
+        if fresh:
+            try:
+                self._run_batch([(0, 0, item) for item in fresh], document)
+            finally:
+                for _ in fresh:
+                    self.source.task_done()
+        return bool(retries or fresh)
+
+    def run(self, document):
+        print(f"Background sync: {self.name} lane started")
+        while background_sync_running:
+            self._wakeup.clear()
+            if not is_sync_online():
+                # Leave everything queued; the reconnect probe expedites the retries.
+                self._wakeup.wait(OFFLINE_PROBE_INTERVAL)
+                continue
+            if self.run_once(document):
+                continue
+            if self.on_idle is not None:
+                try:
+                    self.on_idle(document)
+                except Exception as e:
+                    print(f"Background sync: {self.name} idle task failed: {e}")
+            timeout = self._seconds_until_next_retry()
+            self._wakeup.wait(SYNC_IDLE_WAKEUP if timeout is None else min(timeout, SYNC_IDLE_WAKEUP))
+            if (background_sync_running and not _sync_draining
+                    and 0 < self.source.qsize() < self.batch_limit and SYNC_COALESCE_WINDOW > 0):
+                time.sleep(SYNC_COALESCE_WINDOW)
+        print(f"Background sync: {self.name} lane stopped")
+
+
+def _get_photo_upload_pool():
+    """Return the shared thread pool that runs photo uploads concurrently."""
+    global _photo_upload_pool
+    with _uploaded_images_lock:
+        if _photo_upload_pool is None:
+            _photo_upload_pool = ThreadPoolExecutor(max_workers=PHOTO_UPLOAD_WORKERS, thread_name_prefix="PhotoUpload")
+        return _photo_upload_pool
+
+
+def _upload_record_photo(record, document):
+    """Upload one record's photo into its student folder (on a pool thread) and remember its URL."""
+    file_path = _photo_file_path(record)
+    with _uploaded_images_lock:
+        _, image_bytes = _pending_photo_bytes.get(record["record_id"], (None, None))
+    drive_service = setup_google_drive()
+    folder_id = get_photo_folder(drive_service, document, record["current_id"], record["name"])
+    print(f"Background sync: Uploading image {file_path}" + (" from memory" if image_bytes is not None else ""))
     try:
-        ids_sheet = ensure_ids_sheet_exists(document)
-        id_column = ids_sheet.col_values(2)  # Column B (IDs)
-        _mark_google_api_call()
-        if student_id_str in id_column[1:]:
-            print(f"Background sync: ID {student_id_str} already exists in sheet, skipping")
-        else:
-            next_row = len(id_column) + 1
-            ids_sheet.update_acell(f'A{next_row}', name)
-            ids_sheet.update_acell(f'B{next_row}', student_id_str)
-            _mark_google_api_call()
-            _mark_google_api_call()
-            print(f"Background sync: Added new entry: '{name}' with ID {student_id_str}")
-        return True
+        url = upload_image_to_drive(drive_service, file_path, folder_id, image_bytes)
     except Exception as e:
-        print(f"Background sync: Error processing ID {student_id_str}: {e}")
-        return False
+        if http_status_of(e) == 404:
+            # The folder was deleted in Drive; create fresh ones on the retry.
+            forget_photo_folders(document)
+        raise
+    with _uploaded_images_lock:
+        _uploaded_image_urls[record["record_id"]] = url
+    return url
+
+
+def _image_link_cell(record, title, action, row):
+    """Return the A1 cell holding a record's Image Link, or None if the column is not logged."""
+    headers, _ = _build_attendance_headers_and_row(
+        current_id=record["current_id"], name=record["name"], attendance_record=record["attendance_record"],
+        file_path="", file_url="", reason=record["reason"], logging_fields=record["logging_fields"],
+    )
+    if "Image Link" not in headers:
+        return None
+    col = (1 if action == "in" else 8) + headers.index("Image Link")
+    return _a1_range(title, f"{_col_num_to_letter(col)}{row}")
 
 
-def _process_attendance_item(item, document):
+def _locate_image_link_cells(spreadsheet, document, records):
+    """Map record IDs to their Image Link cells.
+
+    Rows written this session are found in the record index.  The others
+    (e.g. uploads replayed after a restart) are looked up with one
+    ``values.batchGet`` of the record-ID columns of the blocks involved.
     """
-    Process a single attendance item from the queue.
-    Pushes the attendance record (and optional image) to Google.
-    Returns True on success, False to retry.
+    cells = {}
+    missing = {}   # (title, action) -> [record, ...]
+    sheet_names = None
+    for record in records:
+        location = _record_location(record["record_id"])
+        if location is not None and location[0] == document and location[3] is not None:
+            _, title, action, row = location
+            cells[record["record_id"]] = _image_link_cell(record, title, action, row)
+            continue
+        if location is not None and location[0] == document:
+            title = location[1]
+        else:
+            if sheet_names is None:
+                sheet_names = list(_get_worksheet_handles(document).keys())
+            title = _resolve_target_sheet(record["event"], record["reason"], sheet_names)
+        if title is not None:
+            missing.setdefault((title, record["action"]), []).append(record)
+
+    if missing:
+        keys = list(missing)
+        ranges = []
+        for title, action in keys:
+            col = _col_num_to_letter(RECORD_ID_COLUMNS[action])
+            ranges.append(_a1_range(title, f"{col}:{col}"))
+        response = _google_call("read", spreadsheet.values_batch_get, ranges)
+        value_ranges = response.get("valueRanges", [])
+        for idx, (title, action) in enumerate(keys):
+            values = value_ranges[idx].get("values", []) if idx < len(value_ranges) else []
+            rows = {row[0]: offset + 1 for offset, row in enumerate(values) if row}
+            for record in missing[(title, action)]:
+                row = rows.get(record["record_id"])
+                if row is not None:
+                    cells[record["record_id"]] = _image_link_cell(record, title, action, row)
+    return cells
+
+
+def _process_photo_batch(items, document):
+    """Photo lane processor: upload photos concurrently, then backfill their Image Link cells.
+
+    Rows are written first with PENDING_IMAGE_LINK in the Image Link column.
+    Up to PHOTO_UPLOAD_WORKERS uploads run at once.  Each is a single Drive
+    call into the student's subfolder of the shared photos folder.  The links
+    of every photo in the batch are then written with one
+    ``values.batchUpdate``.
+    URLs are kept across retries, so a failed backfill does not upload the
+    photo again.
+
+    Returns ``(item, error)`` pairs for the records that were not finished.
     """
-    # Backward compatibility for older queue payloads.
-    if len(item) >= 11:
-        current_id, name, attendance_record, event, reason, action, hasPic, img_folder, img_picName, volunteering_list, logging_fields = item
-    else:
-        current_id, name, attendance_record, event, reason, action, hasPic, img_folder, img_picName, volunteering_list = item
-        logging_fields = DEFAULT_LOGGING_FIELDS.copy()
+    try:
+        document = _resolve_document(document)
+    except Exception as e:
+        return [(item, e) for item in items]
+    failed = []
+    records = {id(item): _unpack_attendance_item(item) for item in items}
+    uploads = [
+        (item, _get_photo_upload_pool().submit(_upload_record_photo, records[id(item)], document))
+        for item in items if _get_uploaded_image_url(records[id(item)]["record_id"]) is None
+    ]
+    for item, future in uploads:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Background sync: Error uploading image for '{records[id(item)]['name']}': {e}")
+            failed.append((item, e))
+    failed_ids = {id(item) for item, _ in failed}
+    uploaded = [item for item in items if id(item) not in failed_ids]
+    if not uploaded:
+        return failed
 
-    print(f"Background sync: Pushing attendance for '{name}' ({action})")
     try:
         spreadsheet = setup_google_sheet(document)
-        drive = setup_google_drive()
+        cells = _locate_image_link_cells(spreadsheet, document, [records[id(item)] for item in uploaded])
+    except Exception as e:
+        _invalidate_on_missing(e, document)
+        print(f"Background sync: Could not locate rows for {len(uploaded)} photo link(s): {e}")
+        return failed + [(item, e) for item in uploaded]
+
+    data = []
+    written = []
+    for item in uploaded:
+        record = records[id(item)]
+        if record["record_id"] not in cells:
+            failed.append((item, LookupError(f"Row for record {record['record_id']} was not found in the sheet")))
+            continue
+        cell = cells[record["record_id"]]
+        if cell is not None:
+            data.append({"range": cell, "values": [[_get_uploaded_image_url(record["record_id"])]]})
+            written.append(item)
+    if data:
+        try:
+            _google_call("write", spreadsheet.values_batch_update, {"valueInputOption": "RAW", "data": data})
+        except Exception as e:
+            _invalidate_on_missing(e, document)
+            print(f"Background sync: Error filling in {len(data)} photo link(s): {e}")
+            return failed + [(item, e) for item in written]
+        print(f"Background sync: Filled in {len(data)} photo link(s)")
+    return failed
 
-        normalized_fields = _normalize_logging_fields(logging_fields)
-        if not (normalized_fields.get("image_link", True) or normalized_fields.get("image_path", True)):
-            hasPic = False
 
-        if hasPic and img_folder and img_picName:
-            file_path = f"{img_folder}/{img_picName}"
-            print(f"Background sync: Uploading image {file_path}")
-            file_url = upload_image_to_drive(drive, file_path)
-        else:
-            file_path = "No Image"
-            file_url = "No Image"
-
-        # Determine target sheet.
-        # Prefer the sheet selected in the UI (`event`) when it exists.
-        sheet_names = [ws.title for ws in spreadsheet.worksheets()]
-        target_sheet = None
-
-        if event and event in sheet_names and event != IDS_SHEET_NAME:
-            target_sheet = event
-        elif reason and reason in sheet_names and reason != IDS_SHEET_NAME:
-            target_sheet = reason
-        elif "Main Attendance" in sheet_names:
-            target_sheet = "Main Attendance"
-        elif sheet_names:
-            target_sheet = sheet_names[0]
-
-        if target_sheet is None:
-            raise ValueError("No writable worksheet found in spreadsheet.")
-
-        sheet = spreadsheet.worksheet(target_sheet)
-
-        headers, row_values = _build_attendance_headers_and_row(
-            current_id=current_id,
-            name=name,
-            attendance_record=attendance_record,
-            file_path=file_path,
-            file_url=file_url,
-            reason=reason,
-            logging_fields=normalized_fields,
-        )
-        _write_dynamic_attendance_row(sheet, action, row_values, headers)
+def _forget_photo_jobs(items):
+    with _uploaded_images_lock:
+        for item in items:
+            record_id = _attendance_journal_key(item)
+            _uploaded_image_urls.pop(record_id, None)
+            _photo_lane_records.discard(record_id)
+            _pending_photo_bytes.pop(record_id, None)
 
-        print(f"Background sync: Attendance pushed for '{name}'")
-        return True
-    except Exception as e:
-        print(f"Background sync: Error pushing attendance for '{name}': {e}")
-        return False
 
+def spill_pending_photos(record_ids=None):
+    """Write in-memory photos to their local path so they survive a restart.
 
-def background_sync_worker(document=None):
-    """
-    Background worker that continuously processes both the new_id_queue
-    and the attendance_queue.  Runs in a separate daemon thread so it
-    never blocks the main UI / attendance flow.
-    """
-    global background_sync_running
-    print("Background sync worker started")
+    Called when the app goes offline, when a record or its photo is
+    dead-lettered, and at shutdown.  Those photos may otherwise not be
+    uploaded in this session.  The journal replays them from disk later.
 
-    while background_sync_running:
-        processed_something = False
+    Args:
+        record_ids: Only spill these records (default: every in-memory photo).
 
-        # --- Process one ID item if available ---
+    Returns:
+        int: Number of photos written to disk.
+    """
+    with _uploaded_images_lock:
+        keys = list(_pending_photo_bytes) if record_ids is None else [k for k in record_ids if k in _pending_photo_bytes]
+        pending = [(key, _pending_photo_bytes.pop(key)) for key in keys]
+    written = 0
+    for record_id, (file_path, image_bytes) in pending:
         try:
-            item = new_id_queue.get_nowait()
-            if not _process_id_item(item, document):
-                new_id_queue.put(item)  # retry later
-                time.sleep(5)
-            else:
-                new_id_queue.task_done()
-            processed_something = True
-        except queue.Empty:
-            pass
+            folder = os.path.dirname(file_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(file_path, "wb") as f:
+                f.write(image_bytes)
+            written += 1
+        except OSError as e:
+            print(f"Background sync: Could not save photo for record {record_id}: {e}")
+    if written:
+        print(f"Background sync: Saved {written} pending photo(s) to disk for a later upload")
+    return written
+
+
+def _spill_dead_records(items):
+    spill_pending_photos([_attendance_journal_key(item) for item in items])
+    _forget_photo_jobs(items)
+
+
+def _mark_photos_done(items):
+    _journal_mark_done([_photo_journal_key(_attendance_journal_key(item)) for item in items])
+    _forget_photo_jobs(items)
+
+
+def _mark_attendance_done(items):
+    _journal_mark_done([_attendance_journal_key(item) for item in items])
+    for item in items:
+        if _needs_photo_upload(_unpack_attendance_item(item)):
+            _queue_photo_upload(item)
+
+
+_sync_lanes = {
+    "ids": _SyncLane("ids", new_id_queue, _process_id_batch, on_done=_mark_ids_done, batch_limit=ID_FLUSH_LIMIT),
+    "attendance": _SyncLane(
+        "attendance", attendance_queue, _flush_attendance_batch,
+        on_done=_mark_attendance_done, on_dead=_spill_dead_records,
+        on_idle=maintain_grid_capacity, batch_limit=ATTENDANCE_FLUSH_LIMIT
+    ),
+    "photos": _SyncLane(
+        "photos", photo_queue, _process_photo_batch,
+        on_done=_mark_photos_done, on_dead=_spill_dead_records, batch_limit=10
+    ),
+}
 
-        # --- Process one attendance item if available ---
-        try:
-            item = attendance_queue.get_nowait()
-            if not _process_attendance_item(item, document):
-                attendance_queue.put(item)  # retry later
-                time.sleep(5)
-            else:
-                attendance_queue.task_done()
-            processed_something = True
-        except queue.Empty:
-            pass
 
-        # If neither queue had work, sleep briefly before rechecking
-        if not processed_something:
-            time.sleep(0.5)
+def set_sync_coalesce_window(seconds):
+    """Set how long a woken sync lane waits for more records before flushing."""
+    global SYNC_COALESCE_WINDOW
+    SYNC_COALESCE_WINDOW = max(0.0, min(float(seconds), SYNC_COALESCE_WINDOW_MAX))
+
+
+def drain_background_sync(deadline, progress=None):
+    """Flush everything the sync lanes hold for up to ``deadline`` seconds, then stop them.
+
+    Waiting retries are made due immediately and retried at most once a
+    second.  When the backlog is empty or the deadline passes, the lanes are
+    stopped and given up to ``SHUTDOWN_JOIN_TIMEOUT`` seconds to finish an
+    in-progress write.  Anything left over is still pending in the sync
+    journal and is replayed at the next launch; photos still held in memory
+    are written to disk first so they can be uploaded then.  If the app is offline and
+    an immediate reconnect probe fails, the lanes are stopped straight away.
+
+    Args:
+        deadline: Seconds to keep flushing.
+        progress: Optional callable receiving the remaining item count about
+                  every 0.2 s (called from the draining thread).
 
-    print("Background sync worker stopped")
+    Returns:
+        int: Items still not uploaded when the lanes stopped.
+    """
+    global _sync_draining, _last_probe
+    _sync_draining = True
+    _last_probe = 0.0   # Let the first connectivity check probe at once
+    try:
+        if background_sync_running:
+            for lane in _sync_lanes.values():
+                lane.expedite_retries()
+            end = time.monotonic() + max(0.0, deadline)
+            while time.monotonic() < end:
+                remaining = sum(get_sync_backlog().values())
+                if progress is not None:
+                    progress(remaining)
+                if remaining == 0 or not is_sync_online() or not background_sync_running:
+                    break   # Done, offline, or stopped early ("Close Now")
+                time.sleep(0.2)
+        stop_background_sync()
+        join_end = time.monotonic() + SHUTDOWN_JOIN_TIMEOUT
+        for lane in _sync_lanes.values():
+            if lane.thread is not None and lane.thread.is_alive():
+                lane.thread.join(max(0.0, join_end - time.monotonic()))
+    finally:
+        _sync_draining = False
+    spill_pending_photos()
+    remaining = sum(get_sync_backlog().values())
+    if progress is not None:
+        progress(remaining)
+    if remaining:
+        print(f"Background sync: {remaining} record(s) left for replay at next launch")
+    return remaining
+
+
+def get_sync_backlog():
+    """Return ``{lane name: items queued or waiting to retry}`` for every sync lane."""
+    return {name: lane.pending_count() for name, lane in _sync_lanes.items()}
+
+
+def background_sync_worker(lane="attendance", document=None):
+    """
+    Run one sync lane ("ids", "attendance" or "photos") until
+    ``stop_background_sync`` is called.  ``start_background_sync`` runs each
+    lane on its own daemon thread so a failing item in one lane never holds
+    up the others.
+    """
+    _sync_lanes[lane].run(document)
 
 
 def start_background_sync(document=None):
     """
-    Start the background sync thread if it's not already running.
+    Start one background thread per sync lane if they're not already running.
     
     Args:
         document: The Google Spreadsheet document name
@@ -549,23 +3333,28 @@ def start_background_sync(document=None):
         return
     
     background_sync_running = True
-    background_sync_thread = threading.Thread(
-        target=background_sync_worker,
-        args=(document,),
-        daemon=True,
-        name="IDBackgroundSync"
-    )
-    background_sync_thread.start()
-    print("Background sync thread started")
+    for name, lane in _sync_lanes.items():
+        lane.thread = threading.Thread(
+            target=background_sync_worker,
+            args=(name, document),
+            daemon=True,
+            name=f"BackgroundSync-{name}"
+        )
+        lane.thread.start()
+    background_sync_thread = _sync_lanes["attendance"].thread
+    print("Background sync threads started")
 
 
 def stop_background_sync():
     """
-    Stop the background sync thread gracefully.
+    Stop the background sync lanes gracefully.
     """
     global background_sync_running
     background_sync_running = False
-    print("Background sync thread stopping...")
+    for lane in _sync_lanes.values():
+        lane.wake()
+    _flush_ids_snapshot()
+    print("Background sync threads stopping...")
 
 
 def get_name_by_id(student_id, document=None):
@@ -581,8 +3370,7 @@ def get_name_by_id(student_id, document=None):
         str: The student's name if found, None otherwise
     """
     try:
-        student_id_str = str(student_id)
-        return id_to_name_cache.get(student_id_str, None)
+        return id_index.get_name(student_id)
     except Exception as e:
         print(f"Error looking up ID {student_id} in cache: {e}")
         return None
@@ -601,7 +3389,7 @@ def get_id_by_name(name, document=None):
         str: The student's ID if found, None otherwise
     """
     try:
-        return name_to_id_cache.get(name, None)
+        return id_index.get_id(name)
     except Exception as e:
         print(f"Error looking up name {name} in cache: {e}")
         return None
@@ -621,23 +3409,20 @@ def save_id_name_pair(student_id, name, document=None):
     Returns:
         bool: True if successfully added to cache and queued, False otherwise
     """
-    global id_to_name_cache, name_to_id_cache
     try:
         student_id_str = str(student_id)
         
-        # Check if ID already exists in local cache
-        if student_id_str in id_to_name_cache:
-            existing_name = id_to_name_cache[student_id_str]
+        # Add to local cache immediately, unless the ID already exists
+        if not _add_pending_id(student_id_str, name):
+            existing_name = id_index.get_name(student_id_str)
             print(f"ID {student_id} already exists in cache with name '{existing_name}' - not updating")
             return True
-        
-        # Add to local cache immediately
-        id_to_name_cache[student_id_str] = name
-        name_to_id_cache[name] = student_id_str
         print(f"Added to local cache: '{name}' with ID {student_id}")
+        _schedule_ids_snapshot()
         
-        # Queue for background upload to sheet
-        new_id_queue.put((student_id, name))
+        # Journal, then queue for background upload to sheet
+        _journal_append("id", _id_journal_key(student_id_str), [student_id, name])
+        _sync_lanes["ids"].put((student_id, name))
         print(f"Queued for background sync: '{name}' with ID {student_id}")
         
         return True
@@ -647,56 +3432,203 @@ def save_id_name_pair(student_id, name, document=None):
         return False
 
 
-def parse_timestamp(timestamp_str):
-    """
-    Parse a timestamp string into a datetime object.
-    
-    Supports formats:
-    - "Signed in at: HH:MM AM/PM, Date: YYYY-MM-DD"
-    - "Signed out at: HH:MM AM/PM, Date: YYYY-MM-DD"
-    - "HH:MM AM/PM, YYYY-MM-DD"
-    
-    Args:
-        timestamp_str: The timestamp string to parse
-    
-    Returns:
-        datetime object if successful, None otherwise
-    """
-    from datetime import datetime
-    try:
-        if not timestamp_str:
-            return None
-            
-        # Handle format: "Signed in/out at: HH:MM AM/PM, Date: YYYY-MM-DD"
-        if "at:" in timestamp_str and "Date:" in timestamp_str:
-            parts = timestamp_str.split(", Date: ")
-            if len(parts) == 2:
-                time_part = parts[0].split("at: ")[-1].strip()  # "HH:MM AM/PM"
-                date_part = parts[1].strip()  # "YYYY-MM-DD"
-                datetime_str = f"{date_part} {time_part}"
-                return datetime.strptime(datetime_str, "%Y-%m-%d %I:%M %p")
-        
-        # Handle format: "HH:MM AM/PM, YYYY-MM-DD"
-        elif ", " in timestamp_str:
-            parts = timestamp_str.split(", ")
-            if len(parts) == 2:
-                time_part = parts[0].strip()
-                date_part = parts[1].strip()
-                datetime_str = f"{date_part} {time_part}"
-                return datetime.strptime(datetime_str, "%Y-%m-%d %I:%M %p")
-        
+# --------------------------
+# Who's Here Scan
+# --------------------------
+# fetch_whos_here_from_sheets keeps, per worksheet, the last row it has
+# processed in each block (the high-water mark) and the latest sign-in and
+# sign-out it derived for every person.  A refresh reads only the rows from
+# each high-water mark down, so its cost follows what changed since the last
+# refresh, not the size of the season.  Every worksheet is read in one
+# values.batchGet, and only the ID, Name and Timestamp columns of each block
+# are requested (Image Link, Image Path and Reason are never downloaded).
+# Their positions come from a header map resolved once per worksheet: row 1
+# is read again only for new worksheets, on a full rescan, or when the
+# header cache shows the app has rewritten a block's headers.
+# The row at each mark is read again as an anchor: if its ID or timestamp
+# changed (rows deleted or sorted by hand), the worksheet is rescanned from
+# the top.  A full rescan also happens every WHOS_HERE_FULL_SCAN_INTERVAL
+# seconds to pick up edits further up.
+WHOS_HERE_FULL_SCAN_INTERVAL = 1800.0   # Seconds between full rescans of a worksheet
+WHOS_HERE_WINDOW = 12 * 3600            # Sign-ins older than this no longer count as "here"
+_WHOS_HERE_BLOCKS = {"in": 0, "out": 7}  # action -> header offset (block starts at column A / H)
+
+_whos_here_lock = threading.Lock()
+_whos_here_state = {}   # (document, title) -> per-worksheet scan state, see _new_whos_here_state
+
+
+def _new_whos_here_state():
+    return {
+        "header": None,                    # Header row (A1:N1) the state was built against
+        "columns": {},                     # action -> block-relative (ID, Name, Timestamp) indexes
+        "marks": {"in": 1, "out": 1},      # Last row processed in each block
+        "anchors": {"in": None, "out": None},  # (ID, timestamp) of the row at each mark
+        "last_in": {},                     # name -> latest sign-in (wall-clock epoch, see timestamps)
+        "last_out": {},                    # name -> latest sign-out (wall-clock epoch)
+        "full_scan_at": time.time(),
+    }
+
+
+def _block_field_indexes(header, action):
+    """Return the block-relative (ID, Name, Timestamp) column indexes of a block."""
+    offset = _WHOS_HERE_BLOCKS[action]
+    block = header[offset:offset + 7]
+
+    def _find(header_name):
+        for idx, cell in enumerate(block):
+            if str(cell).strip().lower() == header_name.lower():
+                return idx
         return None
-    except Exception as e:
-        print(f"Error parsing timestamp '{timestamp_str}': {e}")
+
+    return _find("ID"), _find("Name"), _find("Timestamp")
+
+
+def _cell(row, idx):
+    return row[idx] if idx is not None and len(row) > idx else ""
+
+
+def _whos_here_header_stale(document, title, state):
+    """True when a worksheet's header row must be (re)read before its rows."""
+    if state["header"] is None:
+        return True
+    with _sync_state_lock:
+        for action, offset in _WHOS_HERE_BLOCKS.items():
+            written = _header_cache.get((document, title, action))
+            if written is not None and tuple(state["header"][offset:offset + len(written)]) != written:
+                return True   # The app has rewritten this block's headers since
+    return False
+
+
+def _whos_here_projection(state, action):
+    """Return (first column, last column, (ID, Name, Timestamp) offsets) to read for a block.
+
+    Returns None when the block logs no timestamps and so cannot show who is here.
+    """
+    id_idx, name_idx, ts_idx = state["columns"][action]
+    if id_idx is None or ts_idx is None:
         return None
+    used = [idx for idx in (id_idx, name_idx, ts_idx) if idx is not None]
+    first, last = min(used), max(used)
+    offset = _WHOS_HERE_BLOCKS[action]
+    fields = tuple(None if idx is None else idx - first for idx in (id_idx, name_idx, ts_idx))
+    return _col_num_to_letter(offset + first + 1), _col_num_to_letter(offset + last + 1), fields
 
 
-def fetch_whos_here_from_sheets(sheet_names, document=None):
+def _scan_whos_here_worksheets(spreadsheet, document, sheet_names, full=False):
+    """Bring the scan state of several worksheets up to date (call with _whos_here_lock held).
+
+    Costs one values.batchGet for all of them, plus one header read when a
+    worksheet's header map is unknown or stale.  Returns title -> state.
+    """
+    states = {}
+    for title in sheet_names:
+        state = _whos_here_state.get((document, title))
+        if state is None or full or time.time() - state["full_scan_at"] >= WHOS_HERE_FULL_SCAN_INTERVAL:
+            state = _new_whos_here_state()
+        states[title] = state
+
+    pending = list(sheet_names)
+    for attempt in range(2):
+        # Resolve header maps that are unknown or out of date (one request).
+        need_header = [title for title in pending if _whos_here_header_stale(document, title, states[title])]
+        if need_header:
+            response = _google_call("read", spreadsheet.values_batch_get,
+                                    [_a1_range(title, "A1:N1") for title in need_header])
+            value_ranges = response.get("valueRanges", [])
+            for idx, title in enumerate(need_header):
+                values = value_ranges[idx].get("values", []) if idx < len(value_ranges) else []
+                header = values[0] if values else []
+                state = states[title]
+                if state["header"] is not None and header != state["header"]:
+                    state = states[title] = _new_whos_here_state()   # Layout changed; start over
+                state["header"] = header
+                state["columns"] = {action: _block_field_indexes(header, action) for action in _WHOS_HERE_BLOCKS}
+                # Let the header cache notice changes made by other stations or by hand.
+                _observe_block_headers(document, title, "in", header[0:7])
+                _observe_block_headers(document, title, "out", header[7:])
+
+        # Read the ID/Name/Timestamp columns of every block from its mark down (one request).
+        reads = []   # (title, action, fields)
+        ranges = []
+        for title in pending:
+            state = states[title]
+            for action in _WHOS_HERE_BLOCKS:
+                projection = _whos_here_projection(state, action)
+                if projection is None:
+                    continue
+                first_col, last_col, fields = projection
+                reads.append((title, action, fields))
+                ranges.append(_a1_range(title, f"{first_col}{state['marks'][action]}:{last_col}"))
+        tails = {}
+        if ranges:
+            response = _google_call("read", spreadsheet.values_batch_get, ranges)
+            value_ranges = response.get("valueRanges", [])
+            for idx, (title, action, fields) in enumerate(reads):
+                tails[(title, action)] = (value_ranges[idx].get("values", []) if idx < len(value_ranges) else [], fields)
+
+        # Rescan from the top any worksheet whose marks no longer line up.
+        stale = []
+        for (title, action), (tail, (id_idx, _, ts_idx)) in tails.items():
+            state = states[title]
+            if state["marks"][action] > 1 and title not in stale:
+                anchor = (_cell(tail[0], id_idx), _cell(tail[0], ts_idx)) if tail else None
+                if anchor != state["anchors"][action]:
+                    stale.append(title)
+        if stale and not attempt:
+            for title in stale:
+                print(f"fetch_whos_here_from_sheets: '{title}' changed above the last scanned row; rescanning it")
+                states[title] = _new_whos_here_state()
+            for key in [key for key in tails if key[0] in stale]:
+                del tails[key]
+        for (title, action), (tail, fields) in tails.items():
+            _fold_whos_here_rows(document, title, states[title], action, tail, fields)
+        if not stale or attempt:
+            break
+        pending = stale
+
+    for title, state in states.items():
+        _whos_here_state[(document, title)] = state
+    return states
+
+
+def _fold_whos_here_rows(document, title, state, action, tail, fields):
+    """Merge the rows read past a block's mark into the per-person state."""
+    id_idx, name_idx, ts_idx = fields
+    marks = state["marks"]
+    last_row = marks[action]
+    rows = tail[1:]   # tail[0] is the mark's row
+    epochs = parse_epochs([_cell(row, ts_idx) for row in rows])
+    latest = state["last_in"] if action == "in" else state["last_out"]
+    for row_idx, row, ts in zip(range(marks[action] + 1, marks[action] + 1 + len(rows)), rows, epochs):
+        if not row:
+            continue
+        row_id = _cell(row, id_idx)
+        if row_id != "":
+            last_row = row_idx
+        if ts is None:
+            continue
+        row_name = _cell(row, name_idx)
+        person = row_name if row_name else f"ID {row_id}" if row_id else ""
+        if person and ts > latest.get(person, -1):
+            latest[person] = ts
+    if last_row != marks[action]:
+        row = tail[last_row - marks[action]]
+        state["anchors"][action] = (_cell(row, id_idx), _cell(row, ts_idx))
+        marks[action] = last_row
+    # Let the row cursors notice rows added by other stations.
+    _observe_block_rows(document, title, action, marks[action])
+
+
+def fetch_whos_here_from_sheets(sheet_names, document=None, full=False):
     """
     Scan one or more attendance sub-sheets and return a dict of people
     who are currently signed in (i.e. their most recent sign-in has no
     matching sign-out afterwards).
 
+    All worksheets are read in a single request, fetching only the ID, Name
+    and Timestamp columns of rows appended since the previous call (see
+    "Who's Here Scan"); pass ``full=True`` to rescan every worksheet.
+
     The sheet structure is:
       Sign-ins:  A=ID, B=Name, C=Timestamp
       Sign-outs: H=ID, I=Name, J=Timestamp
@@ -704,87 +3636,52 @@ def fetch_whos_here_from_sheets(sheet_names, document=None):
     Returns:
         dict: name (str) -> sign-in timestamp string  "HH:MM AM/PM, YYYY-MM-DD"
     """
-    from datetime import datetime as _dt
-
     currently_here = {}  # name -> friendly timestamp string
+    sheet_names = [title for title in dict.fromkeys(sheet_names) if title]
+    if not sheet_names:
+        return currently_here
 
     try:
+        document = _resolve_document(document)
         spreadsheet = setup_google_sheet(document)
     except Exception as e:
         print(f"fetch_whos_here_from_sheets: Cannot open spreadsheet: {e}")
         return currently_here
 
-    for sheet_name in sheet_names:
-        try:
-            sheet = spreadsheet.worksheet(sheet_name)
-
-            # Pull all data at once to minimise API calls
-            all_values = sheet.get_all_values()
-            if len(all_values) <= 1:
-                continue  # only header row
-
-            header = all_values[0]
-            rows = all_values[1:]  # skip header
-
-            def _find_header_idx(section_start, section_end, header_name):
-                for idx in range(section_start, min(section_end, len(header))):
-                    if str(header[idx]).strip().lower() == header_name.lower():
-                        return idx
-                return None
-
-            in_id_idx = _find_header_idx(0, 7, "ID")
-            in_name_idx = _find_header_idx(0, 7, "Name")
-            in_ts_idx = _find_header_idx(0, 7, "Timestamp")
-
-            out_id_idx = _find_header_idx(7, len(header), "ID")
-            out_name_idx = _find_header_idx(7, len(header), "Name")
-            out_ts_idx = _find_header_idx(7, len(header), "Timestamp")
-
-            # If timestamps are not being logged, this sheet cannot contribute
-            # reliable signed-in state.
-            if in_ts_idx is None:
-                continue
-
-            # Build per-person latest sign-in and sign-out datetimes
-            # sign_in:  col A(0)=ID, B(1)=Name, C(2)=Timestamp
-            # sign_out: col H(7)=ID, I(8)=Name, J(9)=Timestamp
-            person_last_in = {}   # name -> (datetime, friendly_ts)
-            person_last_out = {}  # name -> datetime
-
-            for row in rows:
-                # --- sign-in side ---
-                if in_ts_idx is not None and len(row) > in_ts_idx and row[in_ts_idx]:
-                    sign_in_name = row[in_name_idx] if in_name_idx is not None and len(row) > in_name_idx else ""
-                    sign_in_id = row[in_id_idx] if in_id_idx is not None and len(row) > in_id_idx else ""
-                    name_in = sign_in_name if sign_in_name else f"ID {sign_in_id}" if sign_in_id else ""
-                    ts_in = parse_timestamp(row[in_ts_idx])
-                    if name_in and ts_in:
-                        if name_in not in person_last_in or ts_in > person_last_in[name_in][0]:
-                            # Build a friendly timestamp string "HH:MM AM/PM, YYYY-MM-DD"
-                            friendly = ts_in.strftime("%I:%M %p") + ", " + ts_in.strftime("%Y-%m-%d")
-                            person_last_in[name_in] = (ts_in, friendly)
-
-                # --- sign-out side ---
-                if out_ts_idx is not None and len(row) > out_ts_idx and row[out_ts_idx]:
-                    sign_out_name = row[out_name_idx] if out_name_idx is not None and len(row) > out_name_idx else ""
-                    sign_out_id = row[out_id_idx] if out_id_idx is not None and len(row) > out_id_idx else ""
-                    name_out = sign_out_name if sign_out_name else f"ID {sign_out_id}" if sign_out_id else ""
-                    ts_out = parse_timestamp(row[out_ts_idx])
-                    if name_out and ts_out:
-                        if name_out not in person_last_out or ts_out > person_last_out[name_out]:
-                            person_last_out[name_out] = ts_out
-
-            # A person is "here" if their latest sign-in is MORE RECENT than
-            # their latest sign-out (or they have no sign-out at all).
-            for name, (last_in_dt, friendly_ts) in person_last_in.items():
-                last_out_dt = person_last_out.get(name)
-                if last_out_dt is None or last_in_dt > last_out_dt:
-                    # Also skip anyone signed in > 12 hours ago
-                    if (_dt.now() - last_in_dt).total_seconds() < 12 * 3600:
-                        currently_here[name] = friendly_ts
+    def _scan_failed(titles, e):
+        for title in titles:
+            _invalidate_on_missing(e, document, title)
+            _whos_here_state.pop((document, title), None)
+        print(f"fetch_whos_here_from_sheets: Error scanning {', '.join(repr(t) for t in titles)}: {e}")
 
+    with _whos_here_lock:
+        try:
+            states = _scan_whos_here_worksheets(spreadsheet, document, sheet_names, full)
         except Exception as e:
-            print(f"fetch_whos_here_from_sheets: Error scanning '{sheet_name}': {e}")
+            states = {}
+            if len(sheet_names) == 1 or _classify_sync_error(e) != "permanent":
+                _scan_failed(sheet_names, e)
+            else:
+                # One bad tab (deleted or renamed) rejects the whole batch;
+                # scan the tabs one by one so the others still show.
+                for title in sheet_names:
+                    try:
+                        states.update(_scan_whos_here_worksheets(spreadsheet, document, [title], full))
+                    except Exception as tab_error:
+                        _scan_failed([title], tab_error)
+        snapshots = [(dict(state["last_in"]), dict(state["last_out"])) for state in states.values()]
+
+    now = now_epoch()
+    for person_last_in, person_last_out in snapshots:
+        # A person is "here" if their latest sign-in is MORE RECENT than
+        # their latest sign-out (or they have no sign-out at all).
+        for name, last_in in person_last_in.items():
+            last_out = person_last_out.get(name)
+            if last_out is None or last_in > last_out:
+                # Also skip anyone signed in > 12 hours ago
+                if now - last_in < WHOS_HERE_WINDOW:
+                    # Friendly timestamp string "HH:MM AM/PM, YYYY-MM-DD"
+                    currently_here[name] = format_epoch(last_in)
 
     return currently_here
 
@@ -808,8 +3705,7 @@ def get_last_action_from_sheet(student_id, sheet_name, document=None):
              or "out" as default if no records found
     """
     try:
-        spreadsheet = setup_google_sheet(document)
-        sheet = spreadsheet.worksheet(sheet_name)
+        sheet = get_pooled_worksheet(sheet_name, document)
         
         student_id_str = str(student_id)
         
@@ -817,14 +3713,14 @@ def get_last_action_from_sheet(student_id, sheet_name, document=None):
         last_sign_out_time = None
         
         # Step 1: Fetch only the sign-in ID column (A) to find matching rows
-        sign_in_ids = sheet.col_values(1)  # Column A (sign-in IDs)
+        sign_in_ids = _google_call("read", sheet.col_values, 1)  # Column A (sign-in IDs)
         sign_in_matching_rows = []
         for row_idx, cell_id in enumerate(sign_in_ids[1:], start=2):  # Skip header
             if str(cell_id) == student_id_str:
                 sign_in_matching_rows.append(row_idx)
         
         # Step 2: Fetch only the sign-out ID column (H) to find matching rows
-        sign_out_ids = sheet.col_values(8)  # Column H (sign-out IDs)
+        sign_out_ids = _google_call("read", sheet.col_values, 8)  # Column H (sign-out IDs)
         sign_out_matching_rows = []
         for row_idx, cell_id in enumerate(sign_out_ids[1:], start=2):  # Skip header
             if str(cell_id) == student_id_str:
@@ -832,7 +3728,7 @@ def get_last_action_from_sheet(student_id, sheet_name, document=None):
         
         # Step 3: Fetch timestamps only for matching sign-in rows (column C)
         for row_idx in sign_in_matching_rows:
-            timestamp_str = sheet.cell(row_idx, 3).value  # Column C (timestamp)
+            timestamp_str = _google_call("read", sheet.cell, row_idx, 3).value  # Column C (timestamp)
             timestamp = parse_timestamp(timestamp_str)
             if timestamp:
                 if last_sign_in_time is None or timestamp > last_sign_in_time:
@@ -840,7 +3736,7 @@ def get_last_action_from_sheet(student_id, sheet_name, document=None):
         
         # Step 4: Fetch timestamps only for matching sign-out rows (column J)
         for row_idx in sign_out_matching_rows:
-            timestamp_str = sheet.cell(row_idx, 10).value  # Column J (timestamp)
+            timestamp_str = _google_call("read", sheet.cell, row_idx, 10).value  # Column J (timestamp)
             timestamp = parse_timestamp(timestamp_str)
             if timestamp:
                 if last_sign_out_time is None or timestamp > last_sign_out_time:
@@ -872,7 +3768,7 @@ def create_attendance_spreadsheet(name):
     """Create a new Google Spreadsheet with the standard attendance worksheets.
 
     Creates:
-      • Main Attendance  (headers in A1:F1 and H1:M1)
+      • Main Attendance  (headers in A1:F1 and H1:M1, record IDs in G and N)
       • Build Season     (same layout)
       • IDs              (Name, ID)
 
@@ -887,25 +3783,25 @@ def create_attendance_spreadsheet(name):
     Raises:
         Exception on API errors.
     """
-    client = get_gspread_client()
-    spreadsheet = client.create(name)
+    client = _get_pooled_client()
+    spreadsheet = _google_call("write", client.create, name)
 
     attendance_headers = [["ID", "Name", "Timestamp", "Image Path", "Image URL", "Reason",
                            "", "ID", "Name", "Timestamp", "Image Path", "Image URL", "Reason"]]
 
-    main_ws = spreadsheet.add_worksheet(title="Main Attendance", rows=1000, cols=13)
-    main_ws.update(range_name="A1:M1", values=attendance_headers)
+    main_ws = _google_call("write", spreadsheet.add_worksheet, title="Main Attendance", rows=1000, cols=14)
+    _google_call("write", main_ws.update, range_name="A1:M1", values=attendance_headers)
 
-    build_ws = spreadsheet.add_worksheet(title="Build Season", rows=1000, cols=13)
-    build_ws.update(range_name="A1:M1", values=attendance_headers)
+    build_ws = _google_call("write", spreadsheet.add_worksheet, title="Build Season", rows=1000, cols=14)
+    _google_call("write", build_ws.update, range_name="A1:M1", values=attendance_headers)
 
-    ids_ws = spreadsheet.add_worksheet(title="IDs", rows=1000, cols=2)
-    ids_ws.update(range_name="A1:B1", values=[["Name", "ID"]])
+    ids_ws = _google_call("write", spreadsheet.add_worksheet, title="IDs", rows=1000, cols=2)
+    _google_call("write", ids_ws.update, range_name="A1:B1", values=[["Name", "ID"]])
 
     # Remove the default blank 'Sheet1'
     try:
-        default_sheet = spreadsheet.worksheet("Sheet1")
-        spreadsheet.del_worksheet(default_sheet)
+        default_sheet = _google_call("read", spreadsheet.worksheet, "Sheet1")
+        _google_call("write", spreadsheet.del_worksheet, default_sheet)
     except Exception:
         pass
 
@@ -914,5 +3810,5 @@ def create_attendance_spreadsheet(name):
 
 def list_user_spreadsheets():
     """Return a list of spreadsheet titles in the signed-in user's Drive."""
-    client = get_gspread_client()
-    return [s.title for s in client.openall()]
+    client = _get_pooled_client()
+    return [s.title for s in _google_call("drive", client.openall)]
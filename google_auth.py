@@ -15,6 +15,9 @@ Module-level constants:
     SCOPES           -- OAuth 2.0 scopes requested from Google.
     TOKEN_FILE       -- Absolute path to the persisted token JSON file.
 
+Token refreshes and account lookups go through the shared rate limiter in
+``api_quota``.
+
 Public functions:
     get_credentials  -- Return valid OAuth credentials, raising if not signed in.
     get_gspread_client -- Return an authorised gspread Client.
@@ -33,6 +36,7 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 import gspread
+from api_quota import call_google_api
 
 # ---------------------------------------------------------------------------
 # Scopes – these define what the app is allowed to do with the user's account.
@@ -130,7 +134,7 @@ def get_credentials():
 
     if creds and creds.expired and creds.refresh_token:
         try:
-            creds.refresh(Request())
+            call_google_api("drive", creds.refresh, Request())
             _save_token(creds)
             return creds
         except Exception:
@@ -176,7 +180,7 @@ def get_user_email():
     try:
         creds = get_credentials()
         service = build("oauth2", "v2", credentials=creds)
-        info = service.userinfo().get().execute()
+        info = call_google_api("drive", service.userinfo().get().execute)
         return info.get("email", "Unknown")
     except Exception:
         return "Unknown"
@@ -0,0 +1,165 @@
+"""
+Compact, direct-addressed ID -> name index for the Attendance App.
+
+Student IDs are 6-digit integers, so instead of a dict of ID strings the
+index keeps one array slot per possible ID (100000-999999).  Each slot holds
+the position of the student's name in an interned name table, and a bitmap
+records which IDs are known.  A lookup is a subtraction, a bit test and two
+array reads -- no string conversion or hashing for an int ID -- and the whole
+table stays a few megabytes however large the roster (a 50k-student district
+roster needs about 4 MB, where the equivalent str -> str dicts need several
+times that).
+
+IDs that are not canonical 6-digit numbers (leading zeros, letters, other
+lengths) still work; they are kept in a small fallback dict.  ID strings and
+ints name the same student only when the int's decimal form is the string,
+exactly as with the old ``str(student_id)`` dict lookups.
+
+Module-level constants:
+    ID_BASE  -- Smallest direct-addressed ID (100000).
+    ID_SPAN  -- Number of direct-addressed IDs (900000).
+
+Public classes:
+    CompactIdIndex -- The ID/name index with get_name/get_id lookups.
+"""
+
+from array import array
+
+
+ID_BASE = 100000   # Smallest 6-digit ID
+ID_SPAN = 900000   # IDs ID_BASE .. ID_BASE + ID_SPAN - 1 are direct-addressed
+
+
+def _offset(student_id):
+    """Return the table offset of a canonical 6-digit ID, or None for any other ID."""
+    if type(student_id) is int:
+        offset = student_id - ID_BASE
+        return offset if 0 <= offset < ID_SPAN else None
+    if isinstance(student_id, str) and len(student_id) == 6 and student_id.isascii() \
+            and student_id.isdigit() and student_id[0] != "0":
+        return int(student_id) - ID_BASE
+    return None
+
+
+class CompactIdIndex:
+    """ID -> name (and name -> ID) index backed by an array, a bitmap and a name table.
+
+    IDs are returned as strings and names as the strings they were added
+    with.  The index is not thread-safe for writers; driveUpload builds a new
+    one (or a ``copy()``) and swaps it in rather than changing a published one.
+    """
+
+    __slots__ = ("_slots", "_known", "_names", "_name_slot", "_name_ids", "_other", "_other_ids", "_count")
+
+    def __init__(self, pairs=()):
+        self._slots = array("i", bytes(4 * ID_SPAN))   # offset -> name slot
+        self._known = bytearray((ID_SPAN + 7) // 8)    # bitmap of offsets in use
+        self._names = []          # name slot -> name (each distinct name stored once)
+        self._name_slot = {}      # name -> name slot
+        self._name_ids = array("i")  # name slot -> last ID given that name (-1: see _other_ids)
+        self._other = {}          # non-canonical ID string -> name slot
+        self._other_ids = {}      # name slot -> non-canonical ID string last given that name
+        self._count = 0
+        for student_id, name in pairs:
+            self.add(student_id, name)
+
+    def _intern(self, name):
+        slot = self._name_slot.get(name)
+        if slot is None:
+            slot = len(self._names)
+            self._names.append(name)
+            self._name_slot[name] = slot
+            self._name_ids.append(-1)
+        return slot
+
+    def add(self, student_id, name):
+        """Map ``student_id`` to ``name``; the name now looks up this ID."""
+        slot = self._intern(name)
+        offset = _offset(student_id)
+        if offset is None:
+            key = str(student_id)
+            if key not in self._other:
+                self._count += 1
+            self._other[key] = slot
+            self._other_ids[slot] = key
+            self._name_ids[slot] = -1
+            return
+        mask = 1 << (offset & 7)
+        if not self._known[offset >> 3] & mask:
+            self._known[offset >> 3] |= mask
+            self._count += 1
+        self._slots[offset] = slot
+        self._name_ids[slot] = offset + ID_BASE
+
+    def discard(self, student_id):
+        """Forget ``student_id`` if it is present."""
+        offset = _offset(student_id)
+        if offset is None:
+            if self._other.pop(str(student_id), None) is not None:
+                self._count -= 1
+            return
+        mask = 1 << (offset & 7)
+        if self._known[offset >> 3] & mask:
+            self._known[offset >> 3] &= ~mask & 0xFF
+            self._count -= 1
+
+    def get_name(self, student_id, default=None):
+        """Return the name for ``student_id`` (int or str), or ``default``."""
+        offset = _offset(student_id)
+        if offset is None:
+            slot = self._other.get(str(student_id))
+            return default if slot is None else self._names[slot]
+        if self._known[offset >> 3] & (1 << (offset & 7)):
+            return self._names[self._slots[offset]]
+        return default
+
+    def get_id(self, name, default=None):
+        """Return the ID string most recently given ``name``, or ``default``."""
+        slot = self._name_slot.get(name)
+        if slot is None:
+            return default
+        student_id = self._name_ids[slot]
+        if student_id < 0:
+            student_id = self._other_ids.get(slot)
+            if student_id is None or self._other.get(student_id) != slot:
+                return default
+            return student_id
+        offset = student_id - ID_BASE
+        if self._known[offset >> 3] & (1 << (offset & 7)) and self._slots[offset] == slot:
+            return str(student_id)
+        return default   # That ID was removed or renamed since
+
+    def __contains__(self, student_id):
+        offset = _offset(student_id)
+        if offset is None:
+            return str(student_id) in self._other
+        return bool(self._known[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        """Yield ``(id_string, name)`` pairs, direct-addressed IDs in numeric order first."""
+        known, slots, names = self._known, self._slots, self._names
+        for byte_index, bits in enumerate(known):
+            if not bits:
+                continue
+            for bit in range(8):
+                if bits & (1 << bit):
+                    offset = (byte_index << 3) | bit
+                    yield str(offset + ID_BASE), names[slots[offset]]
+        for student_id, slot in self._other.items():
+            yield student_id, names[slot]
+
+    def copy(self):
+        """Return an independent copy (the arrays are copied in bulk, not rebuilt)."""
+        new = CompactIdIndex.__new__(CompactIdIndex)
+        new._slots = self._slots[:]
+        new._known = bytearray(self._known)
+        new._names = list(self._names)
+        new._name_slot = dict(self._name_slot)
+        new._name_ids = self._name_ids[:]
+        new._other = dict(self._other)
+        new._other_ids = dict(self._other_ids)
+        new._count = self._count
+        return new
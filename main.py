@@ -7,6 +7,7 @@ camera capture (camera), and OAuth authentication (google_auth).
 
 Startup sequence:
   1. Settings loaded from settings.json (load_settings).
+     The ID cache snapshot (ids_cache.json) is loaded so scans work at once.
   2. Poppins font registered with the OS (load_private_font).
   3. Root window and all main widgets created.
   4. apply_ui_settings() applies the saved theme and font sizes.
@@ -15,7 +16,7 @@ Startup sequence:
        - If not signed in, the yellow banner is displayed and the form is greyed out.
        - Otherwise the sheet is verified in a background thread, then
          initialize_google_connection() populates the ID cache, Who's Here
-         state, and starts background_sync_worker.
+         state, and starts the background sync lanes (start_background_sync).
 
 Function groups
 ---------------
@@ -102,9 +103,9 @@ import sys
 from PIL import ImageFont
 from datetime import datetime
 import tkinter as tk
-from tkinter import messagebox, Label, Entry, Button, Toplevel, Radiobutton, StringVar, OptionMenu, BooleanVar, Checkbutton
+from tkinter import messagebox, filedialog, Label, Entry, Button, Toplevel, Radiobutton, StringVar, OptionMenu, BooleanVar, Checkbutton
 from driveUpload import *
-from camera import takePic
+from camera import capture_jpeg
 from google_auth import is_signed_in, get_user_email, sign_out, sign_in
 from tkinter import font
 import time
@@ -381,7 +382,7 @@ def initialize_google_connection():
         ensure_ids_sheet_exists()
         print("IDs sheet ready.")
 
-        print("Loading IDs cache from Google Sheets...")
+        print("Reconciling IDs cache with Google Sheets...")
         if load_ids_cache():
             print("IDs cache loaded successfully.")
         else:
@@ -403,6 +404,7 @@ def initialize_google_connection():
         except Exception as e:
             print(f"Warning: Could not load Who's Here from sheets: {e}")
 
+        replay_sync_journal()
         start_background_sync()
         print("Background sync started.")
     except Exception as e:
@@ -724,6 +726,10 @@ def apply_ui_settings():
         footer_label.configure(bg=BG_MAIN, fg=FOOTER_TEXT, font=tk_font_small)
     except Exception:
         pass
+    try:
+        offline_label.configure(bg=BG_MAIN, fg=NEGATIVE, font=tk_font_small)
+    except Exception:
+        pass
 
 # --------------------------
 # Core logic functions 
@@ -739,6 +745,10 @@ whos_here_populate_func = None  # Reference to populate function for manual refr
 # camera_trigger controls whether camera is used on sign in, sign out, or both.
 camera_frequency = 1.0
 camera_trigger = "both"  # one of: "in", "out", "both"
+# Photos are encoded in memory at this JPEG quality and capture resolution.
+camera_jpeg_quality = 85
+camera_resolution = "640x480"
+CAMERA_RESOLUTIONS = ("320x240", "640x480", "800x600", "1280x720")
 
 # Keyboardless mode settings
 keyboardless_mode = False
@@ -757,6 +767,15 @@ easy_signin_mode = False
 # Google Sheet ID (set by user in options)
 sheet_id = ""
 
+# Background sync: how long (ms) a woken sync lane gathers a burst of scans before flushing
+sync_coalesce_ms = 150
+# "append" (server picks the row; safe with several kiosks) or "cursor" (locally tracked rows)
+sync_write_mode = "append"
+# Seconds the app keeps uploading queued records after the window is closed
+sync_shutdown_deadline_s = 20
+# Cleared by on_closing so no new scans are accepted while the queues drain
+accepting_scans = True
+
 # Settings persistence
 DEFAULT_SETTINGS = {
     "ui_theme": "Light",
@@ -764,6 +783,8 @@ DEFAULT_SETTINGS = {
     "whos_here_scale": 1.0,
     "camera_frequency": 1.0,
     "camera_trigger": "both",
+    "camera_jpeg_quality": 85,
+    "camera_resolution": "640x480",
     "keyboardless_mode": False,
     "keyboardless_bindings": {
         "sign_in": "",
@@ -783,6 +804,11 @@ DEFAULT_SETTINGS = {
             "early_signout": "18:45"
         },
         "cutoff_enabled_by_worksheet": {}
+    },
+    "sync": {
+        "coalesce_window_ms": 150,
+        "write_mode": "append",
+        "shutdown_deadline_s": 20
     }
 }
 
@@ -799,6 +825,8 @@ def save_settings():
         "whos_here_scale": whos_here_scale,
         "camera_frequency": camera_frequency,
         "camera_trigger": camera_trigger,
+        "camera_jpeg_quality": camera_jpeg_quality,
+        "camera_resolution": camera_resolution,
         "keyboardless_mode": keyboardless_mode,
         "keyboardless_bindings": keyboardless_bindings,
         "easy_signin_mode": easy_signin_mode,
@@ -811,6 +839,11 @@ def save_settings():
                 "early_signout": early_signout_cutoff
             },
             "cutoff_enabled_by_worksheet": worksheet_cutoff_toggles
+        },
+        "sync": {
+            "coalesce_window_ms": sync_coalesce_ms,
+            "write_mode": sync_write_mode,
+            "shutdown_deadline_s": sync_shutdown_deadline_s
         }
     }
     try:
@@ -827,7 +860,9 @@ def load_settings():
     be parsed, so the app always starts in a consistent state.
     """
     global ui_theme, main_ui_scale, whos_here_scale, camera_frequency, camera_trigger, keyboardless_mode, keyboardless_bindings, easy_signin_mode, sheet_id
+    global camera_jpeg_quality, camera_resolution
     global logging_field_toggles, worksheet_targets, late_signin_cutoff, early_signout_cutoff, worksheet_cutoff_toggles
+    global sync_coalesce_ms, sync_write_mode, sync_shutdown_deadline_s
     try:
         if os.path.exists(SETTINGS_FILE):
             with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
@@ -837,6 +872,10 @@ def load_settings():
             whos_here_scale = float(data.get("whos_here_scale", DEFAULT_SETTINGS["whos_here_scale"]))
             camera_frequency = float(data.get("camera_frequency", DEFAULT_SETTINGS["camera_frequency"]))
             camera_trigger = data.get("camera_trigger", DEFAULT_SETTINGS["camera_trigger"])
+            camera_jpeg_quality = max(30, min(95, int(data.get("camera_jpeg_quality", DEFAULT_SETTINGS["camera_jpeg_quality"]))))
+            camera_resolution = data.get("camera_resolution", DEFAULT_SETTINGS["camera_resolution"])
+            if camera_resolution not in CAMERA_RESOLUTIONS:
+                camera_resolution = DEFAULT_SETTINGS["camera_resolution"]
             keyboardless_mode = bool(data.get("keyboardless_mode", DEFAULT_SETTINGS["keyboardless_mode"]))
             loaded_bindings = data.get("keyboardless_bindings", {})
             keyboardless_bindings = {
@@ -871,6 +910,14 @@ def load_settings():
                 loaded_cutoffs.get("early_signout", DEFAULT_SETTINGS["data_logging"]["time_cutoffs"]["early_signout"]),
                 DEFAULT_SETTINGS["data_logging"]["time_cutoffs"]["early_signout"]
             )
+
+            loaded_sync = data.get("sync", {})
+            loaded_sync = loaded_sync if isinstance(loaded_sync, dict) else {}
+            sync_coalesce_ms = max(0, min(int(SYNC_COALESCE_WINDOW_MAX * 1000), int(loaded_sync.get("coalesce_window_ms", DEFAULT_SETTINGS["sync"]["coalesce_window_ms"]))))
+            sync_write_mode = loaded_sync.get("write_mode", DEFAULT_SETTINGS["sync"]["write_mode"])
+            if sync_write_mode not in ("append", "cursor"):
+                sync_write_mode = DEFAULT_SETTINGS["sync"]["write_mode"]
+            sync_shutdown_deadline_s = max(0, min(300, int(loaded_sync.get("shutdown_deadline_s", DEFAULT_SETTINGS["sync"]["shutdown_deadline_s"]))))
     except Exception:
         # on error, fall back to defaults
         ui_theme = DEFAULT_SETTINGS["ui_theme"]
@@ -878,6 +925,8 @@ def load_settings():
         whos_here_scale = DEFAULT_SETTINGS["whos_here_scale"]
         camera_frequency = DEFAULT_SETTINGS["camera_frequency"]
         camera_trigger = DEFAULT_SETTINGS["camera_trigger"]
+        camera_jpeg_quality = DEFAULT_SETTINGS["camera_jpeg_quality"]
+        camera_resolution = DEFAULT_SETTINGS["camera_resolution"]
         keyboardless_mode = DEFAULT_SETTINGS["keyboardless_mode"]
         keyboardless_bindings = DEFAULT_SETTINGS["keyboardless_bindings"].copy()
         easy_signin_mode = DEFAULT_SETTINGS["easy_signin_mode"]
@@ -887,6 +936,9 @@ def load_settings():
         late_signin_cutoff = DEFAULT_SETTINGS["data_logging"]["time_cutoffs"]["late_signin"]
         early_signout_cutoff = DEFAULT_SETTINGS["data_logging"]["time_cutoffs"]["early_signout"]
         worksheet_cutoff_toggles = DEFAULT_SETTINGS["data_logging"]["cutoff_enabled_by_worksheet"].copy()
+        sync_coalesce_ms = DEFAULT_SETTINGS["sync"]["coalesce_window_ms"]
+        sync_write_mode = DEFAULT_SETTINGS["sync"]["write_mode"]
+        sync_shutdown_deadline_s = DEFAULT_SETTINGS["sync"]["shutdown_deadline_s"]
 
 def add_sign_in(name, timestamp_str):
     """Add or update a person's sign-in time in the global tracking dict."""
@@ -936,6 +988,10 @@ def scan_id(event=None):
     Args:
         event: Optional Tkinter event (passed automatically when bound to a key).
     """
+    # Guard: the app is closing and draining its upload queues
+    if not accepting_scans:
+        return
+
     # Guard: must be signed in before recording attendance
     if not is_signed_in():
         messagebox.showwarning(
@@ -1199,9 +1255,10 @@ def take_picture_and_record(window, current_id, name):
     """Capture a webcam photo, then call process_attendance or open the fail dialog.
 
     Re-checks camera_trigger and camera_frequency in case the smile popup was
-    already showing when settings changed.  On a successful capture (takePic
-    returns None) calls ``process_attendance``; on failure opens
-    ``open_fail_window``.
+    already showing when settings changed.  The photo is encoded in memory
+    (``capture_jpeg`` at ``camera_jpeg_quality``/``camera_resolution``) and
+    handed to ``process_attendance``, which decides whether a copy is saved
+    to disk; on failure opens ``open_fail_window``.
 
     Args:
         window:     The smile Toplevel to destroy before proceeding.
@@ -1211,8 +1268,6 @@ def take_picture_and_record(window, current_id, name):
     now = datetime.now()
     global folder
     folder = f"images/{current_id}-{name}"
-    if not os.path.isdir(folder):
-        os.makedirs(folder)
 
     # Decide whether to attempt taking a picture based on camera settings
     try:
@@ -1249,11 +1304,15 @@ def take_picture_and_record(window, current_id, name):
     file_date = now.strftime("%I-%M-%p-%Y-%m-%d")
     global picName
     picName = f"{name}__{file_date}.jpeg"
-    confirmation = takePic(f"{name}__{file_date}", f"{current_id}-{name}")
+    try:
+        width, height = (int(part) for part in camera_resolution.split("x"))
+    except ValueError:
+        width, height = 640, 480
+    image_bytes = capture_jpeg(quality=camera_jpeg_quality, resolution=(width, height))
 
     window.destroy()
-    if (confirmation == None):
-        process_attendance(current_id, name)
+    if image_bytes is not None:
+        process_attendance(current_id, name, image_bytes=image_bytes)
     else:
         open_fail_window(current_id, name)
 
@@ -1304,21 +1363,24 @@ def display_fail_message(container):
     )
     loading_label.pack(expand=True, fill=tk.BOTH, padx=12, pady=10)
 
-def process_attendance(current_id, name, hasPic = True):
+def process_attendance(current_id, name, hasPic = True, image_bytes = None):
     """Record an attendance event locally and queue it for background Google push.
 
     Determines sign-in/out direction (easy_signin_mode or radiobutton),
     checks cutoff times to decide whether an early-sign-out or late-sign-in
     reason prompt is needed, updates the local sign_ins dict immediately,
-    places the full record onto ``attendance_queue`` for the background
-    worker, and shows a confirmation messagebox — all without waiting for
-    Google.
+    hands the full record to ``queue_attendance_record`` (which writes it to
+    the SQLite sync journal and queues it for the attendance sync lane), and
+    shows a confirmation messagebox — all without waiting for Google.
 
     Args:
         current_id: The six-digit integer ID that was scanned.
         name:       The student's display name.
         hasPic:     Whether a photo was successfully captured for this event.
                     Ignored when both image fields are disabled in logging settings.
+        image_bytes: The captured JPEG.  It is uploaded from memory and only
+                    saved under ``images/`` when the Image Path column is
+                    logged or the app is offline.
     """
     now = datetime.now()
     formatted_time = now.strftime("%I:%M %p")
@@ -1397,12 +1459,20 @@ def process_attendance(current_id, name, hasPic = True):
             img_picName = picName
         except Exception:
             hasPic = False
-
-    # Queue the Google push for background processing (non-blocking)
-    attendance_queue.put((
+    if hasPic and image_bytes is not None and (effective_fields.get("image_path", True) or is_sync_offline()):
+        try:
+            os.makedirs(img_folder, exist_ok=True)
+            with open(f"{img_folder}/{img_picName}", "wb") as f:
+                f.write(image_bytes)
+            image_bytes = None   # Uploaded from the saved file instead
+        except OSError as e:
+            print(f"Could not save photo to disk; uploading from memory: {e}")
+
+    # Journal and queue the Google push for background processing (non-blocking)
+    queue_attendance_record((
         current_id, name, full_date, event, reason, action,
         hasPic, img_folder, img_picName, volunteeringList, effective_fields
-    ))
+    ), image_bytes=image_bytes if hasPic else None)
 
     # Show confirmation immediately — no waiting for Google
     messagebox.showinfo(
@@ -1456,8 +1526,9 @@ def push_to_google(current_id, name, attendance_record, event, reason, load, act
     """Push a single attendance record directly to Google Sheets and Drive.
 
     This is a legacy synchronous helper retained for completeness.  The
-    active code path queues records via ``attendance_queue`` and
-    ``background_sync_worker`` instead.  This function destroys ``load``
+    active code path hands records to ``queue_attendance_record``, which
+    journals them in SQLite and queues them for the attendance sync lane,
+    instead.  This function destroys ``load``
     and shows a confirmation dialog in the main thread regardless of success
     or failure.
 
@@ -1685,9 +1756,13 @@ try:
 except Exception:
     pass
 
-# Apply saved sheet ID to the driveUpload module
+# Apply saved sheet ID and sync settings to the driveUpload module
 if sheet_id:
     set_default_doc(sheet_id)
+    # Scans resolve from the saved snapshot while the IDs sheet is reconciled
+    load_ids_snapshot()
+set_sync_coalesce_window(sync_coalesce_ms / 1000.0)
+set_sync_write_mode(sync_write_mode)
 
 load_private_font(os.path.join("fonts", "Poppins-Regular.ttf"))
 create_fonts()
@@ -1799,6 +1874,32 @@ footer = tk.Frame(root, bg=BG_MAIN if BG_MAIN else THEMES["Light"]["BG_MAIN"])
 footer.pack(fill="x", padx=24, pady=(0, 18))
 footer_label = Label(footer, text="Tip: Press Esc to exit fullscreen.", font=tk_font_small, bg=BG_MAIN if BG_MAIN else THEMES["Light"]["BG_MAIN"], fg=FOOTER_TEXT if FOOTER_TEXT else THEMES["Light"]["FOOTER_TEXT"])
 footer_label.pack(side="left", padx=6, pady=6)
+offline_label = Label(footer, text="", font=tk_font_small, bg=BG_MAIN if BG_MAIN else THEMES["Light"]["BG_MAIN"], fg=NEGATIVE if NEGATIVE else THEMES["Light"]["NEGATIVE"])
+offline_label.pack(side="right", padx=6, pady=6)
+offline_indicator_after_id = None
+
+
+def update_offline_indicator():
+    """Show the offline notice (with the upload backlog) in the footer while Google is unreachable.
+
+    Re-schedules itself every 5 s while offline so the waiting count stays current.
+    """
+    global offline_indicator_after_id
+    if offline_indicator_after_id is not None:
+        try:
+            root.after_cancel(offline_indicator_after_id)
+        except Exception:
+            pass
+        offline_indicator_after_id = None
+    if is_sync_offline():
+        waiting = sum(get_sync_backlog().values())
+        offline_label.config(text=f"● Offline — {waiting} record(s) waiting to upload")
+        offline_indicator_after_id = root.after(5000, update_offline_indicator)
+    else:
+        offline_label.config(text="")
+
+
+register_connectivity_callback(lambda online: root.after(0, update_offline_indicator))
 
 
 _auth_ok = False       # True once the user has a valid Google OAuth token
@@ -1985,7 +2086,7 @@ def open_whos_here_window():
                         continue
                     
                     # Queue auto sign-out for background push (no direct API call)
-                    attendance_queue.put((
+                    queue_attendance_record((
                         current_id, name, full_date, auto_event, "Didn't sign out",
                         "out", False, None, None, volunteeringList, get_effective_logging_fields()
                     ))
@@ -2427,11 +2528,13 @@ def exit_keyboardless_mode():
 def open_options_window(initial_section: str = "app_behavior"):
     """Open the multi-section Options/Settings dialog.
 
-    The dialog has a scrollable sidebar with four sections:
+    The dialog has a scrollable sidebar with six sections:
       - App Behavior: theme, UI scale, camera frequency/trigger, Easy Sign In.
       - Google Settings: sign-in/out, sheet create/connect.
       - Data Logging: field toggles, cutoff times, worksheet targets.
       - Keyboardless Mode: scanner binding configuration.
+      - Sync Queue: pending sync counts and dead-lettered records (retry/export).
+      - Diagnostics: live sync telemetry (API calls, latency, queue depth), JSON export.
 
     All changes are applied and persisted to settings.json only when the
     user clicks "Apply".  "Reset Defaults" restores DEFAULT_SETTINGS values.
@@ -2466,10 +2569,15 @@ def open_options_window(initial_section: str = "app_behavior"):
 
     # Local state for all sections
     theme_var_local = StringVar(value=ui_theme)
+    sync_coalesce_var = tk.IntVar(value=sync_coalesce_ms)
+    sync_write_mode_var = StringVar(value=sync_write_mode)
+    sync_shutdown_var = tk.IntVar(value=sync_shutdown_deadline_s)
     main_scale_var = tk.DoubleVar(value=main_ui_scale)
     whos_here_scale_var = tk.DoubleVar(value=whos_here_scale)
     camera_freq_var = tk.DoubleVar(value=camera_frequency)
     camera_trigger_var = tk.StringVar(value=camera_trigger)
+    camera_quality_var = tk.IntVar(value=camera_jpeg_quality)
+    camera_resolution_var = tk.StringVar(value=camera_resolution)
     easy_signin_var = BooleanVar(value=easy_signin_mode)
     keyboardless_enabled_var = BooleanVar(value=keyboardless_mode)
 
@@ -2652,6 +2760,8 @@ def open_options_window(initial_section: str = "app_behavior"):
         "google_settings": tk.Frame(content_inner, bg=panel_bg),
         "data_logging": tk.Frame(content_inner, bg=panel_bg),
         "keyboardless_mode": tk.Frame(content_inner, bg=panel_bg),
+        "sync_queue": tk.Frame(content_inner, bg=panel_bg),
+        "diagnostics": tk.Frame(content_inner, bg=panel_bg),
     }
 
     # App Behavior
@@ -2745,6 +2855,34 @@ def open_options_window(initial_section: str = "app_behavior"):
     tk.Radiobutton(trigger_frame, text="Both", variable=camera_trigger_var, value="both", bg=panel_bg, fg=text_color, font=tk_font_small, selectcolor=panel_bg).pack(side="left")
     tk.Radiobutton(trigger_frame, text="Never", variable=camera_trigger_var, value="never", bg=panel_bg, fg=text_color, font=tk_font_small, selectcolor=panel_bg).pack(side="left", padx=(8, 0))
 
+    tk.Label(app_frame, text="Photo Quality (JPEG):", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=18, pady=(6, 4))
+    tk.Label(
+        app_frame,
+        text="Photos are encoded in memory and uploaded directly. They are only saved to the images folder when Image Path is logged or the app is offline.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=900,
+        justify="left"
+    ).pack(anchor="w", padx=18, pady=(0, 4))
+    tk.Scale(
+        app_frame,
+        from_=30,
+        to=95,
+        resolution=5,
+        orient="horizontal",
+        variable=camera_quality_var,
+        bg=panel_bg,
+        fg=text_color,
+        highlightthickness=0,
+        troughcolor=accent
+    ).pack(fill="x", padx=18, pady=(0, 10))
+
+    tk.Label(app_frame, text="Photo Resolution:", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=18, pady=(6, 4))
+    camera_resolution_menu = OptionMenu(app_frame, camera_resolution_var, *CAMERA_RESOLUTIONS)
+    _style_optionmenu_local(camera_resolution_menu)
+    camera_resolution_menu.pack(anchor="w", padx=18, pady=(0, 10))
+
     tk.Label(app_frame, text="Easy Sign In Mode:", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=18, pady=(14, 4))
     tk.Label(
         app_frame,
@@ -2806,6 +2944,7 @@ def open_options_window(initial_section: str = "app_behavior"):
                 root.after(0, lambda err=str(e): _on_fail(err))
 
         def _on_success():
+            reset_handle_pool()
             refresh_account_display()
             google_status_var.set("Signed in successfully! Reconnecting to Google…")
             google_status_label.configure(fg=positive)
@@ -2828,6 +2967,7 @@ def open_options_window(initial_section: str = "app_behavior"):
             return
         stop_background_sync()
         sign_out()
+        reset_handle_pool()
         refresh_account_display()
         google_status_var.set("Signed out. Sign in again via the button above to restore access.")
         google_status_label.configure(fg=positive)
@@ -2947,6 +3087,55 @@ def open_options_window(initial_section: str = "app_behavior"):
     tk.Button(google_btn_row, text="Create Sheet", command=create_new_sheet_inline, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8).pack(side="left", padx=(8, 0))
     google_status_label.pack(anchor="w", padx=18, pady=(0, 10))
 
+    roster_card = tk.Frame(google_frame, bg=panel_bg, bd=1, relief="solid")
+    roster_card.pack(fill="x", padx=18, pady=(0, 8))
+    _style_card(roster_card)
+    tk.Label(roster_card, text="Roster Import", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=12, pady=(10, 2))
+    tk.Label(
+        roster_card,
+        text="Register a whole roster at once from a CSV or Excel (.xlsx) file with Name and ID columns. Students already registered are skipped.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=880,
+        justify="left"
+    ).pack(anchor="w", padx=12, pady=(0, 6))
+    roster_status_var = StringVar(value="")
+
+    def import_roster_file():
+        if not is_signed_in() or not get_default_doc():
+            roster_status_var.set("Sign in and link a sheet before importing a roster.")
+            return
+        path = filedialog.askopenfilename(
+            parent=opts,
+            title="Import Roster",
+            filetypes=[("Roster files", "*.csv *.xlsx"), ("CSV file", "*.csv"), ("Excel workbook", "*.xlsx")]
+        )
+        if not path:
+            return
+        roster_import_btn.configure(state="disabled")
+        roster_status_var.set("Importing…")
+
+        def _show_progress(summary):
+            roster_status_var.set(f"Importing… {summary['added']} added, {summary['existing']} already registered, {summary['invalid']} invalid")
+
+        def _worker():
+            try:
+                summary = import_roster(path, progress=lambda p: root.after(0, lambda: _show_progress(p)))
+                message = f"Done: {summary['added']} added, {summary['existing']} already registered, {summary['invalid']} invalid."
+                if summary["problems"]:
+                    message += "\n" + "\n".join(summary["problems"])
+            except Exception as e:
+                message = f"Roster import failed: {e}"
+            root.after(0, lambda: roster_status_var.set(message))
+            root.after(0, lambda: roster_import_btn.configure(state="normal") if roster_import_btn.winfo_exists() else None)
+
+        threading.Thread(target=_worker, daemon=True, name="RosterImport").start()
+
+    roster_import_btn = tk.Button(roster_card, text="Import Roster…", command=import_roster_file, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8)
+    roster_import_btn.pack(anchor="w", padx=12, pady=(0, 6))
+    tk.Label(roster_card, textvariable=roster_status_var, bg=panel_bg, fg=text_color, font=tk_font_small, wraplength=880, justify="left").pack(anchor="w", padx=12, pady=(0, 10))
+
     # Data Logging
     data_frame = sections["data_logging"]
     tk.Label(data_frame, text="Data Logging", bg=panel_bg, fg=text_color, font=tk_font_medium, wraplength=900).pack(anchor="w", padx=18, pady=(14, 4))
@@ -3294,6 +3483,238 @@ def open_options_window(initial_section: str = "app_behavior"):
     update_keyboardless_controls_state()
     keyboardless_master_cb.configure(command=update_keyboardless_controls_state)
 
+    # Sync Queue
+    sync_frame = sections["sync_queue"]
+    tk.Label(sync_frame, text="Sync Queue", bg=panel_bg, fg=text_color, font=tk_font_medium, wraplength=900).pack(anchor="w", padx=18, pady=(14, 4))
+    tk.Label(
+        sync_frame,
+        text="Records Google rejected permanently (for example a deleted or protected worksheet) are set aside here instead of being retried forever. Fix the cause, then retry them, or export them to enter by hand.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=900,
+        justify="left"
+    ).pack(anchor="w", padx=18, pady=(0, 10))
+
+    sync_status_var = StringVar(value="")
+    tk.Label(sync_frame, textvariable=sync_status_var, bg=panel_bg, fg=text_color, font=tk_font_small, wraplength=900, justify="left").pack(anchor="w", padx=18, pady=(0, 8))
+
+    dead_letter_card = tk.Frame(sync_frame, bg=panel_bg, bd=1, relief="solid")
+    dead_letter_card.pack(fill="x", padx=18, pady=(0, 10))
+    _style_card(dead_letter_card)
+    dead_letter_rows = tk.Frame(dead_letter_card, bg=panel_bg)
+    dead_letter_rows.pack(fill="x", padx=12, pady=(10, 10))
+
+    def render_dead_letters():
+        for child in dead_letter_rows.winfo_children():
+            child.destroy()
+        backlog = get_sync_backlog()
+        letters = list_dead_letters(sheet_id or None)
+        sync_status_var.set(
+            f"Waiting to sync: {backlog.get('attendance', 0)} attendance, {backlog.get('photos', 0)} photo, "
+            f"{backlog.get('ids', 0)} new ID.   Dead letters: {len(letters)}"
+        )
+        if not letters:
+            tk.Label(dead_letter_rows, text="No dead-lettered records.", bg=panel_bg, fg=footer_text, font=tk_font_small).pack(anchor="w")
+            return
+        for letter in letters[:50]:
+            payload = letter["payload"]
+            who = payload[1] if len(payload) > 1 else letter["entry_key"]
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(letter["failed_at"]))
+            tk.Label(
+                dead_letter_rows,
+                text=f"{when}  [{letter['lane']}]  {who}: {letter['error']}",
+                bg=panel_bg,
+                fg=text_color,
+                font=tk_font_small,
+                wraplength=880,
+                justify="left"
+            ).pack(anchor="w", pady=(0, 4))
+        if len(letters) > 50:
+            tk.Label(dead_letter_rows, text=f"…and {len(letters) - 50} more (export to see all).", bg=panel_bg, fg=footer_text, font=tk_font_small).pack(anchor="w")
+
+    def retry_all_dead_letters():
+        count = retry_dead_letters()
+        render_dead_letters()
+        sync_status_var.set(sync_status_var.get() + f"\nRe-queued {count} record(s).")
+
+    def export_all_dead_letters():
+        path = filedialog.asksaveasfilename(
+            parent=opts,
+            title="Export Dead Letters",
+            defaultextension=".csv",
+            filetypes=[("CSV file", "*.csv"), ("JSON file", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            count = export_dead_letters(path, sheet_id or None)
+            messagebox.showinfo("Export Complete", f"Exported {count} record(s) to:\n{path}", parent=opts)
+        except Exception as e:
+            messagebox.showerror("Export Failed", f"Could not export dead letters.\n{e}", parent=opts)
+
+    tk.Label(sync_frame, text="Burst Window (ms):", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=18, pady=(6, 4))
+    tk.Label(
+        sync_frame,
+        text="After a scan, the uploader waits this long for more scans so a burst is written in one batch.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=900,
+        justify="left"
+    ).pack(anchor="w", padx=18, pady=(0, 4))
+    tk.Scale(
+        sync_frame,
+        from_=0,
+        to=int(SYNC_COALESCE_WINDOW_MAX * 1000),
+        resolution=50,
+        orient="horizontal",
+        variable=sync_coalesce_var,
+        bg=panel_bg,
+        fg=text_color,
+        highlightthickness=0,
+        troughcolor=accent
+    ).pack(fill="x", padx=18, pady=(0, 12))
+
+    tk.Label(sync_frame, text="Row Write Mode:", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=18, pady=(6, 4))
+    write_mode_frame = tk.Frame(sync_frame, bg=panel_bg)
+    write_mode_frame.pack(anchor="w", padx=18, pady=(0, 4))
+    tk.Radiobutton(write_mode_frame, text="Append (safe for several stations)", variable=sync_write_mode_var, value="append", bg=panel_bg, fg=text_color, font=tk_font_small, selectcolor=panel_bg).pack(side="left", padx=(0, 8))
+    tk.Radiobutton(write_mode_frame, text="Cursor (single station, fewest calls)", variable=sync_write_mode_var, value="cursor", bg=panel_bg, fg=text_color, font=tk_font_small, selectcolor=panel_bg).pack(side="left")
+    tk.Label(
+        sync_frame,
+        text="Use Append whenever more than one scanner station writes to the same spreadsheet.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=900,
+        justify="left"
+    ).pack(anchor="w", padx=18, pady=(0, 12))
+
+    tk.Label(sync_frame, text="Upload on Close (seconds):", bg=panel_bg, fg=text_color, font=tk_font_small).pack(anchor="w", padx=18, pady=(6, 4))
+    tk.Label(
+        sync_frame,
+        text="When the app is closed it keeps uploading queued records for up to this long. Anything left is uploaded at the next launch.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=900,
+        justify="left"
+    ).pack(anchor="w", padx=18, pady=(0, 4))
+    tk.Scale(
+        sync_frame,
+        from_=0,
+        to=120,
+        resolution=5,
+        orient="horizontal",
+        variable=sync_shutdown_var,
+        bg=panel_bg,
+        fg=text_color,
+        highlightthickness=0,
+        troughcolor=accent
+    ).pack(fill="x", padx=18, pady=(0, 12))
+
+    sync_btn_row = tk.Frame(sync_frame, bg=panel_bg)
+    sync_btn_row.pack(anchor="w", padx=18, pady=(0, 12))
+    tk.Button(sync_btn_row, text="Refresh", command=render_dead_letters, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8).pack(side="left")
+    tk.Button(sync_btn_row, text="Retry All", command=retry_all_dead_letters, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8).pack(side="left", padx=(8, 0))
+    tk.Button(sync_btn_row, text="Export…", command=export_all_dead_letters, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8).pack(side="left", padx=(8, 0))
+    render_dead_letters()
+
+    # Diagnostics
+    diag_frame = sections["diagnostics"]
+    tk.Label(diag_frame, text="Diagnostics", bg=panel_bg, fg=text_color, font=tk_font_medium, wraplength=900).pack(anchor="w", padx=18, pady=(14, 4))
+    tk.Label(
+        diag_frame,
+        text="Live sync telemetry since the app started: Google API calls per endpoint with latency percentiles, retries and bytes transferred, and how long records wait between a scan and their row being written.",
+        bg=panel_bg,
+        fg=footer_text,
+        font=tk_font_small,
+        wraplength=900,
+        justify="left"
+    ).pack(anchor="w", padx=18, pady=(0, 10))
+
+    diag_card = tk.Frame(diag_frame, bg=panel_bg, bd=1, relief="solid")
+    diag_card.pack(fill="x", padx=18, pady=(0, 10))
+    _style_card(diag_card)
+    diag_text_var = StringVar(value="")
+    tk.Label(diag_card, textvariable=diag_text_var, bg=panel_bg, fg=text_color, font=tk_font_small, wraplength=880, justify="left").pack(anchor="w", padx=12, pady=(10, 10))
+
+    def _fmt_ms(value):
+        return "-" if value is None else f"{value:.0f}"
+
+    def render_diagnostics():
+        try:
+            metrics = get_sync_metrics()
+        except Exception as e:
+            diag_text_var.set(f"Metrics unavailable: {e}")
+            return
+        minutes = int(metrics["uptime_seconds"] // 60)
+        lines = [f"Uptime: {minutes} min", "", "Queues (enqueued / written / retries / dead / waiting, scan-to-written p50/p95/p99 ms):"]
+        for lane, stats in sorted(metrics["lanes"].items()):
+            lines.append(
+                f"  {lane}: {stats['enqueued']} / {stats['written']} / {stats['retries']} / {stats['dead']} / {stats['backlog']}"
+                f"   {_fmt_ms(stats['p50_ms'])} / {_fmt_ms(stats['p95_ms'])} / {_fmt_ms(stats['p99_ms'])}"
+            )
+        peak = max((sum(depth.values()) for _, depth in metrics["queue_depth"]), default=0)
+        lines.append(f"  Peak backlog: {peak}")
+        lines.extend(["", "API calls (calls / errors / retries, p50/p95/p99 ms, KB sent / received):"])
+        endpoints = sorted(metrics["endpoints"].items(), key=lambda kv: kv[1]["calls"], reverse=True)
+        if not endpoints:
+            lines.append("  No calls yet.")
+        for name, stats in endpoints:
+            lines.append(
+                f"  {name}: {stats['calls']} / {stats['errors']} / {stats['retries']}"
+                f"   {_fmt_ms(stats['p50_ms'])} / {_fmt_ms(stats['p95_ms'])} / {_fmt_ms(stats['p99_ms'])}"
+                f"   {stats['bytes_sent'] / 1024:.1f} / {stats['bytes_received'] / 1024:.1f}"
+            )
+        lines.extend(["", "Quota (tokens available / per minute, throttled seconds):"])
+        for kind, stats in metrics["quota"].items():
+            if kind == "last_backoff":
+                continue
+            lines.append(f"  {kind}: {stats['available']:.1f} / {stats['rate_per_minute']:.0f}, {stats['throttled_seconds']:.1f}s")
+        parse_stats = metrics.get("timestamps", {})
+        lines.extend(["", f"Sheet timestamps: {parse_stats.get('parsed', 0)} parsed, {parse_stats.get('failed', 0)} unreadable"])
+        if parse_stats.get("last_failure"):
+            lines.append(f"  Last unreadable: {parse_stats['last_failure']!r}")
+        diag_text_var.set("\n".join(lines))
+
+    def _poll_diagnostics():
+        try:
+            if not opts.winfo_exists():
+                return
+        except Exception:
+            return
+        if current_section["name"] == "diagnostics":
+            render_diagnostics()
+        opts.after(2000, _poll_diagnostics)
+
+    def export_diagnostics():
+        path = filedialog.asksaveasfilename(
+            parent=opts,
+            title="Save Diagnostics",
+            defaultextension=".json",
+            filetypes=[("JSON file", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            export_sync_metrics(path)
+            messagebox.showinfo("Export Complete", f"Saved diagnostics to:\n{path}", parent=opts)
+        except Exception as e:
+            messagebox.showerror("Export Failed", f"Could not save diagnostics.\n{e}", parent=opts)
+
+    def reset_diagnostics():
+        reset_sync_metrics()
+        render_diagnostics()
+
+    diag_btn_row = tk.Frame(diag_frame, bg=panel_bg)
+    diag_btn_row.pack(anchor="w", padx=18, pady=(0, 12))
+    tk.Button(diag_btn_row, text="Refresh", command=render_diagnostics, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8).pack(side="left")
+    tk.Button(diag_btn_row, text="Save JSON…", command=export_diagnostics, bg=accent, fg="white", font=tk_font_small, bd=0, activebackground=accent_dark, padx=12, pady=8).pack(side="left", padx=(8, 0))
+    tk.Button(diag_btn_row, text="Reset", command=reset_diagnostics, bg=panel_bg, fg=text_color, font=tk_font_small, bd=0, padx=12, pady=8).pack(side="left", padx=(8, 0))
+    render_diagnostics()
+
     # Camera trigger updates should immediately affect Data Logging image field toggles.
     def _on_camera_trigger_change(*args):
         try:
@@ -3323,6 +3744,8 @@ def open_options_window(initial_section: str = "app_behavior"):
         ("google_settings", "Google Settings"),
         ("data_logging", "Data Logging"),
         ("keyboardless_mode", "Keyboardless Mode"),
+        ("sync_queue", "Sync Queue"),
+        ("diagnostics", "Diagnostics"),
     ]
     sidebar_buttons = {}
     current_section = {"name": "app_behavior"}
@@ -3386,8 +3809,10 @@ def open_options_window(initial_section: str = "app_behavior"):
     def reset_to_defaults():
         nonlocal worksheet_targets_local
         global ui_theme, main_ui_scale, whos_here_scale, camera_frequency, camera_trigger
+        global camera_jpeg_quality, camera_resolution
         global easy_signin_mode, keyboardless_mode, keyboardless_bindings
         global logging_field_toggles, worksheet_targets, late_signin_cutoff, early_signout_cutoff, worksheet_cutoff_toggles
+        global sync_coalesce_ms, sync_write_mode, sync_shutdown_deadline_s
 
         try:
             if not messagebox.askyesno("Reset Defaults", "Are you sure you want to reset all settings to defaults? This will overwrite your current settings.", parent=opts):
@@ -3400,6 +3825,8 @@ def open_options_window(initial_section: str = "app_behavior"):
         whos_here_scale = DEFAULT_SETTINGS["whos_here_scale"]
         camera_frequency = DEFAULT_SETTINGS["camera_frequency"]
         camera_trigger = DEFAULT_SETTINGS["camera_trigger"]
+        camera_jpeg_quality = DEFAULT_SETTINGS["camera_jpeg_quality"]
+        camera_resolution = DEFAULT_SETTINGS["camera_resolution"]
         easy_signin_mode = DEFAULT_SETTINGS["easy_signin_mode"]
         keyboardless_mode = DEFAULT_SETTINGS["keyboardless_mode"]
         keyboardless_bindings = DEFAULT_SETTINGS["keyboardless_bindings"].copy()
@@ -3409,6 +3836,15 @@ def open_options_window(initial_section: str = "app_behavior"):
         early_signout_cutoff = DEFAULT_SETTINGS["data_logging"]["time_cutoffs"]["early_signout"]
         worksheet_cutoff_toggles = DEFAULT_SETTINGS["data_logging"]["cutoff_enabled_by_worksheet"].copy()
         worksheet_targets_local = worksheet_targets.copy()
+        invalidate_header_cache()
+        sync_coalesce_ms = DEFAULT_SETTINGS["sync"]["coalesce_window_ms"]
+        set_sync_coalesce_window(sync_coalesce_ms / 1000.0)
+        sync_coalesce_var.set(sync_coalesce_ms)
+        sync_write_mode = DEFAULT_SETTINGS["sync"]["write_mode"]
+        set_sync_write_mode(sync_write_mode)
+        sync_write_mode_var.set(sync_write_mode)
+        sync_shutdown_deadline_s = DEFAULT_SETTINGS["sync"]["shutdown_deadline_s"]
+        sync_shutdown_var.set(sync_shutdown_deadline_s)
 
         theme_var_local.set(ui_theme)
         main_scale_var.set(main_ui_scale)
@@ -3418,6 +3854,8 @@ def open_options_window(initial_section: str = "app_behavior"):
         camera_freq_var.set(camera_frequency)
         update_camera_freq_label(camera_frequency)
         camera_trigger_var.set(camera_trigger)
+        camera_quality_var.set(camera_jpeg_quality)
+        camera_resolution_var.set(camera_resolution)
         easy_signin_var.set(easy_signin_mode)
         keyboardless_enabled_var.set(keyboardless_mode)
         late_cutoff_var.set(late_signin_cutoff)
@@ -3456,8 +3894,10 @@ def open_options_window(initial_section: str = "app_behavior"):
     def apply_and_close(event_arg=None):
         nonlocal worksheet_targets_local
         global ui_theme, main_ui_scale, whos_here_scale, camera_frequency, camera_trigger
+        global camera_jpeg_quality, camera_resolution
         global easy_signin_mode, keyboardless_mode, keyboardless_bindings
         global logging_field_toggles, worksheet_targets, late_signin_cutoff, early_signout_cutoff, worksheet_cutoff_toggles
+        global sync_coalesce_ms, sync_write_mode, sync_shutdown_deadline_s
 
         new_bindings = validate_keyboardless_bindings()
         if new_bindings is None:
@@ -3471,10 +3911,18 @@ def open_options_window(initial_section: str = "app_behavior"):
         except Exception:
             camera_frequency = 1.0
         camera_trigger = camera_trigger_var.get()
+        camera_jpeg_quality = int(camera_quality_var.get())
+        camera_resolution = camera_resolution_var.get()
         easy_signin_mode = easy_signin_var.get()
         keyboardless_mode = bool(keyboardless_enabled_var.get())
         keyboardless_bindings = new_bindings
+        sync_coalesce_ms = int(sync_coalesce_var.get())
+        set_sync_coalesce_window(sync_coalesce_ms / 1000.0)
+        sync_write_mode = sync_write_mode_var.get()
+        set_sync_write_mode(sync_write_mode)
+        sync_shutdown_deadline_s = int(sync_shutdown_var.get())
 
+        previous_field_toggles = dict(logging_field_toggles)
         logging_field_toggles = {key: bool(var.get()) for key, var in local_field_vars.items()}
 
         late_parsed = _parse_hhmm(late_cutoff_var.get())
@@ -3506,6 +3954,10 @@ def open_options_window(initial_section: str = "app_behavior"):
                 for ws_name in worksheet_cutoff_toggles.keys()
             }
 
+        # Header rows depend on the enabled fields; re-verify them on next write.
+        if logging_field_toggles != previous_field_toggles:
+            invalidate_header_cache()
+
         if keyboardless_mode:
             enter_keyboardless_mode()
         else:
@@ -3550,6 +4002,7 @@ def open_options_window(initial_section: str = "app_behavior"):
     refresh_account_display()
     current_sheet_var.set(f"Current sheet ID:  {sheet_id if sheet_id else '(none)'}")
     show_section(initial_section)
+    _poll_diagnostics()
 
     opts.protocol("WM_DELETE_WINDOW", close_options_window)
     opts.bind("<Return>", lambda e: apply_and_close())
@@ -3565,13 +4018,100 @@ if keyboardless_mode:
 
 # Register cleanup handler for when the app closes
 def on_closing():
-    """Clean up resources before closing the application."""
+    """Stop accepting scans, flush the upload queues, then close the application.
+
+    Queued records keep uploading in batches for up to
+    ``sync_shutdown_deadline_s`` seconds while a small window shows how many
+    remain.  "Close Now" skips the wait.  Whatever is left stays pending in
+    the sync journal and is replayed at the next launch.
+    """
+    global accepting_scans
+    if not accepting_scans:
+        return
+    accepting_scans = False
     print("Shutting down...")
     try:
-        stop_background_sync()
-    except Exception as e:
-        print(f"Error stopping background sync: {e}")
-    root.destroy()
+        id_entry.config(state="disabled")
+    except Exception:
+        pass
+
+    finished = {"done": False}
+    drain_thread = None
+
+    def _finish():
+        if finished["done"]:
+            return
+        finished["done"] = True
+        # "Close Now" can land while the drain is still running: stop the
+        # lanes and let the drain thread finish their in-progress writes (and
+        # put in-memory photos on disk) before the journal closes, so a late
+        # lane cannot reopen it.
+        try:
+            stop_background_sync()
+            if drain_thread is not None and drain_thread.is_alive():
+                drain_thread.join(SHUTDOWN_JOIN_TIMEOUT + 1.0)
+            spill_pending_photos()
+        except Exception as e:
+            print(f"Error stopping background sync: {e}")
+        close_sync_journal()
+        root.destroy()
+
+    def _after_from_drain(callback):
+        # The window may already be closed by "Close Now".
+        if finished["done"]:
+            return
+        try:
+            root.after(0, callback)
+        except (tk.TclError, RuntimeError):
+            pass
+
+    try:
+        backlog = sum(get_sync_backlog().values())
+    except Exception:
+        backlog = 0
+    if backlog == 0 or sync_shutdown_deadline_s <= 0:
+        try:
+            drain_background_sync(0)
+        except Exception as e:
+            print(f"Error stopping background sync: {e}")
+        _finish()
+        return
+
+    progress_window = Toplevel(root)
+    progress_window.title("Finishing Uploads")
+    center_window(progress_window, width=460, height=200)
+    progress_window.configure(bg=BG_MAIN)
+    progress_window.protocol("WM_DELETE_WINDOW", lambda: None)
+
+    card = tk.Frame(progress_window, bg=PANEL_BG, bd=1, relief="solid")
+    card.place(relx=0.5, rely=0.5, anchor=tk.CENTER, width=420, height=int(160 * main_ui_scale))
+    try:
+        card.configure(highlightbackground=CARD_BORDER)
+    except Exception:
+        pass
+
+    progress_var = StringVar(value=f"Uploading {backlog} remaining record(s)…")
+    Label(card, textvariable=progress_var, bg=PANEL_BG, fg=TEXT, font=tk_font_small, wraplength=380).pack(pady=(16, 4))
+    Label(card, text="Anything not uploaded in time will be sent the next time the app starts.", bg=PANEL_BG, fg=FOOTER_TEXT, font=tk_font_small, wraplength=380).pack(pady=(0, 8))
+    Button(card, text="Close Now", command=_finish, bg=ACCENT, fg="white", bd=0,
+           font=tk_font_small, activebackground=ACCENT_DARK, padx=12, pady=8).pack(pady=(4, 10))
+
+    def _show_progress(remaining):
+        if not finished["done"]:
+            progress_var.set(f"Uploading {remaining} remaining record(s)…")
+
+    def _drain_worker():
+        try:
+            drain_background_sync(
+                sync_shutdown_deadline_s,
+                progress=lambda remaining: _after_from_drain(lambda r=remaining: _show_progress(r))
+            )
+        except Exception as e:
+            print(f"Error draining background sync: {e}")
+        _after_from_drain(_finish)
+
+    drain_thread = threading.Thread(target=_drain_worker, daemon=True, name="ShutdownDrain")
+    drain_thread.start()
 
 root.protocol("WM_DELETE_WINDOW", on_closing)
 
@@ -0,0 +1,191 @@
+"""
+Fast parsing of the attendance sheet's timestamp strings.
+
+Every attendance row carries a timestamp written by the app in one of two
+fixed-width forms:
+
+    "Signed in at: 09:05 AM, Date: 2025-01-31"   (also "Signed out at: ...")
+    "09:05 AM, 2025-01-31"
+
+Running ``datetime.strptime`` on each of them dominated a Who's Here scan of
+a large tab.  This module slices the time and date out of those exact layouts
+instead, converts each distinct "HH:MM AM" and "YYYY-MM-DD" once and
+memoises the result, so a typical row costs two slices and two dict lookups.
+Anything else (hand-typed single-digit hours, extra spaces) falls back to
+``strptime``.  Rows that still cannot be parsed are counted rather than
+printed.
+
+Parsed times are "wall-clock epoch" integers: seconds from 1970-01-01 00:00
+to the written local date and time, with no time-zone conversion (the sheet
+stores none).  They compare and subtract like the datetimes they stand for;
+``now_epoch()`` gives the current time on the same scale.
+
+Module-level constants:
+    DATE_MEMO_LIMIT -- Distinct dates memoised before the memo is cleared.
+
+Public functions:
+    parse_epoch       -- Parse one timestamp string into an epoch integer (or None).
+    parse_epochs      -- Parse a whole column of timestamp strings into epoch integers.
+    parse_timestamp   -- Parse one timestamp string into a datetime (or None).
+    epoch_to_datetime -- Convert an epoch integer back into a naive datetime.
+    format_epoch      -- Format an epoch integer as "HH:MM AM/PM, YYYY-MM-DD".
+    now_epoch         -- The current local time as an epoch integer.
+    get_parse_stats   -- Counts of parsed and unparseable timestamps.
+    reset_parse_stats -- Zero the parse counters.
+"""
+
+from datetime import datetime, date, timedelta
+
+
+DATE_MEMO_LIMIT = 4096   # Distinct dates memoised before the memo is cleared
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH_DATETIME = datetime(1970, 1, 1)
+_DATE_SEPARATOR = ", Date: "   # Between the time and date in the "Signed in at:" form
+
+_date_memo = {}   # "YYYY-MM-DD" -> seconds from the epoch to that midnight
+_time_memo = {}   # "HH:MM AM" -> seconds after midnight
+_stats = {"parsed": 0, "failed": 0, "last_failure": None}
+
+
+def _date_seconds(date_text):
+    """Return seconds from the epoch to midnight of "YYYY-MM-DD", or None."""
+    seconds = _date_memo.get(date_text)
+    if seconds is not None:
+        return seconds
+    if len(date_text) != 10 or date_text[4] != "-" or date_text[7] != "-":
+        return None
+    try:
+        day = date(int(date_text[0:4]), int(date_text[5:7]), int(date_text[8:10]))
+    except ValueError:
+        return None
+    seconds = (day.toordinal() - _EPOCH_ORDINAL) * 86400
+    if len(_date_memo) >= DATE_MEMO_LIMIT:
+        _date_memo.clear()
+    _date_memo[date_text] = seconds
+    return seconds
+
+
+def _time_seconds(time_text):
+    """Return seconds after midnight of "HH:MM AM/PM", or None."""
+    seconds = _time_memo.get(time_text)
+    if seconds is not None:
+        return seconds
+    if len(time_text) != 8 or time_text[2] != ":" or time_text[5] != " ":
+        return None
+    meridiem = time_text[6:8].upper()
+    if meridiem not in ("AM", "PM") or not (time_text[0:2].isdigit() and time_text[3:5].isdigit()):
+        return None
+    hour, minute = int(time_text[0:2]), int(time_text[3:5])
+    if not (1 <= hour <= 12 and minute <= 59):
+        return None
+    seconds = ((hour % 12) + (12 if meridiem == "PM" else 0)) * 3600 + minute * 60
+    _time_memo[time_text] = seconds   # At most 1440 distinct values
+    return seconds
+
+
+def _split_fixed(text):
+    """Return (time, date) slices of an app-written timestamp, or None."""
+    if len(text) == 20 and text[8:10] == ", ":
+        return text[:8], text[10:]
+    if text[-18:-10] == _DATE_SEPARATOR:
+        at = text.find("at: ")
+        if at != -1 and at + 12 == len(text) - 18:
+            return text[at + 4:at + 12], text[-10:]
+    return None
+
+
+def _split_loose(text):
+    """Split a timestamp the way the original parser did (tolerates extra spaces)."""
+    if "at:" in text and "Date:" in text:
+        parts = text.split(", Date: ")
+        if len(parts) == 2:
+            return parts[0].split("at: ")[-1].strip(), parts[1].strip()
+    elif ", " in text:
+        parts = text.split(", ")
+        if len(parts) == 2:
+            return parts[0].strip(), parts[1].strip()
+    return None
+
+
+def _parse_slow(text):
+    """Fallback for timestamps that are not in the exact app-written layout."""
+    parts = _split_loose(text)
+    if parts is None:
+        return None
+    time_text, date_text = parts
+    date_seconds = _date_seconds(date_text)
+    time_seconds = _time_seconds(time_text)
+    if date_seconds is not None and time_seconds is not None:
+        return date_seconds + time_seconds
+    try:
+        parsed = datetime.strptime(f"{date_text} {time_text}", "%Y-%m-%d %I:%M %p")
+    except ValueError:
+        return None
+    return int((parsed - _EPOCH_DATETIME).total_seconds())
+
+
+def _note_failure(text):
+    _stats["failed"] += 1
+    _stats["last_failure"] = text
+
+
+def parse_epoch(timestamp_str):
+    """Parse a timestamp string into a wall-clock epoch integer.
+
+    Returns None for empty or unparseable input; unparseable input is counted
+    in ``get_parse_stats()``.
+    """
+    if not timestamp_str:
+        return None
+    if not isinstance(timestamp_str, str):
+        timestamp_str = str(timestamp_str)
+    parts = _split_fixed(timestamp_str)
+    if parts is not None:
+        date_seconds = _date_seconds(parts[1])
+        time_seconds = _time_seconds(parts[0])
+        if date_seconds is not None and time_seconds is not None:
+            _stats["parsed"] += 1
+            return date_seconds + time_seconds
+    epoch = _parse_slow(timestamp_str)
+    if epoch is None:
+        _note_failure(timestamp_str)
+    else:
+        _stats["parsed"] += 1
+    return epoch
+
+
+def parse_epochs(values):
+    """Parse a column of timestamp strings; returns a list of epoch integers (None where unparseable)."""
+    return [parse_epoch(value) for value in values]
+
+
+def epoch_to_datetime(epoch):
+    """Return the naive datetime for a wall-clock epoch integer."""
+    return _EPOCH_DATETIME + timedelta(seconds=epoch)
+
+
+def parse_timestamp(timestamp_str):
+    """Parse a timestamp string into a datetime object, or None."""
+    epoch = parse_epoch(timestamp_str)
+    return None if epoch is None else epoch_to_datetime(epoch)
+
+
+def format_epoch(epoch):
+    """Format a wall-clock epoch integer as "HH:MM AM/PM, YYYY-MM-DD"."""
+    return epoch_to_datetime(epoch).strftime("%I:%M %p, %Y-%m-%d")
+
+
+def now_epoch():
+    """Return the current local time as a wall-clock epoch integer."""
+    return int((datetime.now() - _EPOCH_DATETIME).total_seconds())
+
+
+def get_parse_stats():
+    """Return {"parsed", "failed", "last_failure"} counted since start (or the last reset)."""
+    return dict(_stats)
+
+
+def reset_parse_stats():
+    """Zero the parse counters."""
+    _stats.update({"parsed": 0, "failed": 0, "last_failure": None})